@@ -1,10 +1,86 @@
 """
-ai_tools.py — Extraction prompt for the SLM Brain.
+ai_tools.py — Extraction protocol for the SLM Brain: compact JSON schema, prompt and decoder.
+
+The extractor runs in Groq JSON mode (EXTRACTION_RESPONSE_FORMAT), so the
+reply is always one JSON object — no fences or prose to scan for. The object
+uses short keys (EXTRACTION_KEYS), enum codes instead of free text (_ENUMS),
+integers for numbers and leaves out anything not mentioned, so a typical
+reply is a handful of tokens. decode_extraction() turns it back into session
+field names for main._merge_extracted_into_session, which still applies the
+hallucination guards.
 
 PG fix: size_bhk is NEVER extracted for PG persona.
 It is derived automatically from Sharing in the merge step.
+
+Usage:
+    messages = [{"role": "system", "content": get_extraction_prompt(session)}, ..., user]
+    completion = groq.chat.completions.create(..., max_tokens=EXTRACTION_MAX_TOKENS,
+                                              response_format=EXTRACTION_RESPONSE_FORMAT)
+    raw = decode_extraction(completion.choices[0].message.content, session["persona"])
 """
 
+import json
+from functools import lru_cache
+
+EXTRACTION_RESPONSE_FORMAT = {"type": "json_object"}
+EXTRACTION_MAX_TOKENS = 96       # the longest reply (3 family hubs + 6 keys) is ~60
+
+# Short key → session field
+EXTRACTION_KEYS = {
+    "loc":   "location",
+    "rent":  "rent_price_inr_per_month",
+    "bhk":   "size_bhk",
+    "share": "Sharing",
+    "gen":   "gender_preference",
+    "hub":   "nearby_hub",
+    "hubs":  "family_hubs",
+    "mar":   "marital_status",
+    "furn":  "furnishing",
+    "sqft":  "total_sqft",
+    "bath":  "bath",
+    "balc":  "balcony",
+    "food":  "food_included",
+    "gym":   "gym_nearby",
+    "wash":  "has_washing_machine",
+    "wifi":  "has_wifi",
+    "bike":  "two_wheeler_parking",
+    "car":   "four_wheeler_parking",
+}
+
+# Enum code → session value
+_ENUMS = {
+    "gen":  {"B": "Boys", "G": "Girls", "U": "Unisex"},
+    "mar":  {"S": "Single", "M": "Married"},
+    "furn": {"F": "Fully-Furnished", "S": "Semi-Furnished", "U": "Unfurnished"},
+}
+
+# Keys each persona may fill; the rest are dropped on decode, not just discouraged
+_PERSONA_KEYS = {
+    "pg":   ("loc", "rent", "share", "gen", "hub", "food", "wash", "wifi", "gym"),
+    "home": ("loc", "rent", "bhk", "mar", "hubs", "furn", "sqft", "bath", "balc", "bike", "car", "gym"),
+}
+
+_KEY_DOCS = {
+    "loc":   "Bengaluru area name",
+    "rent":  "monthly budget in rupees, integer (10k → 10000, 1.5 lakh → 150000)",
+    "bhk":   "bedrooms, integer",
+    "share": "sharing count, integer (single 1, double 2, triple 3, four 4)",
+    "gen":   '"B" boys | "G" girls | "U" unisex',
+    "hub":   "college, tech park or office name",
+    "hubs":  'array of places the family works / studies, e.g. ["HSR Layout", "Whitefield"]',
+    "mar":   '"M" wife/husband/family/partner | "S" alone/bachelor/solo',
+    "furn":  '"F" fully | "S" semi | "U" unfurnished',
+    "sqft":  "area in sqft, integer",
+    "bath":  "bathrooms, integer",
+    "balc":  "balconies, integer",
+    "food":  "true if food/meals/mess is asked for",
+    "gym":   "true if a gym/fitness is asked for",
+    "wash":  "true if laundry/washing machine is asked for",
+    "wifi":  "true if wifi/internet is asked for",
+    "bike":  "true if bike/scooter parking is asked for",
+    "car":   "true if car parking is asked for",
+}
+
 AMENITY_KEYWORDS: dict[str, list[str]] = {
     "two_wheeler_parking":  ["bike", "scooter", "two wheeler", "2 wheeler", "motorbike"],
     "four_wheeler_parking": ["car", "four wheeler", "4 wheeler", "vehicle parking"],
@@ -22,49 +98,46 @@ def amenity_explicitly_mentioned(field: str, message: str) -> bool:
 
 
 def get_extraction_prompt(session: dict) -> str:
-    persona = session.get("persona", "unknown")
-
-    if persona == "pg":
-        persona_section = """PERSONA: PG SEARCH
-
-REQUIRED — extract these if mentioned in the latest message:
-  - Sharing            : sharing count ONLY ("1"=single, "2"=double, "3"=triple, "4"=four)
-  - gender_preference  : "Boys", "Girls", or "Unisex"
-  - rent_price_inr_per_month : budget as raw text ("10k", "8000", "1.5 lakhs")
-  - location           : Bengaluru area name
-  - nearby_hub         : college, tech park, or office name if mentioned
-  - food_included      : "true" only if food/meals/mess explicitly mentioned
-  - has_washing_machine: "true" only if laundry/washing machine explicitly mentioned
-  - has_gym            : "true" only if gym/fitness explicitly mentioned
-
-⛔ NEVER extract for PG: size_bhk, marital_status, family_hubs, total_sqft, furnishing
-⛔ size_bhk must always be null for PG — it is set automatically from Sharing."""
-
-    elif persona == "home":
-        persona_section = """PERSONA: HOME SEARCH
-
-REQUIRED — extract these if mentioned in the latest message:
-  - size_bhk           : bedrooms ("1", "2", "3", "4")
-  - rent_price_inr_per_month : budget as raw text
-  - location           : Bengaluru area name
-  - marital_status     : "Married" if wife/husband/family/partner; "Single" if alone/bachelor/solo
-  - family_hubs        : JSON array of workplace/school areas e.g. ["HSR Layout", "Whitefield"]
-
-⛔ NEVER extract for HOME: Sharing, gender_preference, nearby_hub, food_included, has_wifi, has_washing_machine"""
-
-    else:
-        persona_section = """PERSONA: UNKNOWN — extract all applicable fields, leave rest null."""
-
-    return f"""You are a strict data-extraction unit. Extract rental parameters from the LATEST user message ONLY.
-
-{persona_section}
-
-ABSOLUTE RULES:
-1. Extract ONLY from the LATEST user message. IGNORE conversation history entirely.
-2. If a value is not explicitly in the latest message → return null.
-3. Return ONLY a raw JSON object. No markdown, no comments, no explanation.
-4. Numbers: raw text → "10k", "1.5 lakhs", "25000".
-5. Boolean amenities: return "true" ONLY if keyword is clearly stated. Otherwise null.
-6. family_hubs: JSON array or null.
-
-Return ONLY the JSON object. Nothing else."""
\ No newline at end of file
+    return _extraction_prompt(session.get("persona"))
+
+
+@lru_cache(maxsize=8)
+def _extraction_prompt(persona: str | None) -> str:
+    keys = _PERSONA_KEYS.get(persona, tuple(EXTRACTION_KEYS))
+    label = {"pg": "PG SEARCH", "home": "HOME SEARCH"}.get(persona, "UNKNOWN")
+    key_lines = "\n".join(f"  {key:<5} {_KEY_DOCS[key]}" for key in keys)
+
+    return f"""You are a strict data-extraction unit. Extract rental parameters from the LATEST user message ONLY and reply with a JSON object.
+
+PERSONA: {label}
+KEYS:
+{key_lines}
+
+RULES:
+1. Include a key ONLY if the latest message states it. Omit every other key — never null. Nothing stated → {{}}.
+2. Ignore the conversation history; it only tells you what was asked.
+3. Integers as numbers, codes exactly as listed, booleans only as true."""
+
+
+def decode_extraction(text: str, persona: str | None) -> dict:
+    """
+    A JSON-mode extractor reply → {session field: value}. Unknown keys, keys
+    outside the persona, unknown enum codes and nulls are dropped.
+    """
+    try:
+        obj = json.loads(text or "{}")
+    except ValueError:
+        return {}
+    if not isinstance(obj, dict):
+        return {}
+    allowed = _PERSONA_KEYS.get(persona, EXTRACTION_KEYS)
+    raw = {}
+    for key, value in obj.items():
+        if key not in allowed or value is None:
+            continue
+        if key in _ENUMS:
+            value = _ENUMS[key].get(str(value).strip().upper()[:1])
+            if value is None:
+                continue
+        raw[EXTRACTION_KEYS[key]] = value
+    return raw
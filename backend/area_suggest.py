@@ -0,0 +1,89 @@
+"""
+area_suggest.py — Prefix-trie autocomplete for Bengaluru area names.
+
+Usage:
+    from area_suggest import AreaTrie, area_listing_counts
+    trie = AreaTrie.build(area_listing_counts(facet_index.area_counts()))
+    trie.suggest("kor")   → ["Koramangala"]
+    trie.suggest("nagar") → ["JP Nagar", "RT Nagar", ...]   (word starts match too)
+
+Indexed terms (all lowercased, all resolving to a canonical name):
+  - location_areas.CANONICAL_AREAS, plus every word-start suffix of each name
+  - location_areas._ALIASES keys        (common misspellings / short forms)
+  - normalizer.BENGALURU_AREAS keys     ("kora" → Koramangala)
+
+Every trie node stores its top-K canonical names, pre-ranked by listing count,
+so a lookup is one walk of len(query) dict hops — no subtree traversal.
+"""
+
+from location_areas import AREA_IDS, AREA_NAMES, CANONICAL_AREAS, _ALIASES, normalise_area
+from normalizer import BENGALURU_AREAS
+
+TOP_K = 10
+
+
+def _suggestion_terms() -> dict[str, set[str]]:
+    """term → canonical names it should suggest."""
+    terms: dict[str, set[str]] = {}
+
+    def add(term: str, canonical: str) -> None:
+        term = " ".join(term.lower().split())
+        if term and canonical in AREA_IDS:
+            terms.setdefault(term, set()).add(canonical)
+
+    for name in CANONICAL_AREAS:
+        words = name.split()
+        for i in range(len(words)):
+            add(" ".join(words[i:]), name)
+    for alias, canonical in _ALIASES.items():
+        add(alias, canonical)
+    for short, target in BENGALURU_AREAS.items():
+        add(short, normalise_area(target))
+    return terms
+
+
+class AreaTrie:
+    __slots__ = ("_root", "counts")
+
+    def __init__(self, root: dict, counts: dict[str, int]):
+        self._root = root
+        self.counts = counts
+
+    @classmethod
+    def build(cls, counts: dict[str, int] | None = None) -> "AreaTrie":
+        """counts: canonical area name → listing count (missing = 0)."""
+        counts = counts or {}
+        # Node = {"c": {char: child}, "a": set of canonical names below}
+        root: dict = {"c": {}, "a": set()}
+        for term, names in _suggestion_terms().items():
+            node = root
+            node["a"] |= names
+            for ch in term:
+                node = node["c"].setdefault(ch, {"c": {}, "a": set()})
+                node["a"] |= names
+
+        def rank(name: str):
+            return (-counts.get(name, 0), name)
+
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node["t"] = sorted(node.pop("a"), key=rank)[:TOP_K]
+            stack.extend(node["c"].values())
+        return cls(root, counts)
+
+    def suggest(self, query: str, limit: int = TOP_K) -> list[str]:
+        node = self._root
+        for ch in " ".join(query.lower().split()):
+            node = node["c"].get(ch)
+            if node is None:
+                return []
+        return node["t"][:limit] if query.strip() else []
+
+
+def area_listing_counts(by_id: dict[int, int]) -> dict[str, int]:
+    """
+    Listing count per canonical area name, from the per-area-ID counts of
+    facets.FacetIndex.area_counts() (the listing tables are scanned once, there).
+    """
+    return {AREA_NAMES[i]: c for i, c in by_id.items() if i in AREA_NAMES}
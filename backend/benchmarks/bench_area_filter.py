@@ -0,0 +1,124 @@
+"""
+bench_area_filter.py — Before/after benchmark for the area filter.
+
+BEFORE: `ilike("location", "%<area>%")` — every row is substring-tested.
+AFTER : `eq("area_id", <id>)`           — one lookup in an index keyed by area ID.
+
+Offline mode (default) replays both strategies over the pipeline CSV, timing a
+sequential substring scan against an area_id → rows index (the in-memory analogue
+of a seq scan vs a B-tree probe) and counting the rows ilike over-matches
+("HAL" also hits Marathahalli / Bommanahalli, "Sarjapur" hits "Sarjapur Road").
+
+Live mode (--live) times the real PostgREST queries against Supabase; it needs
+SUPABASE_URL / SUPABASE_KEY and an already-synced area_id column.
+
+Usage (from backend/):
+    python benchmarks/bench_area_filter.py
+    python benchmarks/bench_area_filter.py --live --runs 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from location_areas import AREA_IDS, AREA_NAMES, area_id_for  # noqa: E402
+
+CSV_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..",
+    "data_pipeline", "data", "bangalore_rentals_enhanced_with_real_properties.csv",
+)
+QUERY_AREAS = [
+    "HSR Layout", "Koramangala", "Electronic City", "HAL", "Sarjapur",
+    "JP Nagar", "Whitefield", "Hebbal", "BTM Layout", "Indiranagar",
+]
+
+
+def _timeit(fn, runs: int) -> float:
+    """Median wall time of fn() in microseconds."""
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(samples)
+
+
+def offline(runs: int) -> None:
+    df = pd.read_csv(CSV_PATH, usecols=["listing_id", "location"])
+    rows = df.to_dict("records")
+    locations_lower = [r["location"].lower() for r in rows]
+
+    # Ingest stage: stamp area_id once, build the equality index
+    index: dict[int, list[dict]] = defaultdict(list)
+    for r in rows:
+        r["area_id"] = area_id_for(r["location"]) or 0
+        index[r["area_id"]].append(r)
+
+    print(f"{len(rows)} listings, {len(index)} distinct area IDs\n")
+    print(f"{'query':<18}{'ilike rows':>11}{'eq rows':>9}{'over-match':>11}"
+          f"{'ilike µs':>11}{'eq µs':>9}{'speed-up':>10}")
+
+    totals = [0.0, 0.0]
+    for area in QUERY_AREAS:
+        needle = area.lower()
+        aid = area_id_for(area)
+
+        def before():
+            return [r for r, loc in zip(rows, locations_lower) if needle in loc]
+
+        def after():
+            return index.get(aid, [])
+
+        hits_before, hits_after = before(), after()
+        over = sum(1 for r in hits_before if r["area_id"] != aid)
+        t_before, t_after = _timeit(before, runs), _timeit(after, runs)
+        totals[0] += t_before
+        totals[1] += t_after
+        print(f"{area:<18}{len(hits_before):>11}{len(hits_after):>9}{over:>11}"
+              f"{t_before:>11.1f}{t_after:>9.2f}{t_before / max(t_after, 1e-3):>9.0f}x")
+
+    print(f"\nTotal: ilike {totals[0]:.0f} µs vs eq {totals[1]:.1f} µs per round of {len(QUERY_AREAS)} queries")
+
+
+def live(runs: int) -> None:
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from supabase.client import ClientOptions
+
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env"))
+    supabase = create_client(
+        os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"),
+        options=ClientOptions(postgrest_client_timeout=60),
+    )
+
+    print(f"{'query':<18}{'ilike ms':>10}{'eq ms':>9}{'ilike rows':>11}{'eq rows':>9}")
+    for area in QUERY_AREAS:
+        aid = AREA_IDS.get(area) or area_id_for(area)
+        canonical = AREA_NAMES.get(aid, area)
+
+        def before():
+            return supabase.table("properties").select("listing_id") \
+                .ilike("location", f"%{area}%").execute().data
+
+        def after():
+            return supabase.table("properties").select("listing_id") \
+                .eq("area_id", aid).execute().data
+
+        n_before, n_after = len(before()), len(after())
+        t_before = _timeit(before, runs) / 1000
+        t_after = _timeit(after, runs) / 1000
+        print(f"{canonical:<18}{t_before:>10.1f}{t_after:>9.1f}{n_before:>11}{n_after:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--live", action="store_true", help="time real Supabase queries")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    live(args.runs) if args.live else offline(args.runs)
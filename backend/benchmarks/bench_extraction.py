@@ -0,0 +1,297 @@
+"""
+bench_extraction.py — Tokens, latency and parsing of the extraction protocol, legacy vs compact.
+
+Replays benchmarks/extraction_corpus.jsonl: one extractor turn per line
+(persona, the question that was asked, the user's message) with the reply in
+both protocols —
+
+  legacy  : free-form JSON under the previous prompt (every persona key, nulls,
+            string values, sometimes fenced or after prose), parsed with
+            the old main.py parser (bench_reply_text.legacy_parse_json_from_text)
+  compact : JSON-mode reply under ai_tools.get_extraction_prompt (short keys,
+            enum codes, no nulls), decoded with ai_tools.decode_extraction
+
+The previous prompt is copied below verbatim as legacy_extraction_prompt.
+
+Checks: both replies must merge into the same session fields
+(main._merge_extracted_into_session). Known legacy losses are listed, not
+failed — the old PG prompt asked for "has_gym", which is not a session field.
+
+Reports per protocol: prompt / completion tokens (context_window.count_tokens —
+an estimate, no tokenizer dependency), the max_tokens reserved against the
+Groq quota, parse time, and decode latency at DECODE_TOKENS_PER_S.
+
+--live sends every corpus turn in both protocols to the Groq endpoint
+(FAKE_SERVICES_URL if set, otherwise api.groq.com with GROQ_API_KEY) and
+reports measured latency, the usage the API returned and JSON failures.
+
+Usage (from backend/):
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --live --repeat 3
+Exits 1 if the two protocols disagree on any turn (beyond known legacy losses).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Importing main builds the Groq / Supabase / Maps clients; only --live calls out
+os.environ.setdefault("FAKE_SERVICES_URL", "http://127.0.0.1:8900")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ai_tools import (  # noqa: E402
+    EXTRACTION_MAX_TOKENS, EXTRACTION_RESPONSE_FORMAT, decode_extraction, get_extraction_prompt,
+)
+from bench_reply_text import legacy_parse_json_from_text  # noqa: E402
+from context_window import count_tokens, message_tokens  # noqa: E402
+from main import EXTRACTOR_MODEL, _empty_session, _merge_extracted_into_session  # noqa: E402
+
+# --- CONFIGURATION ---
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_corpus.jsonl")
+LEGACY_MAX_TOKENS = 400
+DECODE_TOKENS_PER_S = 750        # llama-3.1-8b-instant output speed on Groq, roughly
+PARSE_LOOPS = 2000
+
+# Session fields the legacy protocol could not fill (see module docstring)
+KNOWN_LEGACY_LOSSES = {"gym_nearby"}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Legacy prompt (ai_tools.get_extraction_prompt before the compact schema)
+# ─────────────────────────────────────────────────────────────────────────────
+def legacy_extraction_prompt(session: dict) -> str:
+    persona = session.get("persona", "unknown")
+
+    if persona == "pg":
+        persona_section = """PERSONA: PG SEARCH
+
+REQUIRED — extract these if mentioned in the latest message:
+  - Sharing            : sharing count ONLY ("1"=single, "2"=double, "3"=triple, "4"=four)
+  - gender_preference  : "Boys", "Girls", or "Unisex"
+  - rent_price_inr_per_month : budget as raw text ("10k", "8000", "1.5 lakhs")
+  - location           : Bengaluru area name
+  - nearby_hub         : college, tech park, or office name if mentioned
+  - food_included      : "true" only if food/meals/mess explicitly mentioned
+  - has_washing_machine: "true" only if laundry/washing machine explicitly mentioned
+  - has_gym            : "true" only if gym/fitness explicitly mentioned
+
+⛔ NEVER extract for PG: size_bhk, marital_status, family_hubs, total_sqft, furnishing
+⛔ size_bhk must always be null for PG — it is set automatically from Sharing."""
+
+    elif persona == "home":
+        persona_section = """PERSONA: HOME SEARCH
+
+REQUIRED — extract these if mentioned in the latest message:
+  - size_bhk           : bedrooms ("1", "2", "3", "4")
+  - rent_price_inr_per_month : budget as raw text
+  - location           : Bengaluru area name
+  - marital_status     : "Married" if wife/husband/family/partner; "Single" if alone/bachelor/solo
+  - family_hubs        : JSON array of workplace/school areas e.g. ["HSR Layout", "Whitefield"]
+
+⛔ NEVER extract for HOME: Sharing, gender_preference, nearby_hub, food_included, has_wifi, has_washing_machine"""
+
+    else:
+        persona_section = """PERSONA: UNKNOWN — extract all applicable fields, leave rest null."""
+
+    return f"""You are a strict data-extraction unit. Extract rental parameters from the LATEST user message ONLY.
+
+{persona_section}
+
+ABSOLUTE RULES:
+1. Extract ONLY from the LATEST user message. IGNORE conversation history entirely.
+2. If a value is not explicitly in the latest message → return null.
+3. Return ONLY a raw JSON object. No markdown, no comments, no explanation.
+4. Numbers: raw text → "10k", "1.5 lakhs", "25000".
+5. Boolean amenities: return "true" ONLY if keyword is clearly stated. Otherwise null.
+6. family_hubs: JSON array or null.
+
+Return ONLY the JSON object. Nothing else."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Protocols
+# ─────────────────────────────────────────────────────────────────────────────
+PROTOCOLS = {
+    "legacy": {
+        "prompt": legacy_extraction_prompt,
+        "parse": lambda text, persona: legacy_parse_json_from_text(text),
+        "max_tokens": LEGACY_MAX_TOKENS,
+        "kwargs": {},
+    },
+    "compact": {
+        "prompt": get_extraction_prompt,
+        "parse": decode_extraction,
+        "max_tokens": EXTRACTION_MAX_TOKENS,
+        "kwargs": {"response_format": EXTRACTION_RESPONSE_FORMAT},
+    },
+}
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_messages(protocol: str, turn: dict) -> list[dict]:
+    session = {"persona": turn["persona"]}
+    messages = [{"role": "system", "content": PROTOCOLS[protocol]["prompt"](session)}]
+    if turn.get("asked"):
+        messages.append({"role": "assistant", "content": turn["asked"]})
+    messages.append({"role": "user", "content": turn["message"]})
+    return messages
+
+
+def merged_fields(raw: dict, turn: dict) -> dict:
+    session = _empty_session()
+    session["persona"] = turn["persona"]
+    blank = dict(session)
+    _merge_extracted_into_session(dict(raw), session, turn["message"])
+    return {k: v for k, v in session.items() if v != blank.get(k)}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Checks / measurements
+# ─────────────────────────────────────────────────────────────────────────────
+def check_equivalence(corpus: list[dict]) -> int:
+    mismatches = 0
+    losses = 0
+    for turn in corpus:
+        legacy = merged_fields(legacy_parse_json_from_text(turn["legacy"]), turn)
+        compact = merged_fields(decode_extraction(turn["compact"], turn["persona"]), turn)
+        if legacy == compact:
+            continue
+        diff = {k for k in legacy.keys() | compact.keys() if legacy.get(k) != compact.get(k)}
+        if diff <= KNOWN_LEGACY_LOSSES and not (diff & legacy.keys()):
+            losses += 1
+            continue
+        mismatches += 1
+        print(f"  ❌ {turn['message']!r}\n     legacy  {legacy}\n     compact {compact}")
+    print(f"  {len(corpus) - mismatches - losses}/{len(corpus)} turns merge to the same session fields"
+          + (f"; {losses} gym answer(s) only the compact protocol keeps" if losses else ""))
+    return mismatches
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def offline_report(corpus: list[dict]) -> dict:
+    report = {}
+    for name, proto in PROTOCOLS.items():
+        prompt = [sum(message_tokens(m) for m in build_messages(name, t)) for t in corpus]
+        completion = [count_tokens(t[name]) for t in corpus]
+        parse = proto["parse"]
+        started = time.perf_counter()
+        for _ in range(PARSE_LOOPS // len(corpus) + 1):
+            for t in corpus:
+                parse(t[name], t["persona"])
+        parse_us = (time.perf_counter() - started) / ((PARSE_LOOPS // len(corpus) + 1) * len(corpus)) * 1e6
+        report[name] = {
+            "prompt_tokens": statistics.mean(prompt),
+            "completion_tokens": statistics.mean(completion),
+            "completion_p95": _pct(completion, 0.95),
+            "reserved_tokens": statistics.mean(prompt) + proto["max_tokens"],
+            "decode_ms": statistics.mean(completion) / DECODE_TOKENS_PER_S * 1000,
+            "parse_us": parse_us,
+        }
+    return report
+
+
+def live_report(corpus: list[dict], repeat: int) -> dict:
+    from service_endpoints import GROQ_BASE_URL, make_groq_client
+
+    client = make_groq_client()
+    print(f"\n🌐 Live: {EXTRACTOR_MODEL} at {GROQ_BASE_URL or 'api.groq.com'}, {repeat}× {len(corpus)} turns")
+    report = {}
+    for name, proto in PROTOCOLS.items():
+        latencies, prompt, completion, failures = [], [], [], 0
+        for _ in range(repeat):
+            for turn in corpus:
+                started = time.perf_counter()
+                try:
+                    result = client.chat.completions.create(
+                        model=EXTRACTOR_MODEL, messages=build_messages(name, turn), temperature=0,
+                        max_tokens=proto["max_tokens"], **proto["kwargs"],
+                    )
+                except Exception as exc:
+                    failures += 1
+                    print(f"  ⚠️  {name}: {type(exc).__name__}: {exc}")
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+                text = result.choices[0].message.content or ""
+                if name == "compact":
+                    try:
+                        json.loads(text)
+                    except ValueError:
+                        failures += 1
+                elif "{" not in text:
+                    failures += 1
+                if result.usage is not None:
+                    prompt.append(result.usage.prompt_tokens)
+                    completion.append(result.usage.completion_tokens)
+        report[name] = {
+            "p50_ms": _pct(latencies, 0.5) if latencies else None,
+            "p95_ms": _pct(latencies, 0.95) if latencies else None,
+            "prompt_tokens": statistics.mean(prompt) if prompt else None,
+            "completion_tokens": statistics.mean(completion) if completion else None,
+            "failures": failures,
+        }
+    return report
+
+
+def _delta(old: float | None, new: float | None) -> str:
+    if not old or new is None:
+        return ""
+    return f"{(new - old) / old:+.0%}"
+
+
+def print_table(title: str, report: dict, rows: list[tuple[str, str, str]]) -> None:
+    print(f"\n{title}")
+    print(f"  {'':<28}{'legacy':>10}{'compact':>10}{'Δ':>8}")
+    for key, label, fmt in rows:
+        old, new = report["legacy"].get(key), report["compact"].get(key)
+        cells = "".join(f"{'—' if v is None else format(v, fmt):>10}" for v in (old, new))
+        print(f"  {label:<28}{cells}{_delta(old, new):>8}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_FILE)
+    parser.add_argument("--live", action="store_true", help="also call the Groq endpoint with both protocols")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus in --live mode")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"📚 {len(corpus)} recorded extractor turns ({args.corpus})\n")
+    mismatches = check_equivalence(corpus)
+
+    print_table("📏 Offline (count_tokens estimate)", offline_report(corpus), [
+        ("prompt_tokens", "prompt tokens / call", ".0f"),
+        ("completion_tokens", "completion tokens / call", ".1f"),
+        ("completion_p95", "completion tokens p95", ".0f"),
+        ("reserved_tokens", "quota reserved / call", ".0f"),
+        ("decode_ms", f"decode ms @ {DECODE_TOKENS_PER_S} tok/s", ".0f"),
+        ("parse_us", "parse µs / reply", ".1f"),
+    ])
+    if args.live:
+        print_table("⏱️  Live", live_report(corpus, args.repeat), [
+            ("p50_ms", "latency p50 ms", ".0f"),
+            ("p95_ms", "latency p95 ms", ".0f"),
+            ("prompt_tokens", "prompt tokens / call", ".0f"),
+            ("completion_tokens", "completion tokens / call", ".1f"),
+            ("failures", "errors / unparseable", "d"),
+        ])
+
+    if mismatches:
+        print(f"\n❌ {mismatches} turn(s) merge differently")
+        return 1
+    print("\n✅ Protocols agree on every turn")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,496 @@
+"""
+bench_hot_paths.py — Microbenchmarks for the per-turn pure-Python work, with stored baselines.
+
+Everything /chat does on the CPU between the Groq / Supabase round-trips:
+
+  safe_int, coerce_bool, schemas._to_int     — coercion of extractor values
+  RentalExtractionMonitor                    — Pydantic validation of one extraction
+  _merge_extracted_into_session              — guards + merge into the session
+  _build_dashboard                           — requirements block prepended to replies
+  normalise_area                             — memoised and cold (cache bypassed)
+  decode_extraction / strip_llm_dashboard    — extractor reply decoding / reply clean-up
+  rank_features / rank_page                  — ranking.py over one full candidate set:
+                                               column arrays at fetch time, then score,
+                                               order and break down one page
+  similar                                    — similar.py: six nearest of 5,000 homes
+  turn (pg) / turn (home)                    — the whole CPU side of one /chat turn,
+                                               replayed over a recorded conversation
+
+Fixtures are recorded extractor outputs and consultant replies (same shapes
+fake_services.py serves), so the numbers describe real turns, not toy inputs.
+
+Baselines live in benchmarks/baselines/hot_paths.json. Timings are taken in
+--repeat rounds (default 15); each round times a fixed pure-Python
+calibration loop, then one pass of every case. A case's score is the median
+over rounds of (pass time / that round's calibration), so a baseline
+recorded on a laptop still means something on a CI runner, and a slow
+stretch of a shared machine only costs the rounds it overlaps. A case fails
+when its normalised time is more than --threshold (default 25%) above the
+baseline. Re-recording drops baselines of cases that no longer exist.
+
+Usage (from backend/):
+    python benchmarks/bench_hot_paths.py                     # compare with baselines
+    python benchmarks/bench_hot_paths.py --update-baselines  # re-record after an intended change
+    python benchmarks/bench_hot_paths.py --only turn --threshold 0.4
+    python benchmarks/bench_hot_paths.py --only rank,similar --update-baselines
+Exits 1 on any regression above the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Importing main builds the Groq / Supabase / Maps clients. Point them at the
+# local stand-ins so no real credentials are needed — nothing here makes a call.
+os.environ.setdefault("FAKE_SERVICES_URL", "http://127.0.0.1:8900")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ai_tools import decode_extraction, get_extraction_prompt  # noqa: E402
+from location_areas import normalise_area, _normalise_stripped  # noqa: E402
+from main import (  # noqa: E402
+    EXTRACTOR_MODEL, _build_dashboard, _consultant_messages, _detect_persona, _empty_session,
+    _merge_extracted_into_session, _remember_turn, _repair_session_from_history, _sync_area_id,
+)
+from context_window import compact_reply, count_tokens, pack_history  # noqa: E402
+from model_router import (  # noqa: E402
+    PHASE_ENGINE, changed_fields, choose_model, field_snapshot, output_violations,
+)
+from phase_engine import next_reply  # noqa: E402
+from ranking import RankFeatures, breakdown, ranked, score  # noqa: E402
+from reply_text import strip_llm_dashboard  # noqa: E402
+from schemas import RentalExtractionMonitor, _to_int  # noqa: E402
+from search import CANDIDATE_LIMIT, RESULT_LIMIT, SearchSpec  # noqa: E402
+from similar import SimilarIndex  # noqa: E402
+from utils import coerce_bool, safe_int  # noqa: E402
+
+# --- CONFIGURATION ---
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+DEFAULT_THRESHOLD = 0.25      # fail above +25% (normalised)
+DEFAULT_REPEAT = 15           # interleaved rounds; each case scores its median
+TARGET_PASS_SECONDS = 0.05    # each pass loops the fixture set for about this long
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fixtures — recorded extractor values, extractions, replies and conversations
+# ─────────────────────────────────────────────────────────────────────────────
+INT_VALUES = [
+    "20k", "1.5 lakhs", "2L", "2BHK", "20,000", 25000, 25000.0, "15000", "3 BHK",
+    "1200 sqft", "null", "", None, True, "two", "8 k", "0", 2, "Double",
+]
+
+BOOL_VALUES = [
+    "true", "false", "null", True, False, "yes", "no", None, 1, 0, "needed",
+    "not needed", "N/A", "maybe",
+]
+
+AREA_INPUTS = [
+    "Koramangala", "hsr", "jayanaagr", "whitfeld", "koramangla 5th block", "Indiranagar",
+    "electronic city phase 1", "btm 2nd stage", "Marathahalli", "near manyata tech park",
+    "bellandur", "HSR Layout", "sarjapur road", "Bannerghatta", "rt nagar",
+]
+
+EXTRACTIONS = [
+    {"location": "Koramangala", "rent_price_inr_per_month": "15k", "Sharing": "2",
+     "gender_preference": "boys", "food_included": "true"},
+    {"location": "hsr", "size_bhk": "2BHK", "rent_price_inr_per_month": "35,000",
+     "furnishing": "semi furnished", "two_wheeler_parking": "true", "bath": "2"},
+    {"location": "whitfeld", "property_type": "apartment", "marital_status": "married",
+     "family_hubs": ["Manyata Tech Park", "Hebbal"], "four_wheeler_parking": "true",
+     "total_sqft": "1200 sqft"},
+    {"location": None, "rent_price_inr_per_month": "1.5 lakhs", "size_bhk": 3,
+     "gym_nearby": "null", "balcony": "1"},
+    {"Sharing": "single", "gender_preference": "Girls", "nearby_hub": "Christ University",
+     "has_washing_machine": "true", "location": "null"},
+]
+
+# (current message, persona) each extraction arrived with — the merge guards read both
+EXTRACTION_CONTEXT = [
+    ("boys pg in koramangala, double sharing, 15k with food", "pg"),
+    ("2bhk in hsr around 35000, semi furnished, need bike parking and 2 bathrooms", "home"),
+    ("we're married, offices at manyata and hebbal, need car parking, 1200 sqft", "home"),
+    ("budget 1.5 lakhs for a 3bhk with a balcony", "home"),
+    ("single sharing girls pg near christ university with a washing machine", "pg"),
+]
+
+# JSON-mode extractor replies (compact keys, ai_tools.py) for EXTRACTION_CONTEXT
+EXTRACTOR_REPLIES = [
+    '{"loc":"Koramangala","rent":15000,"share":2,"gen":"B","food":true}',
+    '{"loc":"HSR Layout","bhk":2,"rent":35000,"furn":"S","bike":true,"bath":2}',
+    '{"mar":"M","hubs":["Manyata Tech Park","Hebbal"],"car":true,"sqft":1200}',
+    '{"rent":150000,"bhk":3,"balc":1}',
+    '{"share":1,"gen":"G","hub":"Christ University","wash":true}',
+]
+
+CONSULTANT_REPLIES = [
+    "Great choice! Koramangala has excellent PGs. 🏠\n\nWhat's your budget, and do you prefer single or double sharing?",
+    "### STATUS DASHBOARD\n📍 Location: HSR Layout\n💰 Budget: ₹15,000\n🛏️ BHK: 2\n\nPerfect! Do you need parking, and is anyone working from home?",
+    "✨ Your Tatva PG Selections:\n👦 Gender Preference: Boys\n🍱 Food: Yes\n\nGot it! Which area and what's your budget?",
+    "Whitefield is ideal for Manyata and ITPL commutes. 🚇\n\nWould you like semi-furnished or fully furnished, and how many bathrooms do you need?",
+    "Ready to see your matches? Just say show me! 🏠🔥",
+]
+
+DASHBOARD_SESSIONS = [
+    {**_empty_session(), "persona": "pg", "location": "Koramangala", "Sharing": 2,
+     "gender_preference": "Boys", "rent_price_inr_per_month": 15000, "nearby_hub": "Christ University",
+     "food_included": True, "gym_nearby": True},
+    {**_empty_session(), "persona": "home", "location": "HSR Layout", "size_bhk": 2,
+     "rent_price_inr_per_month": 35000, "total_sqft": 1100, "furnishing": "Semi-Furnished",
+     "marital_status": "Married", "family_hubs": ["Manyata Tech Park", "Hebbal"], "bath": 2,
+     "balcony": 1, "two_wheeler_parking": True, "four_wheeler_parking": True},
+    {**_empty_session(), "persona": "home", "location": "Whitefield"},
+    _empty_session(),
+]
+
+# One recorded conversation per persona: (user message, extractor reply, consultant reply)
+PG_CONVERSATION = [
+    ("looking for a pg", '{}',
+     "Awesome! 🏠 Which area are you looking in, and is it a boys, girls or unisex PG?"),
+    ("boys pg near koramangala", '{"loc":"Koramangala","gen":"B"}',
+     "✨ Your Tatva PG Selections:\n👦 Gender Preference: Boys\n\nKoramangala has great PGs! What's your budget, and single or double sharing?"),
+    ("double sharing, around 12k", '{"share":2,"rent":12000}',
+     "Double sharing at ₹12k is very doable. 👍 Do you want food included, and do you need a gym nearby?"),
+    ("yes food needed and gym would be nice", '{"food":true,"gym":true}',
+     "### STATUS DASHBOARD\n📍 Location: Koramangala\n💰 Budget: ₹12,000\n\nNoted! Are you near any college or office, and do you need a washing machine?"),
+    ("I study at christ university, washing machine yes", '{"hub":"Christ University","wash":true}',
+     "Christ University is right next door. 🎓 Ready to see your matches? Just say show me! 🏠🔥"),
+]
+
+HOME_CONVERSATION = [
+    ("hi, need a flat for my family", '{"mar":"M"}',
+     "Happy to help! 🏡 Which area do you prefer, and how many bedrooms do you need?"),
+    ("2bhk in hsr layout", '{"loc":"HSR Layout","bhk":2}',
+     "HSR Layout is great for families. 🌳 What's your monthly budget, and do you want it furnished?"),
+    ("budget 35000, semi furnished", '{"rent":35000,"furn":"S"}',
+     "### 📋 Your requirements\n📍 HSR Layout\n💰 ₹35,000\n\nGot it! Are you married, and where do you and your spouse work?"),
+    ("married, we work at manyata tech park and electronic city",
+     '{"mar":"M","hubs":["Manyata Tech Park","Electronic City"]}',
+     "Those two hubs are far apart — a midpoint like Koramangala could help. 🚗 Do you need car parking, and how many bathrooms?"),
+    ("need car parking and 2 bathrooms", '{"car":true,"bath":2}',
+     "Ready to see your matches? Just say show me! 🏠🔥"),
+]
+
+
+def _candidate_rows(n: int, seed: int = 7) -> list:
+    """A full home candidate set with the columns ranking.py reads (some left blank)."""
+    rng = random.Random(seed)
+    return [{
+        "listing_id": f"BLR-{i:05d}",
+        "rent_price_inr_per_month": rng.randrange(18000, 60000, 500),
+        "latitude": 12.93 + rng.gauss(0, 0.02), "longitude": 77.62 + rng.gauss(0, 0.02),
+        "dist_to_metro_km": round(rng.uniform(0.2, 8), 1) if rng.random() > 0.1 else None,
+        "commute_time_peak_mins": rng.randrange(15, 120) if rng.random() > 0.1 else None,
+        "two_wheeler_parking": rng.random() < 0.7, "four_wheeler_parking": rng.random() < 0.4,
+        "gym_nearby": rng.random() < 0.5, "has_washing_machine": rng.random() < 0.6,
+    } for i in range(n)]
+
+
+CANDIDATE_ROWS = _candidate_rows(CANDIDATE_LIMIT)
+RANK_SPEC = dict(budget=45000, wants=("two_wheeler_parking", "gym_nearby"), origin=(12.935, 77.615))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# One turn, CPU only — mirrors main._chat_turn with the network calls replaced by
+# the recorded replies
+# ─────────────────────────────────────────────────────────────────────────────
+def simulate_turn(session: dict, msg: str,
+                  extractor_text: str, consultant_text: str) -> str:
+    before = field_snapshot(session)
+    if not session.get("persona"):
+        session["persona"] = _detect_persona(msg)
+
+    get_extraction_prompt(session)
+    pack_history(session["history"], EXTRACTOR_MODEL)
+    raw = decode_extraction(extractor_text, session.get("persona"))
+    if raw:
+        _merge_extracted_into_session(raw, session, msg)
+    _repair_session_from_history(session)
+    _sync_area_id(session)
+
+    model, _ = choose_model(session, msg, before)
+    if model == PHASE_ENGINE:
+        reply = next_reply(session, changed_fields(before, session))
+    else:
+        _consultant_messages(session, msg, model)
+        reply = strip_llm_dashboard(consultant_text)
+        output_violations(reply, session)
+    dashboard = _build_dashboard(session)
+    if dashboard:
+        reply = f"{dashboard}\n\n{reply}"
+
+    SearchSpec.from_session(session)          # prefetch fingerprint
+    _remember_turn(session, msg, reply)
+    return reply
+
+
+def replay_conversation(turns: list) -> None:
+    session = _empty_session()
+    for msg, extractor_text, consultant_text in turns:
+        simulate_turn(session, msg, extractor_text, consultant_text)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cases — each returns a zero-arg callable that runs one "op" over the fixtures
+# ─────────────────────────────────────────────────────────────────────────────
+def _each(fn, inputs):
+    def run():
+        for v in inputs:
+            fn(v)
+    return run, len(inputs)
+
+
+def _merge_all():
+    contexts = list(zip(EXTRACTIONS, EXTRACTION_CONTEXT))
+
+    def run():
+        for raw, (msg, persona) in contexts:
+            # the merge pops from raw and writes to the session — work on copies
+            session = _empty_session()
+            session["persona"] = persona
+            _merge_extracted_into_session(dict(raw), session, msg)
+    return run, len(contexts)
+
+
+def _decode_all():
+    replies = [(text, persona) for text, (_, persona) in zip(EXTRACTOR_REPLIES, EXTRACTION_CONTEXT)]
+
+    def run():
+        for text, persona in replies:
+            decode_extraction(text, persona)
+    return run, len(replies)
+
+
+def _validate_all():
+    def run():
+        for raw in EXTRACTIONS:
+            RentalExtractionMonitor(**raw).model_dump(exclude_none=True)
+    return run, len(EXTRACTIONS)
+
+
+def _normalise_cold():
+    stripped = [s.strip() for s in AREA_INPUTS]
+    uncached = _normalise_stripped.__wrapped__
+    return _each(uncached, stripped)
+
+
+def _turns(conversation):
+    def run():
+        replay_conversation(conversation)
+    return run, len(conversation)
+
+
+def _pack_all():
+    history = []
+    for reply in CONSULTANT_REPLIES:
+        history += [{"role": "user", "content": "ok"}, {"role": "assistant", "content": compact_reply(reply)}]
+    windows = [history[:n] for n in range(2, len(history) + 1, 2)]
+
+    def run():
+        for window in windows:
+            pack_history(window, EXTRACTOR_MODEL)
+    return run, len(windows)
+
+
+def _rank_page():
+    features = RankFeatures.from_rows(CANDIDATE_ROWS)
+    indices = list(range(len(CANDIDATE_ROWS)))
+
+    def run():
+        total, points = score(features, "home", **RANK_SPEC)
+        [breakdown(total, points, i) for i in ranked(indices, total)[:RESULT_LIMIT]]
+    return run, 1
+
+
+def _similar():
+    index = SimilarIndex()
+    index.load("home", _candidate_rows(5000, seed=11))
+    ids = [f"BLR-{i:05d}" for i in range(0, 5000, 50)]
+
+    def run():
+        for listing_id in ids:
+            index.similar(listing_id, "home", budget=45000, k=6)
+    return run, len(ids)
+
+
+CASES = {
+    "safe_int":                 lambda: _each(safe_int, INT_VALUES),
+    "coerce_bool":              lambda: _each(coerce_bool, BOOL_VALUES),
+    "schemas._to_int":          lambda: _each(_to_int, INT_VALUES),
+    "RentalExtractionMonitor":  _validate_all,
+    "merge_extracted":          _merge_all,
+    "build_dashboard":          lambda: _each(_build_dashboard, DASHBOARD_SESSIONS),
+    "normalise_area (memo)":    lambda: _each(normalise_area, AREA_INPUTS),
+    "normalise_area (cold)":    _normalise_cold,
+    "decode_extraction":        _decode_all,
+    "strip_llm_dashboard":      lambda: _each(strip_llm_dashboard, CONSULTANT_REPLIES),
+    "compact_reply":            lambda: _each(compact_reply, CONSULTANT_REPLIES),
+    "count_tokens":             lambda: _each(count_tokens, CONSULTANT_REPLIES),
+    "pack_history":             _pack_all,
+    "rank_features":            lambda: _each(RankFeatures.from_rows, [CANDIDATE_ROWS]),
+    "rank_page":                _rank_page,
+    "similar":                  _similar,
+    "turn (pg)":                lambda: _turns(PG_CONVERSATION),
+    "turn (home)":              lambda: _turns(HOME_CONVERSATION),
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Timing
+# ─────────────────────────────────────────────────────────────────────────────
+def _calibration_loop() -> None:
+    # Fixed mix of what the hot paths do: dict lookups, str methods, small ints
+    d = {"location": "HSR Layout", "size_bhk": 2}
+    acc = 0
+    for i in range(2000):
+        s = "Koramangala 5th Block".lower()
+        acc += len(s.replace(" ", "")) + d.get("size_bhk", 0) + (i & 7)
+        if "block" in s:
+            acc ^= i
+
+
+def _loops_per_pass(run) -> int:
+    """How many calls of `run` fill ~TARGET_PASS_SECONDS (after a warm-up call)."""
+    run()                                      # warm caches / lazy imports
+    t0 = time.perf_counter()
+    run()
+    once = max(time.perf_counter() - t0, 1e-7)
+    return max(1, int(TARGET_PASS_SECONDS / once))
+
+
+def _pass_ns(run, loops: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(loops):
+        run()
+    return (time.perf_counter() - t0) / loops * 1e9
+
+
+def measure(names: list, repeat: int) -> tuple[float, dict]:
+    """(median calibration ns, {case: ns/op}) from `repeat` interleaved rounds."""
+    cases = {name: CASES[name]() for name in names}
+    loops = {name: _loops_per_pass(run) for name, (run, _) in cases.items()}
+    cal_loops = _loops_per_pass(_calibration_loop)
+    calibrations, ratios = [], {name: [] for name in names}
+    for _ in range(repeat):
+        cal = _pass_ns(_calibration_loop, cal_loops)
+        calibrations.append(cal)
+        for name, (run, ops) in cases.items():
+            ratios[name].append(_pass_ns(run, loops[name]) / ops / cal)
+    calibration_ns = statistics.median(calibrations)
+    return calibration_ns, {name: statistics.median(r) * calibration_ns for name, r in ratios.items()}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def load_baselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(path: str, calibration_ns: float, results: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_ns": round(calibration_ns, 1),
+        "cases": {name: round(ns, 1) for name, ns in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Entry point
+# ─────────────────────────────────────────────────────────────────────────────
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-turn hot path microbenchmarks")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help="allowed slowdown vs baseline, as a fraction (0.25 = +25%%)")
+    ap.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    ap.add_argument("--only", default="",
+                    help="run only cases whose name contains this (comma-separated: any of these)")
+    ap.add_argument("--baselines", default=BASELINE_FILE)
+    ap.add_argument("--update-baselines", action="store_true")
+    args = ap.parse_args()
+
+    only = [part.strip() for part in args.only.split(",") if part.strip()]
+    names = [n for n in CASES if not only or any(part in n for part in only)]
+    if not names:
+        print(f"❌ No case matches {args.only!r}")
+        return 1
+
+    calibration_ns, results = measure(names, args.repeat)
+
+    baseline = load_baselines(args.baselines)
+    base_cases = baseline.get("cases", {})
+    base_calib = baseline.get("calibration_ns")
+
+    print(f"calibration: {calibration_ns / 1000:.1f} µs"
+          + (f"  (baseline {base_calib / 1000:.1f} µs, commit {baseline.get('commit', '?')})" if base_calib else ""))
+    print(f"\n  {'case':<26}{'ns/op':>12}{'baseline':>12}{'Δ (norm.)':>12}")
+
+    regressions = []
+    for name in names:
+        ns = results[name]
+        line = f"  {name:<26}{ns:12,.0f}"
+        if name in base_cases and base_calib:
+            # compare in calibration units so machine speed cancels out
+            ratio = (ns / calibration_ns) / (base_cases[name] / base_calib)
+            delta = ratio - 1
+            flag = ""
+            if delta > args.threshold:
+                flag = "  ❌"
+                regressions.append((name, delta))
+            line += f"{base_cases[name]:12,.0f}{delta:+11.0%}{flag}"
+        else:
+            line += f"{'—':>12}{'':>12}"
+        print(line)
+
+    turn_ns = [results[n] for n in names if n.startswith("turn (")]
+    if turn_ns:
+        per_turn = sum(turn_ns) / len(turn_ns)
+        print(f"\n🔥 CPU per /chat turn (no external calls): {per_turn / 1000:.0f} µs "
+              f"→ ~{1e9 / per_turn:,.0f} turns/s per core")
+
+    if args.update_baselines:
+        if args.only:
+            # keep the cases that weren't re-run
+            merged = {n: ns * (calibration_ns / base_calib) if base_calib else ns
+                      for n, ns in base_cases.items() if n in CASES}
+            merged.update(results)
+            results = merged
+        save_baselines(args.baselines, calibration_ns, results)
+        print(f"\n✅ Baselines written to {os.path.relpath(args.baselines)}")
+        return 0
+
+    if not base_cases:
+        print("\n⚠️  No baselines yet — run with --update-baselines to record them.")
+        return 0
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}:")
+        for name, delta in regressions:
+            print(f"   {name}: {delta:+.0%}")
+        return 1
+    print(f"\n✅ No regressions above {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
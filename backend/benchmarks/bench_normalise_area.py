@@ -0,0 +1,121 @@
+"""
+bench_normalise_area.py — Speed and recall of normalise_area over a typo corpus.
+
+Compares the current matcher (Aho–Corasick substring pass, trigram/edit-distance
+fuzzy step, LRU memo) with the previous linear-scan implementation, copied
+below as `legacy_normalise_area`.
+
+Corpus (deterministic, seeded):
+  typo    — one random deletion / substitution / transposition / doubling per
+            canonical name (the misspellings users actually send)
+  known   — canonical names and every alias (must stay 100%)
+  noise   — non-area phrases; a "hit" here is a false positive
+
+Usage (from backend/):
+    python benchmarks/bench_normalise_area.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import location_areas  # noqa: E402
+from location_areas import (  # noqa: E402
+    CANONICAL_AREAS, _ALIASES, _CANONICAL_LOWER, _CANONICAL_SORTED, normalise_area,
+)
+
+SEED = 26
+NOISE = [
+    "mumbai", "anywhere", "near my office", "the city", "somewhere safe",
+    "close to college", "chennai", "downtown", "my workplace", "near metro",
+]
+
+
+def legacy_normalise_area(raw: str) -> str:
+    """The pre-matcher implementation, verbatim."""
+    if not raw or not isinstance(raw, str):
+        return raw
+    key = raw.strip().lower()
+    if key in _ALIASES:
+        return _ALIASES[key]
+    if key in _CANONICAL_LOWER:
+        return _CANONICAL_LOWER[key]
+    for canonical in _CANONICAL_SORTED:
+        if canonical.lower() in key:
+            return canonical
+    if len(key) >= 4:
+        matches = [c for c in _CANONICAL_SORTED if key in c.lower()]
+        if len(matches) == 1:
+            return matches[0]
+    return raw.strip().title()
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("delete", "substitute", "transpose", "double"))
+    if kind == "delete":
+        return word[:i] + word[i + 1:]
+    if kind == "substitute":
+        return word[:i] + rng.choice("aeiournlst") + word[i + 1:]
+    if kind == "transpose":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + word[i] + word[i:]
+
+
+def build_corpus() -> dict[str, list[tuple[str, str | None]]]:
+    rng = random.Random(SEED)
+    typos = []
+    for name in CANONICAL_AREAS:
+        if len(name) < 5:
+            continue
+        for _ in range(3):
+            t = _typo(name.lower(), rng)
+            if t != name.lower():
+                typos.append((t, name))
+    # A canonical name shadowed by an alias ("sarjapur") resolves to the alias target
+    known = [(n.lower(), _ALIASES.get(n.lower(), n)) for n in CANONICAL_AREAS] + list(_ALIASES.items())
+    noise = [(n, None) for n in NOISE]
+    return {"typo": typos, "known": known, "noise": noise}
+
+
+def score(fn, cases) -> float:
+    if cases[0][1] is None:   # noise — fraction wrongly mapped onto a canonical area
+        return sum(fn(q) in CANONICAL_AREAS for q, _ in cases) / len(cases)
+    return sum(fn(q) == want for q, want in cases) / len(cases)
+
+
+def per_lookup_us(fn, queries, rounds: int = 5, clear=None) -> float:
+    samples = []
+    for _ in range(rounds):
+        if clear:
+            clear()
+        t0 = time.perf_counter()
+        for q in queries:
+            fn(q)
+        samples.append((time.perf_counter() - t0) * 1e6 / len(queries))
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    corpus = build_corpus()
+    print(f"{'set':<8}{'cases':>7}{'legacy':>10}{'matcher':>10}")
+    for name, cases in corpus.items():
+        label = "false+" if name == "noise" else "recall"
+        print(f"{name:<8}{len(cases):>7}{score(legacy_normalise_area, cases):>10.1%}"
+              f"{score(normalise_area, cases):>10.1%}   ({label})")
+
+    # Turn-realistic mix: the same handful of areas repeat across a session
+    queries = [q for cases in corpus.values() for q, _ in cases]
+    mix = queries * 4
+    clear = location_areas._normalise_stripped.cache_clear
+
+    print(f"\nPer-lookup µs over {len(mix)} queries ({len(queries)} distinct):")
+    print(f"  legacy               : {per_lookup_us(legacy_normalise_area, mix):8.2f}")
+    print(f"  matcher, cold cache  : {per_lookup_us(normalise_area, queries, clear=clear):8.2f}")
+    print(f"  matcher, memoised    : {per_lookup_us(normalise_area, mix):8.2f}")
+    miss_typos = [q for q, _ in corpus["typo"]]
+    print(f"  typo-only, legacy    : {per_lookup_us(legacy_normalise_area, miss_typos):8.2f}")
+    print(f"  typo-only, cold      : {per_lookup_us(normalise_area, miss_typos, clear=clear):8.2f}")
@@ -0,0 +1,167 @@
+"""
+bench_reply_text.py — Equivalence and speed of the reply sanitizer.
+
+Compares reply_text.strip_llm_dashboard with the previous main.py
+implementation, copied below verbatim as legacy_strip_llm_dashboard
+(legacy_parse_json_from_text, the old extractor-reply parser, stays here for
+bench_extraction.py's legacy protocol).
+
+Checks (deterministic, seeded): recorded replies + a fuzz corpus built from
+header / emoji / box-drawing fragments. Whole-text output must equal legacy,
+and so must streamed output for random chunk splits.
+
+Timing cases include adversarial long replies: a box-top header followed by a
+line of '╚' with no closing '╝' (quadratic for the old lazy block regex) and
+very long replies with no dashboard at all.
+
+Usage (from backend/):
+    python benchmarks/bench_reply_text.py
+Exits 1 on any mismatch.
+"""
+
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from reply_text import ReplySanitizer, strip_llm_dashboard  # noqa: E402
+
+SEED = 30
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Previous implementations (main.py), verbatim
+# ─────────────────────────────────────────────────────────────────────────────
+def _strip_comments(s: str) -> str:
+    return re.sub(r"\s*//[^\n\"]*", "", s)
+
+
+def legacy_parse_json_from_text(text: str) -> dict:
+    if not text:
+        return {}
+    text = re.sub(r"```json\s*", "", text)
+    text = re.sub(r"```\s*",     "", text)
+    text = text.strip()
+    for candidate in [text, _strip_comments(text)]:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        for candidate in [match.group(0), _strip_comments(match.group(0))]:
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                pass
+    return {}
+
+
+def legacy_strip_llm_dashboard(text: str) -> str:
+    text = re.sub(
+        r"(?:###\s*(?:STATUS DASHBOARD|📋[^\n]*)|╔═[^\n]*╗|✨\s*Your Tatva PG Selections[^\n]*)[\s\S]*?(?:╚[^\n]*╝\n?|(?=\n\n[A-Z])|\Z)",
+        "", text, flags=re.IGNORECASE,
+    ).strip()
+    text = re.sub(r"✨\s*Your Tatva PG Selections[^\n]*\n?", "", text, flags=re.IGNORECASE).strip()
+    text = re.sub(
+        r"(?:📍|🛏️|💰|📐|🛋️|👫|🏢|🚿|🌿|✅|🤝|🚻|🏍️|🚗|💪|🍱|📶|🫧|👦|👧|🏫)[^\n]*\n?",
+        "", text,
+    ).strip()
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    return text
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Corpora
+# ─────────────────────────────────────────────────────────────────────────────
+RECORDED_REPLIES = [
+    "Great choice! Koramangala has excellent PGs. 🏠\n\nWhat's your budget, and do you prefer single or double sharing?",
+    "### STATUS DASHBOARD\n📍 Location: HSR Layout\n💰 Budget: ₹15,000\n🛏️ BHK: 2\n\nPerfect! Do you need parking, and is anyone working from home?",
+    "╔══════════════════╗\n║  REQUIREMENTS    ║\n╚══════════════════╝\nAwesome — shall I look near your office?",
+    "✨ Your Tatva PG Selections:\n👦 Gender Preference: Boys\n🍱 Food: Yes\n💪 Gym: Nearby\n\nGot it! Which area and what's your budget?",
+    "✨ Your Tatva PG Selections\n\nReady to see your matches? Just say show me! 🏠🔥",
+    "Here's what I have so far:\n📍 Whitefield\n💰 ₹25k\n\n\n\nAny preference on furnishing?",
+    "### 📋 Your requirements\n- 2BHK\n- Indiranagar\n\nwhat about pets?",
+    "No dashboard here, just a reply with a ✅ tick inline and 🛏 bare bed emoji.",
+    "",
+    "   \n\n  Only whitespace and a line 🚗 parking needed\n\n\n",
+]
+
+_FRAGMENTS = [
+    "### STATUS DASHBOARD", "###  status dashboard", "### 📋 Summary", "#", "##", "###",
+    "╔═══╗", "╔═ box", "╗", "╚═══╝", "╚", "╝", "║ row ║",
+    "✨ Your Tatva PG Selections", "✨Your tatva pg selections:", "✨", "✨ Your Tatva",
+    "📍 Loc", "🛏️ 2", "🛏", "️", "🛋️", "🏍️", "💰", "👦", "✅ ok", "🏠",
+    "\n", "\n", "\n", "\n\n", "\n\n\n", " ", "  ", "\t",
+    "Great", "ok", "which area?", "A", "b", "1.", "- item", "Budget:", "x",
+]
+
+
+def fuzz_replies(n: int, seed: int = SEED) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(1, 25))) for _ in range(n)]
+
+
+def _chunks(text: str, rng: random.Random) -> list[str]:
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 8))))
+    bounds = [0] + cuts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def streamed_sanitize(chunks: list[str]) -> str:
+    s = ReplySanitizer()
+    return "".join(s.feed(c) for c in chunks) + s.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Checks
+# ─────────────────────────────────────────────────────────────────────────────
+def check_sanitizer(texts: list[str], rng: random.Random) -> int:
+    bad = 0
+    for text in texts:
+        want = legacy_strip_llm_dashboard(text)
+        got = strip_llm_dashboard(text)
+        streamed = streamed_sanitize(_chunks(text, rng))
+        if got != want or streamed != want:
+            bad += 1
+            if bad <= 5:
+                print(f"❌ sanitizer mismatch for {text!r}\n   legacy  ={want!r}\n   new     ={got!r}\n   streamed={streamed!r}")
+    return bad
+
+
+def _median_us(fn, arg, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(arg)
+        times.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    rng = random.Random(SEED)
+    fuzz = fuzz_replies(20000)
+    bad_s = check_sanitizer(RECORDED_REPLIES + fuzz, rng)
+    print(f"sanitizer: {len(RECORDED_REPLIES) + len(fuzz)} replies (whole + streamed), {bad_s} mismatches")
+
+    plain = RECORDED_REPLIES[0]
+    dashboard = RECORDED_REPLIES[1]
+    long_plain = ("Koramangala is a great pick for young professionals. " * 40 + "\n\n") * 10
+    box_no_bottom = "╔═ dashboard ╗\n" + "╚" * 4000 + "\nWhich area?"
+    many_headers = "### STATUS DASHBOARD\nA\n\n" * 500
+
+    print(f"\nPer-call µs (median)         legacy        new")
+    for label, legacy_fn, new_fn, arg, rounds in (
+        ("plain reply",            legacy_strip_llm_dashboard, strip_llm_dashboard, plain, 5000),
+        ("reply with dashboard",   legacy_strip_llm_dashboard, strip_llm_dashboard, dashboard, 5000),
+        ("long reply, no blocks",  legacy_strip_llm_dashboard, strip_llm_dashboard, long_plain, 500),
+        ("500 blocks",             legacy_strip_llm_dashboard, strip_llm_dashboard, many_headers, 100),
+        ("'╚' line, no '╝'",       legacy_strip_llm_dashboard, strip_llm_dashboard, box_no_bottom, 20),
+    ):
+        print(f"  {label:<24}{_median_us(legacy_fn, arg, rounds):10.1f} {_median_us(new_fn, arg, rounds):10.1f}")
+
+    sys.exit(1 if bad_s else 0)
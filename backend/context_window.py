@@ -0,0 +1,125 @@
+"""
+context_window.py — Model-facing chat history: compact storage and token-budgeted packing.
+
+session["history"] is what the extractor and consultant see of earlier turns.
+Replies shown to the user carry the requirements dashboard, emoji and
+markdown; the models are told to ignore all of that, and every call pays for
+it as input tokens. So:
+
+  compact_reply(text)        → the reply as stored in history: no dashboard
+                               block, no emoji / ** decoration, tidy spacing
+  count_tokens(text)         → token estimate (no tokenizer dependency)
+  pack_history(history, model)
+                             → the newest entries that fit the model's budget
+                               (HISTORY_TOKEN_BUDGET), oldest first
+
+Usage:
+    session["history"] += [{"role": "user", "content": msg},
+                           {"role": "assistant", "content": compact_reply(reply)}]
+    messages = [system, *pack_history(session["history"], "llama-3.1-8b-instant"), user]
+"""
+
+import re
+from functools import lru_cache
+
+# History tokens per call. The extractor only needs the last question asked;
+# the consultant benefits from a few turns of context.
+HISTORY_TOKEN_BUDGET = {
+    "llama-3.1-8b-instant": 250,
+    "llama-3.3-70b-versatile": 700,
+}
+DEFAULT_HISTORY_BUDGET = 250
+MAX_HISTORY_ENTRIES = 12           # bounds the scan; ~6 turns
+MESSAGE_OVERHEAD_TOKENS = 4        # role + chat-template framing per message
+TOKEN_CACHE_SIZE = 8192            # history entries are re-packed every turn
+
+# The dashboard main._build_dashboard prepends: header line + indented rows
+_DASHBOARD_RE = re.compile(r"^📋 Your Requirements So Far:\n(?:[ \t]+[^\n]*(?:\n|$))*", re.MULTILINE)
+# Emoji (pictographs, dingbats, arrows/stars block, variation selector, ZWJ,
+# keycap) and markdown bold; ₹ and — are kept
+_DECORATION_RE = re.compile(r"[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D\u20E3]+|\*\*")
+_SPACES_RE = re.compile(r"[ \t]{2,}")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+# Pre-tokenisation close to Llama 3's: contractions, letter runs, ≤3-digit
+# groups, punctuation runs, whitespace
+_PIECE_RE = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]+|\s+")
+_LONG_WORD_RE = re.compile(r"[A-Za-z]{9,}")
+
+
+def compact_reply(text: str) -> str:
+    """A user-facing reply reduced to what the models need to read."""
+    if not text:
+        return ""
+    # LLM replies were already through strip_llm_dashboard; only our own block is left
+    if "📋" in text:
+        text = _DASHBOARD_RE.sub("", text)
+    if not text.isascii() or "**" in text:
+        text = _DECORATION_RE.sub("", text)
+    if "  " in text:
+        text = _SPACES_RE.sub(" ", text)
+    text = text.strip()
+    if "\n" not in text:
+        return text
+    text = _BLANK_LINES_RE.sub("\n", text)
+    return "\n".join(line.strip() for line in text.splitlines())
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token estimate for Llama 3 models: one per pre-token piece, plus one per
+    extra 8 letters in long words and about one per 3 UTF-8 bytes beyond the
+    first of each non-ASCII character (₹, emoji).
+    """
+    tokens = len(_PIECE_RE.findall(text))
+    if not text.isascii():
+        tokens += (len(text.encode()) - len(text)) // 3
+    for word in _LONG_WORD_RE.findall(text):
+        tokens += (len(word) - 1) // 8
+    return tokens
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _content_tokens(content: str) -> int:
+    return count_tokens(content)
+
+
+def message_tokens(entry: dict) -> int:
+    return _content_tokens(entry.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def pack_history(history: list, model: str, budget: int | None = None) -> list[dict]:
+    """
+    The newest user / assistant entries that fit `budget` tokens (default:
+    the model's HISTORY_TOKEN_BUDGET), in chronological order. The newest
+    assistant entry — the question being answered — is always kept, cut to
+    the budget if it has to be.
+    """
+    budget = HISTORY_TOKEN_BUDGET.get(model, DEFAULT_HISTORY_BUDGET) if budget is None else budget
+    packed: list[dict] = []
+    used = 0
+    for entry in reversed(history[-MAX_HISTORY_ENTRIES:]):
+        if not isinstance(entry, dict) or entry.get("role") not in ("user", "assistant"):
+            continue
+        cost = message_tokens(entry)
+        if used + cost > budget:
+            if not packed and entry["role"] == "assistant":
+                packed.append(_truncated(entry, budget))
+            break
+        packed.append(entry)
+        used += cost
+    packed.reverse()
+    return packed
+
+
+def _truncated(entry: dict, budget: int) -> dict:
+    """Keeps the end of the entry (the question) within `budget` tokens."""
+    words = (entry.get("content") or "").split(" ")
+    kept: list[str] = []
+    used = MESSAGE_OVERHEAD_TOKENS
+    for word in reversed(words):
+        used += count_tokens(" " + word)
+        if used > budget:
+            break
+        kept.append(word)
+    return {"role": entry["role"], "content": " ".join(reversed(kept))}
@@ -0,0 +1,302 @@
+"""
+facets.py — Bitmap index over both listing tables, for live facet counts.
+
+Every listing table is loaded once (keyset pages, in listing_id order) and
+laid out in ORDER_COLUMNS order: row k of the index is the k-th cheapest
+listing. Each (column, value) of the indexed columns becomes a bitmap —
+a Python int with bit k set when row k has that value — so
+
+  rent ≤ budget              the low bits: (1 << rows under budget) − 1
+  area / size / gender / …   AND / OR of value bitmaps
+  location / hub substrings  OR of the bitmaps of the values that contain them
+  midpoint box (home)        one numpy mask over latitude / longitude
+
+and a count is int.bit_count(). The filters mirror search._pg_query /
+search._home_query, so a count matches what a search with the same spec
+returns.
+
+counts() answers GET /facets: for the session's SearchSpec (partial ones
+too) and the values the user ticked, the matches per value of every facet.
+Values of one facet are OR'd, facets are AND'd, and each facet's own counts
+leave its own selection out — so "Fully Furnished: 9" stays visible after
+ticking "Semi-Furnished".
+
+The index is rebuilt in the background when a query finds it older than
+FACET_REFRESH_S; queries keep using the old one until the new one is in.
+Each load also goes to on_load(persona, rows) — market_stats.MarketCube
+and similar.SimilarIndex read the same rows instead of scanning the tables
+again (load_columns: what they need on top of the facets), and
+area_counts() ranks area_suggest's autocomplete. Home tables also
+get a map_clusters.GridIndex over their coordinates (clusters(): GET
+/map/clusters, optionally narrowed to the session's filters). Until the
+area_id column is filled in (search.area_ids_ready()), rows get their
+area_id from location_areas.area_id_for(location) at load time instead.
+
+Usage:
+    facets = FacetIndex(supabase, on_load=cube.load, load_columns=LOAD_COLUMNS)
+    facets.refresh()                                      # startup (blocking)
+    facets.counts(spec, {"furnishing": {"Semi-Furnished"}}, origin=None)
+        → {"total": 42, "facets": {"furnishing": {"Semi-Furnished": 42, ...}, "has_ac": {...}}}
+"""
+
+import threading
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from listing_cards import TABLES
+from location_areas import area_id_for
+from map_clusters import GridIndex
+from search import MIDPOINT_BOX_DEG, area_ids_ready
+from utils import coerce_flag, safe_int
+
+FACET_REFRESH_S = 15 * 60
+PAGE_SIZE = 1000
+
+# Facets counted for the UI / bot, per persona
+FACETS = {
+    "pg": ("preferred_tenants", "size_bhk", "food_included", "has_gym", "has_wifi", "has_washing_machine"),
+    "home": ("furnishing", "property_type", "zone", "preferred_tenants", "size_bhk", "gym_nearby", "has_ac",
+             "has_washing_machine", "two_wheeler_parking", "four_wheeler_parking", "pets_allowed"),
+}
+BOOL_FACETS = frozenset({
+    "food_included", "has_gym", "has_wifi", "has_washing_machine", "gym_nearby", "has_ac",
+    "two_wheeler_parking", "four_wheeler_parking", "pets_allowed",
+})
+# Indexed for the session filters (search.SearchSpec) on top of the facets
+_FILTER_COLUMNS = {"pg": ("area_id", "location", "nearby_hub"), "home": ("area_id", "location")}
+
+
+def _key(column: str, value) -> str | None:
+    """The string a value is indexed (and selected) under; None = blank."""
+    if column in BOOL_FACETS:
+        flag = coerce_flag(value)
+        return None if flag is None else "true" if flag else "false"
+    if value is None or value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _bitmap(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+class _Table:
+    """One listing table as value bitmaps, rows in (rent, listing_id) order."""
+
+    def __init__(self, rows: list, columns: tuple, geo: bool = False):
+        rows = sorted(rows, key=lambda r: (safe_int(r.get("rent_price_inr_per_month"), 0), r["listing_id"]))
+        self.n = len(rows)
+        self.all = (1 << self.n) - 1
+        self.rents = [safe_int(r.get("rent_price_inr_per_month"), 0) for r in rows]
+        self.ids = [r["listing_id"] for r in rows]
+        self.bitmaps: dict[str, dict[str, int]] = {}
+        for column in columns:
+            positions: dict[str, list[int]] = {}
+            for k, row in enumerate(rows):
+                key = _key(column, row.get(column))
+                if key is not None:
+                    positions.setdefault(key, []).append(k)
+            values = self.bitmaps[column] = {}
+            for key, ks in positions.items():
+                mask = np.zeros(self.n, bool)
+                mask[ks] = True
+                values[key] = _bitmap(mask)
+        self.grid = None
+        if geo:
+            lat = np.array([r.get("latitude") for r in rows], dtype=float)
+            lng = np.array([r.get("longitude") for r in rows], dtype=float)
+            self.grid = GridIndex(lat, lng, np.asarray(self.rents, dtype=float))
+
+    def eq(self, column: str, value) -> int:
+        return self.bitmaps.get(column, {}).get(_key(column, value), 0)
+
+    def contains(self, column: str, text: str) -> int:
+        """ilike %text% — OR of every value that contains it."""
+        text = text.lower()
+        bits = 0
+        for value, bm in self.bitmaps.get(column, {}).items():
+            if text in value.lower():
+                bits |= bm
+        return bits
+
+    def under(self, budget: int) -> int:
+        return (1 << bisect_right(self.rents, budget)) - 1
+
+    def near(self, origin: tuple) -> int:
+        if self.grid is None:
+            return 0
+        lat, lng = origin
+        return _bitmap(self.grid.within((lng - MIDPOINT_BOX_DEG, lat - MIDPOINT_BOX_DEG,
+                                         lng + MIDPOINT_BOX_DEG, lat + MIDPOINT_BOX_DEG)))
+
+    def mask(self, bits: int) -> np.ndarray:
+        """A bitmap as a bool array over the rows."""
+        raw = np.frombuffer(bits.to_bytes((self.n + 7) // 8, "little"), np.uint8)
+        return np.unpackbits(raw, bitorder="little")[:self.n].astype(bool)
+
+    def where(self, spec, origin: tuple | None = None) -> int:
+        """Rows a search for `spec` returns (size 0 = any size)."""
+        bits = self.all
+        if spec.size:
+            bits &= self.eq("size_bhk", spec.size)
+        if spec.budget > 0:
+            bits &= self.under(spec.budget)
+        if origin is not None and spec.persona == "home":
+            bits &= self.near(origin)
+        elif spec.area_id:
+            bits &= self.eq("area_id", spec.area_id)
+        elif spec.location:
+            bits &= self.contains("location", spec.location)
+        if spec.gender and spec.gender != "Unisex":
+            bits &= self.eq("preferred_tenants", spec.gender) | self.eq("preferred_tenants", "Unisex")
+        if spec.food:
+            bits &= self.eq("food_included", True)
+        if spec.gym:
+            bits &= self.eq("has_gym", True)
+        if spec.nearby_hub:
+            bits &= self.contains("nearby_hub", spec.nearby_hub)
+        return bits
+
+
+def _load_rows(supabase, table: str, columns: tuple) -> list:
+    rows, last_id = [], ""
+    select = ",".join(dict.fromkeys(("listing_id", "rent_price_inr_per_month") + columns))
+    while True:
+        query = supabase.table(table).select(select).order("listing_id")
+        if last_id:
+            query = query.gt("listing_id", last_id)
+        page = query.limit(PAGE_SIZE).execute().data
+        if not page:
+            return rows
+        rows += page
+        last_id = page[-1]["listing_id"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Index
+# ─────────────────────────────────────────────────────────────────────────────
+class FacetIndex:
+    def __init__(self, supabase, refresh_s: float = FACET_REFRESH_S, on_load=None,
+                 load_columns: dict | None = None):
+        self._supabase = supabase
+        self.refresh_s = refresh_s
+        self._on_load = on_load
+        self._load_columns = load_columns or {}
+        self._tables: dict[str, _Table] = {}
+        self._built: float | None = None     # monotonic time of the last load; None = never loaded
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.stats = dict.fromkeys(("queries", "cluster_queries", "refreshes", "refresh_failed"), 0)
+
+    def refresh(self) -> None:
+        """Reload both tables and swap the new index in. Raises on a failed load."""
+        tables = {}
+        for persona, table in TABLES.items():
+            columns = FACETS[persona] + _FILTER_COLUMNS[persona]
+            geo = persona == "home"           # PG rows carry no coordinates (listing_cards.py)
+            loaded = ("latitude", "longitude") if geo else ()
+            extra = self._load_columns.get(persona, ()) if self._on_load is not None else ()
+            stored = columns if area_ids_ready() else tuple(c for c in columns if c != "area_id")
+            rows = _load_rows(self._supabase, table, stored + loaded + tuple(extra))
+            if "area_id" not in stored:       # column not synced yet: resolve the IDs here
+                for row in rows:
+                    row["area_id"] = area_id_for(row.get("location") or "") or 0
+            tables[persona] = _Table(rows, columns, geo)
+            if self._on_load is not None:
+                self._on_load(persona, rows)
+        with self._lock:
+            self._tables = tables
+            self._built = time.monotonic()
+            self.stats["refreshes"] += 1
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception as exc:
+            print(f"⚠️  Facet index refresh failed: {type(exc).__name__}: {exc}")
+            with self._lock:
+                self.stats["refresh_failed"] += 1
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _table(self, persona: str) -> _Table | None:
+        with self._lock:
+            stale = self._built is None or time.monotonic() - self._built > self.refresh_s
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, name="facet-refresh", daemon=True).start()
+            return self._tables.get(persona)
+
+    def counts(self, spec, selected: dict | None = None, origin: tuple | None = None) -> dict | None:
+        """
+        {"total": matches, "facets": {facet: {value: matches}}} for `spec`
+        narrowed by `selected` ({facet: {values}}); None until the index is built.
+        """
+        table = self._table(spec.persona)
+        if table is None:
+            return None
+        with self._lock:
+            self.stats["queries"] += 1
+        base = table.where(spec, origin)
+        chosen = {}
+        for facet, values in (selected or {}).items():
+            bits = 0
+            for value in values:
+                bits |= table.eq(facet, value)
+            chosen[facet] = bits
+
+        total = base
+        for bits in chosen.values():
+            total &= bits
+        facets = {}
+        for facet in FACETS[spec.persona]:
+            scope = base
+            for other, bits in chosen.items():
+                if other != facet:
+                    scope &= bits
+            facets[facet] = {value: (scope & bm).bit_count()
+                             for value, bm in sorted(table.bitmaps.get(facet, {}).items())}
+        return {"total": total.bit_count(), "facets": facets}
+
+    def clusters(self, persona: str, bbox: tuple, zoom: int, spec=None, origin: tuple | None = None) -> dict | None:
+        """
+        map_clusters.GridIndex.clusters() for the listings in `bbox` (matching
+        `spec` when given). None until the index is built; no clusters for a
+        table without coordinates.
+        """
+        table = self._table(persona)
+        if table is None:
+            return None
+        with self._lock:
+            self.stats["cluster_queries"] += 1
+        if table.grid is None:
+            return {"zoom": zoom, "total": 0, "clusters": [], "truncated": False}
+        mask = table.grid.within(bbox)
+        if spec is not None:
+            mask &= table.mask(table.where(spec, origin))
+        return table.grid.clusters(mask, zoom, table.ids)
+
+    def area_counts(self) -> dict[int, int]:
+        """Listings per area ID across both tables (area_suggest ranks by it); {} until built."""
+        with self._lock:
+            tables = list(self._tables.values())
+        counts: dict[int, int] = {}
+        for table in tables:
+            for key, bm in table.bitmaps.get("area_id", {}).items():
+                area_id = safe_int(key, 0)
+                if area_id:
+                    counts[area_id] = counts.get(area_id, 0) + bm.bit_count()
+        return counts
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "rows": {persona: t.n for persona, t in self._tables.items()},
+                "age_s": round(time.monotonic() - self._built, 1) if self._built is not None else None,
+            }
@@ -1,8 +1,8 @@
-import googlemaps
-import os
+from resilience import call
+from service_endpoints import make_gmaps_client
 
-# Initialize Google Maps client
-gmaps = googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
+# Initialize Google Maps client (real or local stand-in, see service_endpoints.py)
+gmaps = make_gmaps_client()
 
 def get_coordinates(location_name):
     """
@@ -10,7 +10,8 @@ def get_coordinates(location_name):
     """
     try:
         # We target Bengaluru specifically
-        geocode_result = gmaps.geocode(f"{location_name}, Bengaluru")
+        # Deadline + "maps" breaker; a timeout or open breaker lands in the except below
+        geocode_result = call("geocode", gmaps.geocode, f"{location_name}, Bengaluru", breaker="maps")
         
         if geocode_result:
             location = geocode_result[0]['geometry']['location']
@@ -0,0 +1,366 @@
+"""
+groq_scheduler.py — Every Groq call goes through here: per-model quota, priorities, shedding.
+
+Groq limits each model by requests and tokens and reports what is left on
+every response (x-ratelimit-remaining-requests / -tokens, and the time until
+each bucket is full again). The scheduler keeps one request bucket and one
+token bucket per model, re-synced from those headers, and admits a call only
+when its estimated cost fits. Calls that don't fit queue per model, highest
+priority first:
+
+  PRIORITY_CRITICAL — decides what the user gets searched for (extractor,
+                      no-results recommender). Waits up to 8s.
+  PRIORITY_CHAT     — conversational reply. Waits up to 1.5s, then is
+                      downgraded to the model in DOWNGRADE if that one has
+                      room right now, otherwise shed (GroqShed).
+
+Admission control looks at the whole queue: a call whose predicted wait
+(everything ahead of it + its own cost) is past its deadline is downgraded or
+shed immediately instead of sitting in the queue and hitting a 429 later.
+
+Usage:
+    from groq_scheduler import groq_scheduler, PRIORITY_CRITICAL, GroqShed
+    completion = groq_scheduler.complete(
+        PRIORITY_CRITICAL, model="llama-3.1-8b-instant", messages=msgs, max_tokens=400,
+    )
+    groq_scheduler.metrics()   → dict (queues, waits, tokens and cost per model), rendered by GET /metrics
+"""
+
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import deque
+
+import groq
+
+from service_endpoints import make_groq_client
+
+PRIORITY_CRITICAL = 0
+PRIORITY_CHAT = 1
+PRIORITY_NAMES = {PRIORITY_CRITICAL: "critical", PRIORITY_CHAT: "chat"}
+
+MAX_WAIT_S = {PRIORITY_CRITICAL: 8.0, PRIORITY_CHAT: 1.5}
+
+# Until a model's first response reports its limits, one probe call goes out
+# and the rest wait for it. These (Groq free tier) apply only if a response
+# carries no x-ratelimit-* headers at all.
+DEFAULT_LIMITS = {"requests_per_min": 30, "tokens_per_min": 6_000}
+
+DOWNGRADE = {"llama-3.3-70b-versatile": "llama-3.1-8b-instant"}
+
+# USD per million tokens (input, output), from Groq's on-demand price list
+PRICE_PER_M_TOKENS = {
+    "llama-3.1-8b-instant":    (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+DEFAULT_COMPLETION_TOKENS = 512     # reserved when max_tokens isn't given
+WAIT_SAMPLES = 1000                 # recent queue waits kept for percentiles
+
+
+class GroqShed(Exception):
+    """The call was not sent: no quota within its priority's wait budget."""
+
+
+def estimate_tokens(messages: list, max_tokens: int | None) -> int:
+    # ~4 chars per token for English + a few tokens of chat framing per message
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+    return prompt + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def _parse_reset(value: str | None) -> float:
+    """'1m2.5s' / '350ms' / '7.66s' → seconds."""
+    if not value:
+        return 0.0
+    total = 0.0
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value):
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-model bucket
+# ─────────────────────────────────────────────────────────────────────────────
+class _ModelQuota:
+    __slots__ = ("limit_requests", "limit_tokens", "requests", "tokens", "request_rate",
+                 "token_rate", "refilled_at", "blocked_until", "known", "probing")
+
+    def __init__(self, limits: dict):
+        self.limit_requests = limits["requests_per_min"]
+        self.limit_tokens = limits["tokens_per_min"]
+        self.requests = float(self.limit_requests)
+        self.tokens = float(self.limit_tokens)
+        self.request_rate = self.limit_requests / 60      # refill per second
+        self.token_rate = self.limit_tokens / 60
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.known = False          # limits seen in a response yet?
+        self.probing = False        # the one call sent to learn them is in flight
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.refilled_at
+        self.refilled_at = now
+        self.requests = min(self.limit_requests, self.requests + elapsed * self.request_rate)
+        self.tokens = min(self.limit_tokens, self.tokens + elapsed * self.token_rate)
+
+    def seconds_until(self, cost: int, now: float, calls: int = 1) -> float:
+        """Time until `calls` requests totalling `cost` tokens fit (0 = now)."""
+        if cost > self.limit_tokens or calls > self.limit_requests:
+            return float("inf")
+        short_requests = max(0.0, calls - self.requests)
+        short_tokens = max(0.0, cost - self.tokens)
+        return max(
+            self.blocked_until - now,
+            short_requests / self.request_rate,
+            short_tokens / self.token_rate,
+        )
+
+    def take(self, cost: int) -> None:
+        self.requests -= 1
+        self.tokens -= cost
+
+    def settle(self, reserved: int, used: int | None) -> None:
+        if used is not None:
+            self.tokens += reserved - used      # refund (or charge) the estimate error
+
+    def sync(self, headers) -> None:
+        """
+        Adopts the server's view. x-ratelimit-reset-* is the time until the
+        bucket is full again, so it also gives the refill rate — whatever the
+        window is (Groq reports requests per day and tokens per minute).
+
+        `remaining` was computed before calls we admitted since, so it may
+        only lower the level (someone else shares the key) — unless the limit
+        itself changed, i.e. the first response or a tier change.
+        """
+        for dim in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{dim}")
+            remaining = headers.get(f"x-ratelimit-remaining-{dim}")
+            if not limit or remaining is None:
+                continue
+            limit, remaining = int(limit), float(remaining)
+            reset = _parse_reset(headers.get(f"x-ratelimit-reset-{dim}"))
+            if not self.known or limit != getattr(self, f"limit_{dim}"):
+                setattr(self, f"limit_{dim}", limit)
+                setattr(self, dim, min(limit, remaining))
+            else:
+                setattr(self, dim, min(getattr(self, dim), remaining))
+            if reset > 0 and limit > remaining:
+                setattr(self, f"{dim[:-1]}_rate", (limit - remaining) / reset)
+        if headers.get("x-ratelimit-limit-requests") or headers.get("x-ratelimit-limit-tokens"):
+            self.known = True
+
+    def block(self, headers, now: float) -> None:
+        """After a 429: nothing goes out until the server says so."""
+        retry_after = headers.get("retry-after")
+        wait = float(retry_after) if retry_after else max(
+            _parse_reset(headers.get("x-ratelimit-reset-requests")),
+            _parse_reset(headers.get("x-ratelimit-reset-tokens")),
+            1.0,
+        )
+        self.blocked_until = max(self.blocked_until, now + wait)
+        self.requests = min(self.requests, 0.0)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "cost")
+
+    def __init__(self, priority: int, seq: int, cost: int):
+        self.priority = priority
+        self.seq = seq
+        self.cost = cost
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scheduler
+# ─────────────────────────────────────────────────────────────────────────────
+class GroqScheduler:
+    def __init__(self, client: groq.Groq, default_limits: dict | None = None):
+        # Retries go back through admission, so the SDK must not retry 429s on its own
+        self._client = client.with_options(max_retries=0)
+        self._default_limits = default_limits or DEFAULT_LIMITS
+        self._cond = threading.Condition()
+        self._quotas: dict[str, _ModelQuota] = {}
+        self._queues: dict[str, list[_Waiter]] = {}
+        self._seq = itertools.count()
+        self._waits = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITY_NAMES}
+        self._counters: dict[tuple, int] = {}
+        self._usage: dict[str, list[int]] = {}     # model → [prompt_tokens, completion_tokens]
+
+    # ── Public ────────────────────────────────────────────────────────────────
+    def complete(self, priority: int, *, model: str, messages: list,
+                 max_wait_s: float | None = None, **kwargs):
+        """
+        chat.completions.create through the scheduler. Raises GroqShed or the SDK's errors.
+        max_wait_s tightens the priority's queueing budget (0 = only if there's room now).
+        """
+        cost = estimate_tokens(messages, kwargs.get("max_tokens"))
+        max_wait = MAX_WAIT_S[priority] if max_wait_s is None else min(MAX_WAIT_S[priority], max_wait_s)
+        deadline = time.monotonic() + max_wait
+        attempts = 2
+        while True:
+            attempts -= 1
+            used_model = self._admit(model, priority, cost, deadline)
+            try:
+                return self._send(used_model, priority, cost, messages, kwargs)
+            except (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError):
+                if attempts <= 0 or time.monotonic() >= deadline:
+                    raise
+
+    def has_room(self, model: str, messages: list, max_tokens: int | None = None,
+                 reserve: float = 0.0) -> bool:
+        """
+        True if a call of this size would be admitted right now without queueing
+        and still leave `reserve` (a fraction of the model's limits) in the buckets.
+        """
+        cost = estimate_tokens(messages, max_tokens)
+        with self._cond:
+            quota = self._quota(model)
+            now = time.monotonic()
+            quota.refill(now)
+            return (
+                quota.known and not self._queues.get(model)
+                and quota.seconds_until(cost, now) <= 0
+                and quota.tokens - cost >= reserve * quota.limit_tokens
+                and quota.requests - 1 >= reserve * quota.limit_requests
+            )
+
+    def metrics(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            models = {}
+            for model, quota in self._quotas.items():
+                quota.refill(now)
+                queue = self._queues.get(model, [])
+                models[model] = {
+                    "remaining_requests": round(quota.requests, 1),
+                    "remaining_tokens": round(quota.tokens),
+                    "limit_requests": quota.limit_requests,
+                    "limit_tokens": quota.limit_tokens,
+                    "queue_depth": {
+                        name: sum(1 for w in queue if w.priority == p)
+                        for p, name in PRIORITY_NAMES.items()
+                    },
+                }
+            waits = {}
+            for p, name in PRIORITY_NAMES.items():
+                samples = sorted(self._waits[p])
+                waits[name] = {
+                    "samples": len(samples),
+                    "p50_ms": round(samples[len(samples) // 2] * 1000, 1) if samples else 0.0,
+                    "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 1) if samples else 0.0,
+                    "max_ms": round(samples[-1] * 1000, 1) if samples else 0.0,
+                }
+            usage = {}
+            for model, (prompt, completion) in self._usage.items():
+                price_in, price_out = PRICE_PER_M_TOKENS.get(model, (0.0, 0.0))
+                usage[model] = {
+                    "prompt_tokens": prompt,
+                    "completion_tokens": completion,
+                    "cost_usd": round((prompt * price_in + completion * price_out) / 1e6, 6),
+                }
+            return {"models": models, "wait": waits, "counters": dict(self._counters), "usage": usage}
+
+    # ── Admission ─────────────────────────────────────────────────────────────
+    def _quota(self, model: str) -> _ModelQuota:
+        quota = self._quotas.get(model)
+        if quota is None:
+            quota = self._quotas[model] = _ModelQuota(self._default_limits)
+        return quota
+
+    def _count(self, event: str, model: str, priority: int) -> None:
+        key = (event, model, PRIORITY_NAMES[priority])
+        self._counters[key] = self._counters.get(key, 0) + 1
+
+    def _admit(self, model: str, priority: int, cost: int, deadline: float) -> str:
+        started = time.monotonic()
+        me = _Waiter(priority, next(self._seq), cost)
+        with self._cond:
+            queue = self._queues.setdefault(model, [])
+            quota = self._quota(model)
+            heapq.heappush(queue, me)
+            try:
+                while True:
+                    now = time.monotonic()
+                    quota.refill(now)
+                    if not quota.known:
+                        if not quota.probing and queue[0] is me:
+                            quota.probing = True
+                            quota.take(cost)
+                            self._count("admitted", model, priority)
+                            return model
+                        if now >= deadline:
+                            return self._overflow(model, priority, cost, deadline)
+                        self._cond.wait(timeout=deadline - now)
+                        continue
+                    ahead = [w for w in queue if w < me]
+                    wait = quota.seconds_until(sum(w.cost for w in ahead) + cost, now, len(ahead) + 1)
+                    if queue[0] is me and wait <= 0:
+                        quota.take(cost)
+                        self._count("admitted", model, priority)
+                        return model
+                    if now + wait > deadline:
+                        return self._overflow(model, priority, cost, deadline)
+                    self._cond.wait(timeout=min(max(wait, 0.005), deadline - now))
+            finally:
+                queue.remove(me)
+                heapq.heapify(queue)
+                self._waits[priority].append(time.monotonic() - started)
+                self._cond.notify_all()
+
+    def _overflow(self, model: str, priority: int, cost: int, deadline: float) -> str:
+        """Called with the lock held when `model` can't take the call in time."""
+        fallback = DOWNGRADE.get(model)
+        if priority != PRIORITY_CRITICAL and fallback:
+            quota = self._quota(fallback)
+            now = time.monotonic()
+            quota.refill(now)
+            if quota.known and not self._queues.get(fallback) and quota.seconds_until(cost, now) <= 0:
+                quota.take(cost)
+                self._count("downgraded", model, priority)
+                return fallback
+        self._count("shed", model, priority)
+        raise GroqShed(f"{model}: no quota for a {PRIORITY_NAMES[priority]} call within "
+                       f"{max(0.0, deadline - time.monotonic()):.1f}s")
+
+    # ── Send ──────────────────────────────────────────────────────────────────
+    def _send(self, model: str, priority: int, cost: int, messages: list, kwargs: dict):
+        used = None
+        try:
+            raw = self._client.chat.completions.with_raw_response.create(
+                model=model, messages=messages, **kwargs,
+            )
+            completion = raw.parse()
+            usage = getattr(completion, "usage", None)
+            used = getattr(usage, "total_tokens", None)
+            with self._cond:
+                quota = self._quota(model)
+                quota.sync(raw.headers)
+                quota.known = True          # no headers at all → DEFAULT_LIMITS stand
+                if usage is not None:
+                    spent = self._usage.setdefault(model, [0, 0])
+                    spent[0] += getattr(usage, "prompt_tokens", 0) or 0
+                    spent[1] += getattr(usage, "completion_tokens", 0) or 0
+            return completion
+        except groq.RateLimitError as exc:
+            used = 0                            # rejected calls don't spend tokens
+            with self._cond:
+                quota = self._quota(model)
+                quota.sync(exc.response.headers)
+                quota.block(exc.response.headers, time.monotonic())
+                self._count("rate_limited", model, priority)
+            raise
+        finally:
+            with self._cond:
+                quota = self._quota(model)
+                quota.settle(cost, used)
+                quota.probing = False       # a failed probe lets the next caller probe
+                self._cond.notify_all()
+
+
+groq_scheduler = GroqScheduler(make_groq_client())
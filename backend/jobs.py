@@ -0,0 +1,192 @@
+"""
+jobs.py — In-process background jobs for slow enrichments, delivered by long polling.
+
+A search answer used to wait for its transport block: two Google calls
+(nearby metro, distance to Majestic) inside the midpoint search, and PG
+searches got none. Now the answer goes out at once with a job handle, and
+the enrichment runs here:
+
+  - at most JOB_WORKERS jobs run at a time; the rest queue
+  - identical jobs (same kind and key — e.g. transport for the same area)
+    share one job ID: a second submit while the first is queued or running,
+    or within JOB_TTL_S after it succeeded, returns the same job
+  - finished jobs are kept for JOB_TTL_S, at most JOB_MAX_ENTRIES of them
+    (oldest dropped first)
+
+The client polls GET /jobs/{id}?wait=<s>: the request is held until the job
+finishes or `wait` runs out, so one request usually carries the result. A
+held poll is an asyncio future on the event loop (resolved from the worker
+thread), not a thread; at most POLL_MAX_WAITERS polls are held at once and
+the rest are answered straight away.
+
+An enrichment that comes back empty (Maps down, area not geocoded) fails the
+job instead of finishing it, so the next search retries it rather than
+reusing the blank for JOB_TTL_S.
+
+Usage:
+    job = enrichment_jobs.submit("transport", ("Koramangala",), area_transport, "Koramangala")
+    job.snapshot()                       → {"job_id": "transport-…", "status": "queued", ...}
+    await enrichment_jobs.wait(job.id, 10)   → the job once done (or still pending after 10 s)
+"""
+
+import asyncio
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from geospatial import get_coordinates
+from service_endpoints import GOOGLE_MAPS_API_KEY
+from transport_info import format_transport_for_area
+
+JOB_WORKERS = 4
+JOB_TTL_S = 30 * 60
+JOB_MAX_ENTRIES = 2000
+POLL_MAX_WAIT_S = 25.0
+POLL_MAX_WAITERS = 256
+
+
+class Job:
+    __slots__ = ("id", "kind", "status", "result", "error", "created", "finished", "_future")
+
+    def __init__(self, job_id: str, kind: str):
+        self.id = job_id
+        self.kind = kind
+        self.status = "queued"                 # queued → running → done | failed
+        self.result = None
+        self.error = ""
+        self.created = time.monotonic()
+        self.finished = 0.0
+        self._future: asyncio.Future | None = None   # created by the first poll that waits
+
+    def snapshot(self) -> dict:
+        out = {"job_id": self.id, "kind": self.kind, "status": self.status}
+        if self.status == "done":
+            out["result"] = self.result
+        elif self.status == "failed":
+            out["error"] = self.error
+        return out
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, ttl: float = JOB_TTL_S, max_entries: int = JOB_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich")
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._waiters = 0
+        self.stats = dict.fromkeys(("submitted", "deduplicated", "done", "failed", "poll_overflow"), 0)
+
+    def submit(self, kind: str, key: tuple, fn, *args) -> Job:
+        """fn(*args) as a job — or the live / recent job with the same kind and key."""
+        job_id = f"{kind}-{zlib.crc32(repr(key).encode()):08x}"
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != "failed" and not (
+                    job.finished and time.monotonic() - job.finished > self.ttl):
+                self.stats["deduplicated"] += 1
+                return job
+            job = self._jobs[job_id] = Job(job_id, kind)
+            self._jobs.move_to_end(job_id)
+            self.stats["submitted"] += 1
+            self._evict()
+        self._pool.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job: Job, fn, args: tuple) -> None:
+        job.status = "running"
+        try:
+            result = fn(*args)
+            status, error = "done", ""
+        except Exception as exc:
+            print(f"⚠️  Job {job.id} failed: {type(exc).__name__}: {exc}")
+            result, status, error = None, "failed", type(exc).__name__
+        with self._lock:
+            job.result, job.error, job.status = result, error, status
+            job.finished = time.monotonic()
+            self.stats[status] += 1
+            future, job._future = job._future, None
+        if future is not None:
+            future.get_loop().call_soon_threadsafe(_resolve, future)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished > self.ttl]:
+            del self._jobs[job_id]
+        while len(self._jobs) > self.max_entries:
+            self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Job | None:
+        """The job, after it finishes or `timeout` (capped at POLL_MAX_WAIT_S) passes; None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished or timeout <= 0:
+                return job
+            if self._waiters >= POLL_MAX_WAITERS:
+                self.stats["poll_overflow"] += 1
+                return job
+            if job._future is None:
+                job._future = asyncio.get_running_loop().create_future()
+            future = job._future
+            self._waiters += 1
+        try:
+            # shield: one poll timing out must not cancel the future other polls share
+            await asyncio.wait_for(asyncio.shield(future), min(timeout, POLL_MAX_WAIT_S))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters -= 1
+        return job
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if not j.finished)
+            return {**self.stats, "pending": pending, "entries": len(self._jobs), "waiting": self._waiters}
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+enrichment_jobs = JobQueue()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Enrichments
+# ─────────────────────────────────────────────────────────────────────────────
+def midpoint_transport(lat: float, lng: float) -> dict:
+    text = format_transport_for_area("Midpoint Area", lat, lng, GOOGLE_MAPS_API_KEY)
+    if not text:
+        raise LookupError("no transport data for the midpoint")
+    return {"transport_text": text}
+
+
+def area_transport(area: str) -> dict:
+    """Geocode the area, then its transport block (LookupError when either lookup comes back empty)."""
+    coords = get_coordinates(area)
+    if not coords:
+        raise LookupError(f"could not geocode {area!r}")
+    text = format_transport_for_area(area, coords["lat"], coords["lng"], GOOGLE_MAPS_API_KEY)
+    if not text:
+        raise LookupError(f"no transport data for {area!r}")
+    return {"transport_text": text}
+
+
+def submit_transport(origin: tuple | None, area: str) -> Job | None:
+    """The transport job for a search — the midpoint when there is one, else the area."""
+    if not GOOGLE_MAPS_API_KEY:
+        return None
+    if origin is not None:
+        lat, lng = round(origin[0], 4), round(origin[1], 4)
+        return enrichment_jobs.submit("transport", ("midpoint", lat, lng), midpoint_transport, lat, lng)
+    if area:
+        return enrichment_jobs.submit("transport", ("area", area.lower()), area_transport, area)
+    return None
@@ -0,0 +1,125 @@
+"""
+listing_cards.py — Slim listing cards for search results, full details on demand.
+
+A listing row has ~50 columns (description, amenities_list, contact details,
+URLs, market data …); a result card renders a dozen of them. Searches select
+only the card columns plus what search.py filters on locally and ranking.py
+scores (search_columns), and /chat ships each row as a card (to_card) — the
+fields frontend/app/page.js (PropertyCard) and MidpointMap.jsx render, and
+the row's fit score with its breakdown.
+
+Everything else — contact details included — comes from GET /listing/{id}
+when the user opens a card. ListingDetails caches those rows (LRU, TTL;
+listings change slowly, and a card is often opened more than once); a
+listing that doesn't exist is cached too, so a bad ID can't hammer Supabase.
+Entries are keyed by the lookup's scope as well as the ID: "not in
+PG_Listings" says nothing about `properties`.
+
+Only `properties` is known to carry latitude / longitude
+(scripts/Geo_cordinates.py), so PG cards have no map pin.
+
+Usage:
+    query = supabase.table("PG_Listings").select(search_columns("pg"))
+    cards = [to_card(row, fit) for row, fit in zip(result.rows, result.fit)]   → "properties"
+    details = ListingDetails(supabase)
+    details.get("PG-00042", persona="pg")            → full row with card fields | None
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from ranking import FEATURE_COLUMNS
+from resilience import call
+from utils import safe_int
+
+DETAIL_TTL_S = 10 * 60
+DETAIL_MAX_ENTRIES = 2000
+
+TABLES = {"pg": "PG_Listings", "home": "properties"}
+
+# Card fields straight from the row (formatted_* and display_title are added)
+CARD_FIELDS = (
+    "listing_id", "location", "detailed_address", "property_type", "size_bhk",
+    "preferred_tenants", "food_included", "latitude", "longitude",
+)
+_CARD_COLUMNS = {
+    "pg": ("listing_id", "property_name", "location", "detailed_address", "property_type", "size_bhk",
+           "rent_price_inr_per_month", "legal_security_deposit", "preferred_tenants", "food_included"),
+    "home": ("listing_id", "property_name", "location", "detailed_address", "property_type", "size_bhk",
+             "rent_price_inr_per_month", "legal_security_deposit", "preferred_tenants", "latitude", "longitude"),
+}
+# Filtered on locally by search.SearchSpec.matches (candidate sets)
+_FILTER_COLUMNS = {"pg": ("has_gym", "nearby_hub"), "home": ()}
+
+
+def search_columns(persona: str) -> str:
+    """PostgREST select list for a search of this persona's table."""
+    return ",".join(dict.fromkeys(_CARD_COLUMNS[persona] + _FILTER_COLUMNS[persona] + FEATURE_COLUMNS[persona]))
+
+
+def to_card(row: dict, fit: dict | None = None) -> dict:
+    """The card the frontend renders for one listing row; fit: ranking.breakdown() for it."""
+    card = {k: row[k] for k in CARD_FIELDS if k in row}
+    rent = safe_int(row.get("rent_price_inr_per_month"))
+    deposit = safe_int(row.get("legal_security_deposit"))
+    card["display_title"] = row.get("property_name") or row.get("location") or ""
+    card["formatted_rent"] = f"₹{rent:,}"
+    card["formatted_deposit"] = f"₹{deposit:,}" if deposit > 0 else "On request"
+    if fit:
+        card["match_score"] = fit["score"]
+        card["match_breakdown"] = {k: v for k, v in fit.items() if k != "score"}
+    return card
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Details on demand
+# ─────────────────────────────────────────────────────────────────────────────
+class ListingDetails:
+    """Full listing rows by (persona or "*", listing_id), least recently used evicted first."""
+
+    def __init__(self, supabase, ttl: float = DETAIL_TTL_S, max_entries: int = DETAIL_MAX_ENTRIES):
+        self._supabase = supabase
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[float, dict | None]] = OrderedDict()
+        self.stats = dict.fromkeys(("hit", "miss", "not_found"), 0)
+
+    def get(self, listing_id: str, persona: str | None = None) -> dict | None:
+        """
+        The listing (all columns plus the card fields), or None when no table
+        has it. persona ("pg" / "home") names the table; without it both are
+        tried. Raises StageUnavailable when Supabase can't answer.
+        """
+        if persona not in TABLES:
+            persona = None
+        key = (persona or "*", listing_id)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and time.monotonic() - cached[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["hit"] += 1
+                return cached[1]
+            self.stats["miss"] += 1
+
+        row = None
+        for table in ([TABLES[persona]] if persona else TABLES.values()):
+            query = self._supabase.table(table).select("*").eq("listing_id", listing_id).limit(1)
+            rows = call("db", query.execute, breaker="supabase").data
+            if rows:
+                row = {**rows[0], **to_card(rows[0])}
+                break
+
+        with self._lock:
+            if row is None:
+                self.stats["not_found"] += 1
+            self._entries[key] = (time.monotonic(), row)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return row
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
@@ -9,17 +9,37 @@ Usage:
     normalise_area("hsr")            → "HSR Layout"
     normalise_area("koramanagla")    → "Koramangala"
 
+    from location_areas import area_id_for
+    area_id_for("hsr")               → 7   (stable integer key of "HSR Layout")
+
 Strategy (in order):
   1. Exact match against known aliases / misspellings map.
   2. Exact case-insensitive match against canonical list.
   3. Substring match: if canonical name appears inside the user input
-     (catches "jayanagaragara" → contains "jayanagar" → "Jayanagar").
+     (catches "jayanagaragara" → contains "jayanagar" → "Jayanagar"),
+     then whole-word aliases inside it. One Aho–Corasick pass covers both.
   4. Reverse substring: if user input appears inside a canonical name
      (catches short forms like "hsr" inside "HSR Layout" — already in aliases,
      but this is the fallback safety net).
-  5. Title-case the raw input (last resort — at least fixes casing).
+  5. Fuzzy match for typos not in the alias map ("whitfeld" → "Whitefield"):
+     names one edit away through a deletion index, else a trigram shortlist
+     + edit distance.
+  6. Title-case the raw input (last resort — at least fixes casing).
+
+Area IDs:
+  Every canonical name has a stable integer ID (its 1-based position in
+  CANONICAL_AREAS). The sync stage (scripts/supabase_sync.py) writes the same
+  ID into each listing's `area_id` column, so searches filter with an indexed
+  equality instead of an `ilike '%...%'` scan. CANONICAL_AREAS is therefore
+  APPEND-ONLY — never reorder or delete entries.
 """
 
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+
+from matcher import AhoCorasick, TrigramIndex
+
 # ── Canonical area names ──────────────────────────────────────────────────────
 CANONICAL_AREAS = [
     "Jayanagar", "JP Nagar", "BTM Layout", "Banashankari", "Basavanagudi",
@@ -41,6 +61,10 @@ CANONICAL_AREAS = [
     "Vimanapura", "Peenya", "Dasarahalli", "HBR Layout", "Horamavu",
     "Krishnarajapuram", "Munnekolala", "Basaveshwara Nagar", "Nandini Layout",
     "Nagarabhavi", "RR Nagar", "Uttarahalli", "Anekal",
+    # Areas present in the listing tables (append-only — see AREA_IDS below)
+    "Jakkur", "Vidyaranyapura", "Sanjaynagar", "Sampangi Ram Nagar",
+    "Ashok Nagar", "Residency Road", "Vasanth Nagar", "Mathikere",
+    "Cunningham Road", "Jalahalli",
 ]
 
 # ── Alias map: lowercase input → canonical ────────────────────────────────────
@@ -140,6 +164,11 @@ _ALIASES: dict[str, str] = {
     # Manyata
     "manyata": "Manyata Tech Park", "manyata tech park": "Manyata Tech Park",
     "manyatha": "Manyata Tech Park", "manyatha tech park": "Manyata Tech Park",
+
+    # Listing-table spellings of canonical areas
+    "nagavara": "Nagawara", "sahakar nagar": "Sahakara Nagar",
+    "nagarbhavi": "Nagarabhavi", "sanjay nagar": "Sanjaynagar",
+    "vasanthnagar": "Vasanth Nagar", "ashoknagar": "Ashok Nagar",
 }
 
 # Pre-build lowercase → canonical for step 2
@@ -148,6 +177,59 @@ _CANONICAL_LOWER: dict[str, str] = {a.lower(): a for a in CANONICAL_AREAS}
 # Pre-build sorted canonical list for step 3/4 (longest first avoids short-match false positives)
 _CANONICAL_SORTED = sorted(CANONICAL_AREAS, key=lambda x: len(x), reverse=True)
 
+# Step 3 automaton: every canonical name AND alias in one Aho–Corasick pass.
+#   ("c", rank, canonical) — canonical name, rank = position in _CANONICAL_SORTED
+#   ("a", 0,    canonical) — alias, only counted on word boundaries
+_SUBSTRING_PATTERNS: dict[str, tuple] = {k: ("a", 0, v) for k, v in _ALIASES.items()}
+_SUBSTRING_PATTERNS.update(
+    {c.lower(): ("c", rank, c) for rank, c in enumerate(_CANONICAL_SORTED)}
+)
+_SUBSTRING_MATCHER = AhoCorasick(_SUBSTRING_PATTERNS)
+
+# Step 4 haystack: one string, so "input inside a canonical name" is a few str.find calls
+_REVERSE_HAYSTACK = "\x00".join(c.lower() for c in _CANONICAL_SORTED)
+_REVERSE_OFFSETS = list(accumulate((len(c) + 1 for c in _CANONICAL_SORTED), initial=0))
+
+# Step 5 fuzzy index over canonical names + aliases
+_FUZZY_MIN_LEN = 4
+_FUZZY_INDEX = TrigramIndex(
+    {**{k: v for k, v in _ALIASES.items()}, **_CANONICAL_LOWER},
+    threshold=0.8,
+)
+# A canonical hit covering under half the input is weak ("hal" inside
+# "marathhalli"); a strong fuzzy match on the whole input beats it.
+_WEAK_SUBSTRING_RATIO = 0.5
+_STRONG_FUZZY_SCORE = 0.85
+
+
+def _substring_match(key: str) -> tuple[str, int] | None:
+    """(canonical, matched length) for the best step-3 hit, or None."""
+    best_canonical = None   # (length, -rank, name) — longest canonical, list order on ties
+    best_alias = None       # (length, name)         — longest word-bounded alias
+    for start, end, (kind, rank, name) in _SUBSTRING_MATCHER.finditer(key):
+        if kind == "c":
+            cand = (end - start, -rank, name)
+            if best_canonical is None or cand > best_canonical:
+                best_canonical = cand
+        elif (start == 0 or not key[start - 1].isalnum()) and (end == len(key) or not key[end].isalnum()):
+            if best_alias is None or end - start > best_alias[0]:
+                best_alias = (end - start, name)
+    if best_canonical:
+        return best_canonical[2], best_canonical[0]
+    return (best_alias[1], best_alias[0]) if best_alias else None
+
+
+def _reverse_substring_match(key: str) -> str | None:
+    found = None
+    pos = _REVERSE_HAYSTACK.find(key)
+    while pos != -1:
+        idx = bisect_right(_REVERSE_OFFSETS, pos) - 1
+        if found is not None and found != idx:
+            return None                      # ambiguous — more than one canonical name
+        found = idx
+        pos = _REVERSE_HAYSTACK.find(key, _REVERSE_OFFSETS[idx + 1])
+    return _CANONICAL_SORTED[found] if found is not None else None
+
 
 def normalise_area(raw: str) -> str:
     """
@@ -157,15 +239,24 @@ def normalise_area(raw: str) -> str:
       1. Known alias / typo map (fastest, most precise).
       2. Exact canonical match (case-insensitive).
       3. Canonical name is a substring of user input
-         e.g. "jayanagaragara" contains "jayanagar" → "Jayanagar".
+         e.g. "jayanagaragara" contains "jayanagar" → "Jayanagar";
+         otherwise a whole-word alias inside it, e.g. "koramangla 5th block".
       4. User input is a substring of a canonical name (≥4 chars to avoid false positives)
          e.g. "nagar" inside multiple names — only match if unique enough.
-      5. Title-case fallback.
+      5. Fuzzy match (edit distance, similarity ≥ 0.8) against names + aliases
+         e.g. "whitfeld" → "Whitefield".
+      6. Title-case fallback.
+
+    Results are memoised (bounded LRU) — the same few areas repeat every turn.
     """
     if not raw or not isinstance(raw, str):
         return raw
+    return _normalise_stripped(raw.strip())
 
-    key = raw.strip().lower()
+
+@lru_cache(maxsize=4096)
+def _normalise_stripped(stripped: str) -> str:
+    key = stripped.lower()
 
     # 1. Known alias / typo
     if key in _ALIASES:
@@ -175,18 +266,44 @@ def normalise_area(raw: str) -> str:
     if key in _CANONICAL_LOWER:
         return _CANONICAL_LOWER[key]
 
-    # 3. Canonical name appears as substring inside user input
-    #    (handles "jayanagaragara" → contains "jayanagar")
-    for canonical in _CANONICAL_SORTED:
-        if canonical.lower() in key:
-            return canonical
+    # 3. Canonical name (or whole-word alias) appears inside user input
+    hit = _substring_match(key)
+    if hit:
+        name, length = hit
+        if length < len(key) * _WEAK_SUBSTRING_RATIO:
+            fuzzy = _FUZZY_INDEX.best(key)
+            if fuzzy and fuzzy[1] >= _STRONG_FUZZY_SCORE:
+                return fuzzy[0]
+        return name
 
     # 4. User input appears as substring inside a canonical name
     #    Only when input is ≥ 4 chars (avoids matching "mg" in "MG Road" for bad inputs)
     if len(key) >= 4:
-        matches = [c for c in _CANONICAL_SORTED if key in c.lower()]
-        if len(matches) == 1:
-            return matches[0]
+        hit = _reverse_substring_match(key)
+        if hit:
+            return hit
+
+    # 5. Fuzzy — typos not listed in _ALIASES
+    if len(key) >= _FUZZY_MIN_LEN:
+        fuzzy = _FUZZY_INDEX.best(key)
+        if fuzzy:
+            return fuzzy[0]
 
-    # 5. Fallback — at least normalise casing
-    return raw.strip().title()
\ No newline at end of file
+    # 6. Fallback — at least normalise casing
+    return stripped.title()
+
+
+# ── Stable integer IDs (persisted in listings.area_id — append-only!) ─────────
+AREA_IDS: dict[str, int] = {name: i for i, name in enumerate(CANONICAL_AREAS, start=1)}
+AREA_NAMES: dict[int, str] = {i: name for name, i in AREA_IDS.items()}
+
+
+def area_id_for(raw: str) -> int | None:
+    """
+    Returns the canonical area ID for any user / listing spelling, or None
+    when the name does not resolve to a known canonical area (callers then
+    fall back to the old substring filter).
+    """
+    if not raw or not isinstance(raw, str):
+        return None
+    return AREA_IDS.get(normalise_area(raw))
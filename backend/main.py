@@ -3,39 +3,118 @@ main.py — FastAPI chat endpoint for Tatva Bengaluru Rental Bot.
 
 Fixes in this version:
   [1] Dashboard — no border box, plain emoji list, NEVER shows BHK for PG persona.
-  [2] _strip_llm_dashboard — catches PG-specific headers:
+  [2] strip_llm_dashboard (reply_text.py) — catches PG-specific headers:
       "✨ Your Tatva PG Selections", "👦/👧 Gender Preference:" lines.
   [3] PG DB query — uses `preferred_tenants` and `has_gym`/`food_included` columns.
   [4] Extractor — for PG, size_bhk is NEVER written directly (only via Sharing mirror).
   [5] _repair_session_from_history — PG: never writes size_bhk directly.
+  [6] Turns for one user run one at a time (turn_gate.py); a repeated message_id
+      gets the first turn's answer. /facets and /map/clusters read the filters
+      as of the user's last finished turn, never the session mid-turn.
+  [7] Every external call has a stage deadline inside a per-turn budget, a
+      circuit breaker and a deterministic fallback (resilience.py).
+  [8] Consultant per turn (model_router.py) — on-script turns are answered by
+      the phase engine (phase_engine.py, no LLM), corrections by the 8B model,
+      midpoint / hub advice and ambiguous input by the 70B; 8B replies that
+      break the OUTPUT RULES escalate to the 70B.
+  [9] History is stored model-facing (no dashboard / emoji) and packed into
+      each call by a per-model token budget (context_window.py).
+  [10] Extractor runs in JSON mode with a compact schema — short keys, enum
+      codes, no nulls (ai_tools.py); the reply is decoded, never scanned.
+  [11] Search (search.py) starts in the background as soon as a turn completes
+      the essentials; "show me" takes the prefetched result when the filters
+      still match. Stricter follow-up searches are filtered from the last
+      search's candidate set without a database round trip.
+  [12] Results are ranked by fit (ranking.py) and paginated by an opaque cursor in
+      session["search_cursor"]; "show more" answers the next page straight
+      from it — no extractor, no consultant. The match count is exact.
+  [13] Results ship as slim cards — only the fields the frontend renders
+      (listing_cards.py); full details come from GET /listing/{listing_id}.
+  [14] GET /facets counts matches per facet value (furnishing, food, AC, …)
+      for the session's filters from an in-memory bitmap index (facets.py).
+  [15] Rent percentiles per area / size / furnishing (market_stats.py) — a
+      budget far below the market gets a reality check with real numbers,
+      and the consultant and recommender prompts carry them. No query.
+  [16] GET /map/clusters?bbox=&zoom= — listings aggregated per screen cell
+      (map_clusters.py): counts and rent ranges, one bubble per 64 px.
+  [17] Transport info (metro, distance to Majestic) is a background job
+      (jobs.py): results go out at once with a job handle, the frontend
+      long-polls GET /jobs/{job_id}?wait= for the block.
+  [18] GET /listing/{listing_id}/similar — nearest listings by standardised
+      feature vector (similar.py), optionally under a budget. No query.
 """
 
 import os
-import json
 import re
+import asyncio
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import Dict, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, ValidationError
-from groq import Groq
-from supabase import create_client, Client, ClientOptions
+from supabase import Client
 
 from prompts import get_system_prompt, get_pg_system_prompt
-from ai_tools import get_extraction_prompt, amenity_explicitly_mentioned
+from ai_tools import (
+    EXTRACTION_MAX_TOKENS, EXTRACTION_RESPONSE_FORMAT, amenity_explicitly_mentioned,
+    decode_extraction, get_extraction_prompt,
+)
 from schemas import RentalExtractionMonitor
 from recommender import get_smart_suggestions
-from geospatial import get_coordinates
-from transport_info import format_transport_for_area
+from location_areas import area_id_for, normalise_area, AREA_IDS, AREA_NAMES
+from area_suggest import AreaTrie, area_listing_counts
+from facets import FACETS, FacetIndex
+from market_stats import MarketCube, budget_note, market_line
+from map_clusters import parse_bbox
+from similar import LOAD_COLUMNS, SimilarIndex
+from jobs import enrichment_jobs, submit_transport
+from turn_gate import TurnGate
+from groq_scheduler import groq_scheduler, PRIORITY_CRITICAL
+from resilience import call, complete_llm, stage_timeout, turn_budget, snapshot as resilience_snapshot
+from model_router import changed_fields, consult, field_snapshot, router_stats
+from phase_engine import next_reply
+from context_window import compact_reply, pack_history
+from listing_cards import to_card
+from search import ListingSearch, SearchResult, SearchSpec, missing_essentials, probe_area_ids
+from metrics import render_metrics
+from service_endpoints import make_supabase_client
 from utils import safe_int, coerce_bool
 
 load_dotenv()
 
 # ─────────────────────────────────────────────────────────────────────────────
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Area filters: area_id equality once scripts/supabase_sync.py has filled the column in
+    if await asyncio.to_thread(probe_area_ids, supabase):
+        print("✅ Location filters use area_id")
+    else:
+        print("⚠️  Location filters use ilike — area_id not filled in (scripts/supabase_sync.py) or AREA_ID_FILTER=off")
+    # Facet counts, rent statistics, similar listings, area ranking: one load of
+    # both listing tables (refreshed on use)
+    try:
+        await asyncio.to_thread(facet_index.refresh)
+        print(f"✅ Facet index built: {facet_index.snapshot()['rows']}")
+    except Exception:
+        print("⚠️  Facet index unavailable — GET /facets retries on first use")
+        traceback.print_exc()
+    # Area autocomplete: rebuild the trie once, ranked by live listing counts
+    global area_trie
+    counts = area_listing_counts(facet_index.area_counts())
+    if counts:
+        area_trie = AreaTrie.build(counts)
+        print(f"✅ Area trie ranked by {sum(counts.values())} listings")
+    else:
+        print("⚠️  Area listing counts unavailable — suggestions ranked alphabetically")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -47,15 +126,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY"),
-    options=ClientOptions(postgrest_client_timeout=60),
-)
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-GOOGLE_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
+supabase: Client = make_supabase_client()
 
 user_sessions: Dict[str, dict] = {}
+settled_specs: Dict[str, SearchSpec] = {}   # filters as of each user's last finished turn
+turn_gate = TurnGate()
+# Turns spend nearly all their time waiting on Groq / Supabase, so the pool is
+# sized for concurrent users, not cores (asyncio's default would be cores + 4).
+CHAT_WORKER_THREADS = int(os.getenv("CHAT_WORKER_THREADS", "64"))
+turn_executor = ThreadPoolExecutor(max_workers=CHAT_WORKER_THREADS, thread_name_prefix="chat-turn")
+area_trie = AreaTrie.build()
+listing_search = ListingSearch(supabase)
+market_cube = MarketCube()
+similar_index = SimilarIndex()
+
+
+def _listings_loaded(persona: str, rows: list) -> None:
+    market_cube.load(persona, rows)
+    similar_index.load(persona, rows)
+
+
+facet_index = FacetIndex(supabase, on_load=_listings_loaded, load_columns=LOAD_COLUMNS)
+
+EXTRACTOR_MODEL = "llama-3.1-8b-instant"
 
 BOOL_AMENITY_FIELDS = frozenset({
     "two_wheeler_parking", "four_wheeler_parking",
@@ -63,16 +156,32 @@ BOOL_AMENITY_FIELDS = frozenset({
 })
 INT_AMENITY_FIELDS = frozenset({"bath", "balcony"})
 
+_BARE_SHOW_RE = re.compile(
+    r"^\s*(?:ok(?:ay)?[, ]+)?(?:please\s+)?(?:show|list|search|find)(?:\s+me)?"
+    r"(?:\s+(?:the\s+)?(?:results|options|matches|listings|places|properties|pgs))?"
+    r"(?:\s+please)?[\s.!]*$",
+    re.IGNORECASE,
+)
+_SHOW_MORE_RE = re.compile(
+    r"^\s*(?:ok(?:ay)?[, ]+)?(?:please\s+)?(?:"
+    r"(?:(?:show|see|load|give)(?:\s+me)?\s+)?(?:some\s+)?more"
+    r"(?:\s+(?:results|options|matches|listings|places|properties|pgs))?"
+    r"|next(?:\s+page)?)(?:\s+please)?[\s.!]*$",
+    re.IGNORECASE,
+)
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 class ChatRequest(BaseModel):
     user_id: str
     message: str
+    # Client-generated per message; a retry with the same ID replays the first answer
+    message_id: Optional[str] = None
 
 
 def _empty_session() -> dict:
     return {
-        "location": "", "rent_price_inr_per_month": 0, "property_type": None,
+        "location": "", "area_id": 0, "rent_price_inr_per_month": 0, "property_type": None,
         "persona": None, "size_bhk": 0, "total_sqft": 0, "furnishing": "",
         "marital_status": "", "family_hubs": [], "structure": "",
         "Sharing": 0, "gender_preference": "", "nearby_hub": "",
@@ -80,6 +189,8 @@ def _empty_session() -> dict:
         "two_wheeler_parking": False, "four_wheeler_parking": False,
         "gym_nearby": False, "food_included": False,
         "has_wifi": False, "has_washing_machine": False,
+        "asked": [],
+        "search_cursor": "",
         "history": [],
     }
 
@@ -93,6 +204,64 @@ def _detect_persona(msg: str) -> Optional[str]:
     return None
 
 
+def _consultant_messages(session: dict, msg: str, model: str) -> list:
+    known_summary = ", ".join(
+        f"{k}: {v}" for k, v in session.items()
+        if v not in (0, "", None, [], False) and k not in ("history", "area_id", "asked", "search_cursor")
+    )
+
+    system_prompt_fn = (
+        get_pg_system_prompt if session.get("persona") == "pg" else get_system_prompt
+    )
+    system_msg = system_prompt_fn(session, [])
+    system_msg += f"\n\n### GROUND TRUTH — DO NOT RE-ASK:\n{known_summary}"
+
+    market = market_cube.for_session(session)
+    if market is not None:
+        system_msg += f"\n\n### MARKET DATA (real listings — quote if rent comes up):\n{market_line(*market)}"
+
+    hubs = session.get("family_hubs", [])
+    if len(hubs) >= 2:
+        system_msg += (
+            f"\n\n### MIDPOINT ADVISOR: Family commutes to {', '.join(hubs)}."
+            f" Recommend the midpoint. Don't prioritise stated location."
+        )
+
+    system_msg += (
+        "\n\n### OUTPUT RULES (STRICT):"
+        "\n1. Do NOT print any requirements list, dashboard, or header."
+        "\n2. Do NOT print 'Your Tatva PG Selections' or any similar header."
+        "\n3. Start directly with the conversational message."
+        "\n4. Ask EXACTLY 2 questions bundled in one reply (follow the phase strategy)."
+        "\n5. When ready to show listings, say: 'Ready to see your matches? Just say show me! 🏠🔥'"
+    )
+
+    return [
+        {"role": "system", "content": system_msg},
+        *pack_history(session["history"], model),
+        {"role": "user", "content": msg},
+    ]
+
+
+_MARKET_FIELDS = frozenset({"rent_price_inr_per_month", "location", "size_bhk", "Sharing", "furnishing"})
+
+
+def _budget_reality_check(session: dict) -> str | None:
+    """The market note when the session's budget is below nearly every listing like it."""
+    market = market_cube.for_session(session)
+    if market is None:
+        return None
+    return budget_note(*market, safe_int(session.get("rent_price_inr_per_month"), 0))
+
+
+def _remember_turn(session: dict, msg: str, reply: str) -> None:
+    """History is model-facing: the reply is stored without dashboard or emoji."""
+    session["history"] += [
+        {"role": "user",      "content": msg},
+        {"role": "assistant", "content": compact_reply(reply)},
+    ]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # FIX [1]: Dashboard — no border, plain list, BHK hidden for PG persona
 # ─────────────────────────────────────────────────────────────────────────────
@@ -162,58 +331,6 @@ def _build_dashboard(session: dict) -> str:
     return "📋 Your Requirements So Far:\n" + "\n".join(f"  {l}" for l in lines)
 
 
-# ─────────────────────────────────────────────────────────────────────────────
-# JSON parser
-# ─────────────────────────────────────────────────────────────────────────────
-def _strip_comments(s: str) -> str:
-    return re.sub(r"\s*//[^\n\"]*", "", s)
-
-
-def _parse_json_from_text(text: str) -> dict:
-    if not text:
-        return {}
-    text = re.sub(r"```json\s*", "", text)
-    text = re.sub(r"```\s*",     "", text)
-    text = text.strip()
-    for candidate in [text, _strip_comments(text)]:
-        try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
-            pass
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    if match:
-        for candidate in [match.group(0), _strip_comments(match.group(0))]:
-            try:
-                return json.loads(candidate)
-            except json.JSONDecodeError:
-                pass
-    return {}
-
-
-# ─────────────────────────────────────────────────────────────────────────────
-# FIX [2]: Strip ALL LLM-generated dashboard variants (Home AND PG)
-# ─────────────────────────────────────────────────────────────────────────────
-def _strip_llm_dashboard(text: str) -> str:
-    # Strip block headers (home dashboard, PG dashboard, any box)
-    text = re.sub(
-        r"(?:###\s*(?:STATUS DASHBOARD|📋[^\n]*)|╔═[^\n]*╗|✨\s*Your Tatva PG Selections[^\n]*)[\s\S]*?(?:╚[^\n]*╝\n?|(?=\n\n[A-Z])|\Z)",
-        "", text, flags=re.IGNORECASE,
-    ).strip()
-
-    # Strip standalone "✨ Your Tatva PG Selections:" line (no block following)
-    text = re.sub(r"✨\s*Your Tatva PG Selections[^\n]*\n?", "", text, flags=re.IGNORECASE).strip()
-
-    # Strip inline emoji-label lines (home and PG variants)
-    text = re.sub(
-        r"(?:📍|🛏️|💰|📐|🛋️|👫|🏢|🚿|🌿|✅|🤝|🚻|🏍️|🚗|💪|🍱|📶|🫧|👦|👧|🏫)[^\n]*\n?",
-        "", text,
-    ).strip()
-
-    # Collapse blank lines
-    text = re.sub(r"\n{3,}", "\n\n", text).strip()
-    return text
-
-
 # ─────────────────────────────────────────────────────────────────────────────
 # Merge extracted data into session
 # ─────────────────────────────────────────────────────────────────────────────
@@ -373,7 +490,6 @@ def _repair_session_from_history(session: dict) -> None:
 
     # Location (both)
     if not session.get("location"):
-        from location_areas import normalise_area
         loc_match = re.search(
             r"\b(?:at|in|near|around)\s+([A-Za-z][A-Za-z\s]{2,25}?)(?:\s*[,\.\!]|\s*$)",
             " ".join(user_msgs), re.IGNORECASE,
@@ -385,14 +501,49 @@ def _repair_session_from_history(session: dict) -> None:
                 session["location"] = normalised
 
 
+def _sync_area_id(session: dict) -> None:
+    """Keeps session["area_id"] in step with session["location"] (0 = unresolved)."""
+    session["area_id"] = area_id_for(session.get("location") or "") or 0
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Chat endpoint
 # ─────────────────────────────────────────────────────────────────────────────
 @app.post("/chat")
 async def chat_handler(request: ChatRequest):
-    u_id = request.user_id
-    msg  = request.message
+    # One turn at a time per user (the session dict is shared state); the turn
+    # itself blocks on Groq / Supabase, so it runs on a worker thread.
+    return await turn_gate.run(
+        request.user_id, request.message_id,
+        lambda: asyncio.get_running_loop().run_in_executor(
+            turn_executor, _chat_turn, request.user_id, request.message,
+        ),
+    )
+
+
+def _chat_turn(u_id: str, msg: str) -> JSONResponse:
+    # Every external call below is capped by its stage deadline and this turn budget
+    try:
+        with turn_budget():
+            return _answer_turn(u_id, msg)
+    finally:
+        _settle_filters(u_id)
+
+
+def _settle_filters(u_id: str) -> None:
+    """
+    Publishes the user's filters for /facets and /map/clusters. Runs at the end
+    of the turn, still inside the user's lane, so readers never see a session
+    a turn is halfway through changing.
+    """
+    session = user_sessions.get(u_id)
+    if session is not None and session.get("persona") in FACETS:
+        settled_specs[u_id] = SearchSpec.from_session(session, partial=True)
+    else:
+        settled_specs.pop(u_id, None)
 
+
+def _answer_turn(u_id: str, msg: str) -> JSONResponse:
     greetings = {"hi", "hello", "hii", "hey", "reset", "start"}
     is_greeting = (msg.lower().strip() in greetings) or (
         any(g in msg.lower() for g in greetings) and len(msg.split()) <= 3
@@ -400,6 +551,7 @@ async def chat_handler(request: ChatRequest):
 
     if is_greeting or u_id not in user_sessions:
         user_sessions[u_id] = _empty_session()
+        listing_search.forget(u_id)
         if is_greeting:
             return JSONResponse(content={
                 "response": (
@@ -414,90 +566,77 @@ async def chat_handler(request: ChatRequest):
 
     session = user_sessions[u_id]
 
+    before = field_snapshot(session)
+
     # Detect persona BEFORE extractor runs
     if not session.get("persona"):
         session["persona"] = _detect_persona(msg)
 
     try:
+        # "show more" continues the last result list — nothing to extract or consult
+        if _SHOW_MORE_RE.match(msg) and session.get("search_cursor"):
+            spec = SearchSpec.from_session(session)
+            if spec is not None:
+                return _next_page_turn(u_id, session, spec)
+
         # ══════════════════════════════════════════════════════════════════
         # BRAIN 1 — SLM Extractor
         # ══════════════════════════════════════════════════════════════════
-        extraction_messages = [
-            {"role": "system", "content": get_extraction_prompt(session)}
-        ]
-        for entry in session["history"][-4:]:
-            if isinstance(entry, dict) and entry.get("role") in ("user", "assistant"):
-                extraction_messages.append(entry)
-        extraction_messages.append({"role": "user", "content": msg})
-
-        try:
-            extract_completion = groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=extraction_messages,
-                temperature=0,
-                max_tokens=400,
-            )
-            raw_text = extract_completion.choices[0].message.content or ""
-            raw_extracted = _parse_json_from_text(raw_text)
-            if raw_extracted:
-                _merge_extracted_into_session(raw_extracted, session, msg)
-        except Exception:
-            print("\n⚠️  EXTRACTOR ERROR (non-fatal):")
-            traceback.print_exc()
+        # A bare "show me" carries no fields — don't make the user wait on the extractor
+        if not (_BARE_SHOW_RE.match(msg) or _SHOW_MORE_RE.match(msg)):
+            extraction_messages = [
+                {"role": "system", "content": get_extraction_prompt(session)},
+                *pack_history(session["history"], EXTRACTOR_MODEL),
+                {"role": "user", "content": msg},
+            ]
+
+            try:
+                # None when the stage is unavailable — history repair below still runs
+                extract_completion = complete_llm(
+                    "extractor", PRIORITY_CRITICAL,
+                    model=EXTRACTOR_MODEL,
+                    messages=extraction_messages,
+                    temperature=0,
+                    max_tokens=EXTRACTION_MAX_TOKENS,
+                    response_format=EXTRACTION_RESPONSE_FORMAT,
+                    fallback=None,
+                )
+                if extract_completion is not None:
+                    # JSON mode: the content is one compact object (ai_tools.py)
+                    raw_extracted = decode_extraction(
+                        extract_completion.choices[0].message.content, session.get("persona"),
+                    )
+                    if raw_extracted:
+                        _merge_extracted_into_session(raw_extracted, session, msg)
+            except Exception:
+                print("\n⚠️  EXTRACTOR ERROR (non-fatal):")
+                traceback.print_exc()
 
         # History fallback
         _repair_session_from_history(session)
+        _sync_area_id(session)
 
         # ══════════════════════════════════════════════════════════════════
         # BRAIN 2 — LLM Consultant
         # ══════════════════════════════════════════════════════════════════
-        hubs = session.get("family_hubs", [])
-        known_summary = ", ".join(
-            f"{k}: {v}" for k, v in session.items()
-            if v not in (0, "", None, [], False) and k != "history"
-        )
-
-        system_prompt_fn = (
-            get_pg_system_prompt if session.get("persona") == "pg" else get_system_prompt
-        )
-        system_msg = system_prompt_fn(session, [])
-        system_msg += f"\n\n### GROUND TRUTH — DO NOT RE-ASK:\n{known_summary}"
-
-        if len(hubs) >= 2:
-            system_msg += (
-                f"\n\n### MIDPOINT ADVISOR: Family commutes to {', '.join(hubs)}."
-                f" Recommend the midpoint. Don't prioritise stated location."
-            )
-
-        system_msg += (
-            "\n\n### OUTPUT RULES (STRICT):"
-            "\n1. Do NOT print any requirements list, dashboard, or header."
-            "\n2. Do NOT print 'Your Tatva PG Selections' or any similar header."
-            "\n3. Start directly with the conversational message."
-            "\n4. Ask EXACTLY 2 questions bundled in one reply (follow the phase strategy)."
-            "\n5. When ready to show listings, say: 'Ready to see your matches? Just say show me! 🏠🔥'"
+        # "show me" turns answer with listings or a missing-field nudge, never
+        # with the consultant's reply — don't spend a 70B call on them
+        user_wants_show = bool(
+            re.search(r"\b(show|list|search|find|ok show|show me)\b", msg.lower())
         )
-
-        consultant_messages = [{"role": "system", "content": system_msg}]
-        for entry in session["history"][-4:]:
-            if isinstance(entry, dict) and entry.get("role") in ("user", "assistant"):
-                consultant_messages.append(entry)
-        consultant_messages.append({"role": "user", "content": msg})
-
-        try:
-            chat_completion = groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=consultant_messages,
-            )
-        except Exception:
-            traceback.print_exc()
-            return JSONResponse(content={
-                "response": "Checking my database but things are a bit slow right now. Try again in 5 seconds! ⏳",
-                "status": "incomplete", "data": session,
-            })
-
-        bot_reply = chat_completion.choices[0].message.content
-        bot_reply = _strip_llm_dashboard(bot_reply)
+        bot_reply = ""
+        degraded = False
+        if not user_wants_show:
+            # Phase engine for on-script turns, 8B / 70B otherwise (model_router.py)
+            bot_reply = consult(lambda model: _consultant_messages(session, msg, model), session, msg, before)
+            changed = changed_fields(before, session)
+            if bot_reply is None:
+                bot_reply = next_reply(session, changed)
+                degraded = True
+            if changed & _MARKET_FIELDS:
+                note = _budget_reality_check(session)
+                if note:
+                    bot_reply = f"{bot_reply}\n\n{note}"
         dashboard = _build_dashboard(session)
         if dashboard:
             bot_reply = f"{dashboard}\n\n{bot_reply}"
@@ -505,162 +644,36 @@ async def chat_handler(request: ChatRequest):
         # ══════════════════════════════════════════════════════════════════
         # SEARCH TRIGGER — explicit user command only
         # ══════════════════════════════════════════════════════════════════
-        persona = session.get("persona")
-        target_table = "PG_Listings" if persona == "pg" else "properties"
-
-        if persona == "pg":
-            essentials = ["rent_price_inr_per_month", "Sharing", "gender_preference"]
-        else:
-            essentials = ["rent_price_inr_per_month", "size_bhk"]
-            if len(hubs) < 2:
-                essentials.append("location")
-
-        has_enough_data = all(
-            session.get(k) not in (0, "", None, []) for k in essentials
-        )
-        user_wants_show = bool(
-            re.search(r"\b(show|list|search|find|ok show|show me)\b", msg.lower())
-        )
+        spec = SearchSpec.from_session(session)
 
-        if user_wants_show and has_enough_data:
-            query = supabase.table(target_table).select("*")
-
-            # ── PG-specific DB filters ─────────────────────────────────────
-            if persona == "pg":
-                # Sharing count (stored as size_bhk in PG table)
-                sharing_count = safe_int(session.get("Sharing") or session.get("size_bhk"), 1)
-                query = query.eq("size_bhk", sharing_count)
-
-                # Gender — PG table uses 'preferred_tenants'
-                gender = session.get("gender_preference", "")
-                if gender:
-                    # Unisex PGs should show for everyone; gender-specific PGs filter strictly
-                    if gender != "Unisex":
-                        query = query.in_("preferred_tenants", [gender, "Unisex"])
-
-                # Budget
-                budget = safe_int(session.get("rent_price_inr_per_month"), 0)
-                if budget > 0:
-                    query = query.lte("rent_price_inr_per_month", budget)
-
-                # Location
-                if session.get("location"):
-                    query = query.ilike("location", f"%{session['location']}%")
-
-                # Optional amenity filters
-                if session.get("food_included"):
-                    query = query.eq("food_included", True)
-                if session.get("gym_nearby"):
-                    query = query.eq("has_gym", True)
-
-                # Nearby hub
-                if session.get("nearby_hub"):
-                    query = query.ilike("nearby_hub", f"%{session['nearby_hub']}%")
-
-            # ── Home-specific DB filters ───────────────────────────────────
-            else:
-                family_coords = []
-                for hub in hubs:
-                    try:
-                        c = get_coordinates(hub)
-                        if c and c.get("lat") and c.get("lng"):
-                            family_coords.append({"name": hub, **c})
-                    except Exception:
-                        print(f"⚠️ Geocoding failed: {hub}")
-
-                using_midpoint = False
-                midpoint_lat = midpoint_lng = None
-                recommendation_text = ""
-                transport_text = ""
-
-                if len(family_coords) >= 2:
-                    try:
-                        midpoint_lat = sum(c["lat"] for c in family_coords) / len(family_coords)
-                        midpoint_lng = sum(c["lng"] for c in family_coords) / len(family_coords)
-                        hub_names = ", ".join(c["name"] for c in family_coords)
-                        query = (
-                            query
-                            .gte("latitude",  midpoint_lat - 0.04).lte("latitude",  midpoint_lat + 0.04)
-                            .gte("longitude", midpoint_lng - 0.04).lte("longitude", midpoint_lng + 0.04)
-                        )
-                        recommendation_text = (
-                            f"\n\n💡 **Tatva Midpoint Choice:**\n"
-                            f"Optimal midpoint between **{hub_names}** — "
-                            f"saves everyone daily commute time and transport cost! 🚀"
-                        )
-                        using_midpoint = True
-                        if GOOGLE_API_KEY:
-                            transport_text = format_transport_for_area(
-                                "Midpoint Area", midpoint_lat, midpoint_lng, GOOGLE_API_KEY
-                            )
-                    except Exception:
-                        traceback.print_exc()
-
-                if not using_midpoint and session.get("location"):
-                    query = query.ilike("location", f"%{session['location']}%")
-
-                raw_size = session.get("size_bhk")
-                search_size = safe_int(raw_size) if raw_size and raw_size != 0 else 1
-                query = query.eq("size_bhk", search_size)
-
-                budget = safe_int(session.get("rent_price_inr_per_month"), 0)
-                if budget > 0:
-                    query = query.lte("rent_price_inr_per_month", budget)
-
-            # ── Execute ────────────────────────────────────────────────────
+        if user_wants_show and spec is not None:
+            # Prefetched when the essentials completed, or refined locally from
+            # the last search's candidates (search.py)
             try:
-                result   = query.limit(15).execute()
-                res_data = result.data
+                found = listing_search.find(u_id, spec, stage_timeout("db"))
             except Exception as db_err:
-                traceback.print_exc()
-                return JSONResponse(status_code=500, content={
-                    "response": "Database connection error. Please try again.",
-                    "status": "error", "debug": str(db_err),
-                })
+                return _db_error(db_err)
 
-            if not res_data:
+            session["search_cursor"] = found.cursor(spec)
+            if not found.rows:
                 try:
-                    fallback_msg = get_smart_suggestions(session, supabase)
+                    market = market_cube.for_session(session)
+                    fallback_msg = call("recommender", get_smart_suggestions, session, supabase,
+                                        market_line(*market) if market is not None else "")
                 except Exception:
                     traceback.print_exc()
                     fallback_msg = (
                         "Hmm, no exact matches right now 🤔 "
                         "Want to bump the budget a little or try a nearby area?"
                     )
-                session["history"] += [
-                    {"role": "user",      "content": msg},
-                    {"role": "assistant", "content": fallback_msg},
-                ]
+                _remember_turn(session, msg, fallback_msg)
                 reply = f"{dashboard}\n\n{fallback_msg}" if dashboard else fallback_msg
                 return JSONResponse(content={"response": reply, "status": "incomplete", "data": session})
 
-            formatted = []
-            for item in res_data:
-                rent = safe_int(item.get("rent_price_inr_per_month"))
-                sqft = safe_int(item.get("total_sqft"))
-                if rent == 0:
-                    continue
-                item["formatted_rent"] = f"₹{rent:,}"
-                item["display_sqft"]   = f"{sqft} sqft" if sqft > 0 else "Area not specified"
-                formatted.append(item)
-
-            rec_text = recommendation_text if persona != "pg" else ""
-            t_text   = transport_text      if persona != "pg" else ""
-
-            final_msg = (
-                f"{dashboard}\n\n"
-                f"🎉 Found **{len(formatted)} matches** for you!"
-                f"{rec_text}{t_text}"
-            )
-            return JSONResponse(content={
-                "response":   final_msg,
-                "status":     "complete",
-                "properties": formatted,
-                "data":       session,
-            })
+            return _results_response(session, found, dashboard)
 
-        elif user_wants_show and not has_enough_data:
-            missing = [k for k in essentials if session.get(k) in (0, "", None, [])]
+        elif user_wants_show:
+            missing = missing_essentials(session)
             friendly = {
                 "rent_price_inr_per_month": "your budget 💰",
                 "Sharing": "sharing type (single/double/triple) 🤝",
@@ -670,18 +683,16 @@ async def chat_handler(request: ChatRequest):
             }
             missing_str = " and ".join(friendly.get(k, k) for k in missing)
             reply = f"{dashboard}\n\nAlmost there! 🙌 Just tell me **{missing_str}** and we're ready to go!"
-            session["history"] += [
-                {"role": "user",      "content": msg},
-                {"role": "assistant", "content": reply},
-            ]
+            _remember_turn(session, msg, reply)
             return JSONResponse(content={"response": reply, "status": "incomplete", "data": session})
 
-        # Normal conversational turn
-        session["history"] += [
-            {"role": "user",      "content": msg},
-            {"role": "assistant", "content": bot_reply},
-        ]
-        return JSONResponse(content={"response": bot_reply, "status": "incomplete", "data": session})
+        # Normal conversational turn — start the search if the filters are complete
+        listing_search.prefetch(u_id, spec)
+        _remember_turn(session, msg, bot_reply)
+        content = {"response": bot_reply, "status": "incomplete", "data": session}
+        if degraded:
+            content["degraded"] = True
+        return JSONResponse(content=content)
 
     except Exception:
         print("\n💥 FATAL UNHANDLED ERROR:")
@@ -689,4 +700,203 @@ async def chat_handler(request: ChatRequest):
         return JSONResponse(status_code=500, content={
             "response": "Oops! A backend hiccup — please try again! 🔄",
             "status": "error",
-        })
\ No newline at end of file
+        })
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Result pages
+# ─────────────────────────────────────────────────────────────────────────────
+def _db_error(db_err: Exception) -> JSONResponse:
+    traceback.print_exc()
+    return JSONResponse(status_code=500, content={
+        "response": "Database connection error. Please try again.",
+        "status": "error", "debug": str(db_err),
+    })
+
+
+def _results_response(session: dict, found: SearchResult, dashboard: str) -> JSONResponse:
+    # Rows are cached candidates — cards are new dicts, the rows stay untouched
+    cards = [
+        to_card(row, fit) for row, fit in zip(found.rows, found.fit or [None] * len(found.rows))
+        if safe_int(row.get("rent_price_inr_per_month")) > 0
+    ]
+
+    first, last = found.offset + 1, found.offset + len(found.rows)
+    if found.offset:
+        of_total = f" of {found.total}" if found.total is not None else ""
+        headline = f"📄 Matches **{first}–{last}**{of_total}"
+    elif found.total is not None:
+        headline = f"🎉 Found **{found.total} matches** for you!"
+    else:
+        headline = f"🎉 Here are your top **{len(cards)} matches**!"
+    if found.restarted:
+        headline = f"🔄 The listings changed since your last page, so here they are again from the top.\n\n{headline}"
+    if session.get("persona") != "pg":
+        headline += found.recommendation_text
+    job = None
+    if not found.offset and cards:
+        area = AREA_NAMES.get(session.get("area_id") or 0) or session.get("location") or ""
+        job = submit_transport(found.origin, area)
+        if job is not None and job.status == "done":
+            headline += job.result.get("transport_text") or ""   # a recent search already looked it up
+            job = None
+    if found.more:
+        order = "best fit first" if found.ranked else "cheapest first"
+        headline += f"\n\nShowing {first}–{last}, {order}. Say **show more** for the next ones 👀"
+    elif found.offset:
+        headline += "\n\nThat's all of them! Tweak the budget or area to see different options 🔄"
+
+    content = {
+        "response":   f"{dashboard}\n\n{headline}" if dashboard else headline,
+        "status":     "complete",
+        "properties": cards,
+        "data":       session,
+    }
+    if job is not None:
+        content["enrichment"] = job.snapshot()
+    return JSONResponse(content=content)
+
+
+def _next_page_turn(u_id: str, session: dict, spec: SearchSpec) -> JSONResponse:
+    """"show more": the page after session["search_cursor"] — no LLM call."""
+    try:
+        found = listing_search.next_page(u_id, spec, session["search_cursor"], stage_timeout("db"))
+    except Exception as db_err:
+        return _db_error(db_err)
+    session["search_cursor"] = found.cursor(spec)
+    dashboard = _build_dashboard(session)
+    if not found.rows:
+        reply = (
+            f"That's all **{found.total} matches** 🙌 Tweak the budget or area to see different options 🔄"
+            if found.total else
+            "Hmm, no exact matches right now 🤔 Want to bump the budget a little or try a nearby area?"
+        )
+        reply = f"{dashboard}\n\n{reply}" if dashboard else reply
+        return JSONResponse(content={"response": reply, "status": "incomplete", "data": session})
+    return _results_response(session, found, dashboard)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Listing details (cards carry only what the result list renders)
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/listing/{listing_id}")
+async def listing_details(listing_id: str, persona: Optional[str] = None):
+    try:
+        listing = await asyncio.to_thread(listing_search.details.get, listing_id, persona)
+    except Exception as db_err:
+        return _db_error(db_err)
+    if listing is None:
+        return JSONResponse(status_code=404, content={"status": "error", "detail": "Listing not found"})
+    return {"listing": listing}
+
+
+@app.get("/listing/{listing_id}/similar")
+async def similar_listings(listing_id: str, persona: Optional[str] = None, budget: int = 0, limit: int = 6):
+    """Cards most like this listing, nearest first (same table; at or under budget when given)."""
+    if persona is not None and persona not in FACETS:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": f"Unknown persona: {persona}"})
+    if not similar_index.ready():
+        return JSONResponse(status_code=503, content={"status": "error", "detail": "Similarity index is loading"})
+    similar = similar_index.similar(listing_id, persona, budget, limit)
+    if similar is None:
+        return JSONResponse(status_code=404, content={"status": "error", "detail": "Listing not found"})
+    return {"listing_id": listing_id, "similar": similar}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Facet counts
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/facets")
+async def facet_counts(user_id: str, select: list[str] = Query(default=[])):
+    """
+    Matches per facet value for the user's current filters. select narrows
+    further: "furnishing:Semi-Furnished,Fully Furnished", "has_ac:true"
+    (values of one facet OR'd, facets AND'd; repeat the parameter per facet).
+    """
+    spec = settled_specs.get(user_id)
+    if spec is None:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": "Persona not chosen yet"})
+    persona = spec.persona
+    selected: dict[str, set] = {}
+    for item in select:
+        facet, _, values = item.partition(":")
+        if facet not in FACETS[persona] or not values:
+            return JSONResponse(status_code=400, content={"status": "error", "detail": f"Unknown facet: {item}"})
+        selected.setdefault(facet, set()).update(v.strip() for v in values.split(","))
+
+    # The midpoint is only known once a search has geocoded the hubs
+    cands = listing_search.candidates.covering(user_id, spec)
+    counts = facet_index.counts(spec, selected, cands.origin if cands is not None else None)
+    if counts is None:
+        return JSONResponse(status_code=503, content={"status": "error", "detail": "Facet index is loading"})
+    return {"persona": persona, **counts}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Map clusters
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/map/clusters")
+async def map_clusters(bbox: str, zoom: int, persona: Optional[str] = None, user_id: Optional[str] = None):
+    """
+    Listings inside bbox ("west,south,east,north") grouped per screen cell at
+    this zoom. With user_id, only those matching the user's filters (and the
+    user's persona unless one is given); otherwise all homes.
+    """
+    box = parse_bbox(bbox)
+    if box is None:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": "bbox must be west,south,east,north"})
+    settled = settled_specs.get(user_id) if user_id else None
+    persona = persona or (settled.persona if settled is not None else "home")
+    if persona not in FACETS:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": f"Unknown persona: {persona}"})
+    spec = origin = None
+    if settled is not None and settled.persona == persona:
+        spec = settled
+        cands = listing_search.candidates.covering(user_id, spec)
+        origin = cands.origin if cands is not None else None
+    found = facet_index.clusters(persona, box, zoom, spec, origin)
+    if found is None:
+        return JSONResponse(status_code=503, content={"status": "error", "detail": "Map index is loading"})
+    return found
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Background enrichments (long poll)
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, wait: float = 0):
+    """The job's status — held up to `wait` seconds (max 25) while it is still running."""
+    job = await enrichment_jobs.wait(job_id, wait)
+    if job is None:
+        return JSONResponse(status_code=404, content={"status": "error", "detail": "Job not found or expired"})
+    return job.snapshot()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Area autocomplete
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/areas/suggest")
+async def suggest_areas(q: str = "", limit: int = 8):
+    names = area_trie.suggest(q, max(1, min(limit, 10)))
+    return {
+        "query": q,
+        "suggestions": [
+            {"area": n, "area_id": AREA_IDS[n], "listings": area_trie.counts.get(n, 0)}
+            for n in names
+        ],
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Metrics (Prometheus text format)
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(
+        render_metrics(groq_scheduler.metrics(), turn_gate.snapshot(), resilience_snapshot(),
+                       router_stats.snapshot(), {**listing_search.snapshot(), "facets": facet_index.snapshot(),
+                                                       "market": market_cube.snapshot(),
+                                                       "jobs": enrichment_jobs.snapshot(),
+                                                       "similar": similar_index.snapshot()}),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -0,0 +1,101 @@
+"""
+map_clusters.py — Grid clusters of listings for the map, at any zoom, in a constant-size payload.
+
+MidpointMap.jsx used to get one marker per listing from /chat — fine for a
+page of 15, useless for a whole area. GridIndex projects every listing once
+(Web Mercator, the projection Google Maps draws in) and precomputes, for
+each zoom in ZOOMS, the CELL_PX × CELL_PX screen cell it falls in. A query
+is then
+
+    bbox mask (and the session's filters)  →  group by cell  →  one cluster per cell
+
+all in numpy. A viewport only spans so many cells, so the answer is bounded
+by the screen, not by the number of listings (MAX_CLUSTERS caps it anyway).
+Each cluster carries its count, mean position and rent range; a
+single-listing cluster carries the listing_id, so the map can open its card.
+
+The index lives with the facet index (facets.py), which already holds the
+coordinates of every home listing; PG rows have none (listing_cards.py).
+
+Usage:
+    grid = GridIndex(lat, lng, rents)                        # numpy arrays, facet-index row order
+    grid.clusters(grid.within(bbox) & mask, zoom=14, ids=listing_ids)
+        → {"zoom": 14, "total": 312, "clusters": [{"lat": …, "lng": …, "count": 40,
+           "min_rent": 18000, "max_rent": 52000}, …], "truncated": False}
+    parse_bbox("77.55,12.90,77.68,12.99")                    → (west, south, east, north) | None
+"""
+
+import math
+
+import numpy as np
+
+ZOOMS = range(10, 19)            # Google Maps zoom levels; others clamp to this range
+TILE_PX = 256
+CELL_PX = 64                     # one cluster per 64 × 64 screen pixels
+MAX_CLUSTERS = 500
+
+
+def parse_bbox(raw: str) -> tuple | None:
+    """"west,south,east,north" in degrees → tuple, or None when malformed."""
+    try:
+        west, south, east, north = (float(v) for v in raw.split(","))
+    except ValueError:
+        return None
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        return None
+    return west, south, east, north
+
+
+def _world(lat: np.ndarray, lng: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Web Mercator world coordinates in [0, 1) — x east, y south."""
+    siny = np.clip(np.sin(np.radians(lat)), -0.9999, 0.9999)
+    x = (lng + 180.0) / 360.0
+    y = 0.5 - np.log((1 + siny) / (1 - siny)) / (4 * math.pi)
+    return x, y
+
+
+class GridIndex:
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, rents: np.ndarray):
+        self.lat = lat
+        self.lng = lng
+        self.rents = rents
+        self.valid = ~(np.isnan(lat) | np.isnan(lng))
+        with np.errstate(invalid="ignore"):
+            x, y = _world(np.nan_to_num(lat), np.nan_to_num(lng))
+        # Cell key per zoom: column << 32 | row (rows without coordinates never match `valid`)
+        self.cells = {}
+        for zoom in ZOOMS:
+            per_world = (TILE_PX << zoom) // CELL_PX
+            self.cells[zoom] = ((x * per_world).astype(np.int64) << 32) | (y * per_world).astype(np.int64)
+
+    def within(self, bbox: tuple) -> np.ndarray:
+        west, south, east, north = bbox
+        with np.errstate(invalid="ignore"):
+            return (self.valid & (self.lat >= south) & (self.lat <= north)
+                    & (self.lng >= west) & (self.lng <= east))
+
+    def clusters(self, mask: np.ndarray, zoom: int, ids: list) -> dict:
+        zoom = min(max(zoom, ZOOMS.start), ZOOMS.stop - 1)
+        rows = np.flatnonzero(mask)
+        keys, inverse, counts = np.unique(self.cells[zoom][rows], return_inverse=True, return_counts=True)
+        lat = np.bincount(inverse, weights=self.lat[rows]) / counts
+        lng = np.bincount(inverse, weights=self.lng[rows]) / counts
+        rents = self.rents[rows]
+        low = np.full(len(keys), np.inf)
+        high = np.zeros(len(keys))
+        np.minimum.at(low, inverse, rents)
+        np.maximum.at(high, inverse, rents)
+        last = np.zeros(len(keys), np.int64)
+        last[inverse] = rows                             # any member — only read when it's the only one
+
+        order = np.argsort(-counts, kind="stable")[:MAX_CLUSTERS]
+        clusters = []
+        for c in order.tolist():
+            cluster = {
+                "lat": round(float(lat[c]), 6), "lng": round(float(lng[c]), 6), "count": int(counts[c]),
+                "min_rent": int(low[c]), "max_rent": int(high[c]),
+            }
+            if counts[c] == 1:
+                cluster["listing_id"] = ids[int(last[c])]
+            clusters.append(cluster)
+        return {"zoom": zoom, "total": int(len(rows)), "clusters": clusters, "truncated": len(keys) > MAX_CLUSTERS}
@@ -0,0 +1,203 @@
+"""
+market_stats.py — Rent statistics per (persona, area, size, furnishing), kept in memory.
+
+The bot used to learn what rent is realistic only from a zero-result search.
+MarketCube holds, for every cell of
+
+    persona × area_id × size (BHK / sharing) × furnishing
+
+and the roll-ups with any of the last three left open (area_id 0, size 0,
+furnishing ""), the cell's rents as one sorted array('i') — ~4 bytes per
+listing per cell, 8 cells per listing. A lookup is a dict get: count and
+percentiles are index arithmetic on the sorted array, "how many fit the
+budget" one bisect.
+
+The cube is fed by the facet index's table load (facets.py — no query of its
+own). The first load builds it; every refresh after that (the listing sync
+re-stamping area IDs, new or re-priced listings) applies only the listings
+whose cell or rent changed.
+
+Usage:
+    cube = MarketCube()
+    cube.load("home", rows)                                  # FacetIndex on_load
+    stats = cube.lookup("home", area_id=12, size=3, budget=10000)
+        → RentStats(count=42, p10=38000, p25=45000, p50=55000, p75=70000, p90=85000, within_budget=0)
+    cube.for_session(session)                                → (RentStats, "3BHK homes in Koramangala") | None
+    budget_note(stats, label, budget)                        → "📊 Reality check: …" | None
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import NamedTuple
+
+from location_areas import AREA_NAMES
+from utils import safe_int
+
+MIN_LISTINGS = 5                 # fewer in a cell → too thin to quote
+PERCENTILES = (10, 25, 50, 75, 90)
+
+_SHARING_LABELS = {1: "Single", 2: "Double", 3: "Triple", 4: "Four"}
+
+
+class RentStats(NamedTuple):
+    count: int
+    p10: int
+    p25: int
+    p50: int
+    p75: int
+    p90: int
+    within_budget: int | None = None     # listings at or under the budget asked about
+
+
+def _furnishing(value) -> str:
+    """'Fully-Furnished' (session) and 'Fully Furnished' (DB) → 'fully furnished'."""
+    return str(value or "").replace("-", " ").strip().lower()
+
+
+def _cells(persona: str, area_id: int, size: int, furnishing: str):
+    """The cell a listing sits in plus its roll-ups (0 / "" = any)."""
+    for a in {area_id, 0}:
+        for s in {size, 0}:
+            for f in {furnishing, ""}:
+                yield persona, a, s, f
+
+
+def _percentile(rents: array, p: int) -> int:
+    return rents[min(len(rents) - 1, len(rents) * p // 100)]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cube
+# ─────────────────────────────────────────────────────────────────────────────
+class MarketCube:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells: dict[tuple, array] = {}
+        self._listings: dict[str, dict[str, tuple]] = {}     # persona → listing_id → (area, size, furn, rent)
+        self.stats = dict.fromkeys(("loads", "changed"), 0)
+
+    def load(self, persona: str, rows: list) -> None:
+        """Bring `persona`'s cells in line with `rows` (the whole table), touching only what changed."""
+        fresh = {}
+        for row in rows:
+            rent = safe_int(row.get("rent_price_inr_per_month"), 0)
+            if rent > 0:
+                fresh[row["listing_id"]] = (
+                    safe_int(row.get("area_id"), 0), safe_int(row.get("size_bhk"), 0),
+                    _furnishing(row.get("furnishing")), rent,
+                )
+        with self._lock:
+            old = self._listings.get(persona)
+            if old is None:
+                self._build(persona, fresh)
+                changed = len(fresh)
+            else:
+                changed = self._apply(persona, old, fresh)
+            self._listings[persona] = fresh
+            self.stats["loads"] += 1
+            self.stats["changed"] += changed
+
+    def _build(self, persona: str, fresh: dict) -> None:
+        cells: dict[tuple, list] = {}
+        for area_id, size, furnishing, rent in fresh.values():
+            for cell in _cells(persona, area_id, size, furnishing):
+                cells.setdefault(cell, []).append(rent)
+        for cell, rents in cells.items():
+            self._cells[cell] = array("i", sorted(rents))
+
+    def _apply(self, persona: str, old: dict, fresh: dict) -> int:
+        changed = 0
+        for listing_id in old.keys() | fresh.keys():
+            before, after = old.get(listing_id), fresh.get(listing_id)
+            if before == after:
+                continue
+            changed += 1
+            if before is not None:
+                *key, rent = before
+                for cell in _cells(persona, *key):
+                    rents = self._cells[cell]
+                    del rents[bisect_left(rents, rent)]
+                    if not rents:
+                        del self._cells[cell]
+            if after is not None:
+                *key, rent = after
+                for cell in _cells(persona, *key):
+                    insort(self._cells.setdefault(cell, array("i")), rent)
+        return changed
+
+    def lookup(self, persona: str, area_id: int = 0, size: int = 0, furnishing: str = "",
+               budget: int = 0) -> RentStats | None:
+        """The cell's rent statistics; None when it has fewer than MIN_LISTINGS listings."""
+        with self._lock:
+            rents = self._cells.get((persona, area_id, size, _furnishing(furnishing)))
+            if rents is None or len(rents) < MIN_LISTINGS:
+                return None
+            return RentStats(
+                len(rents), *(_percentile(rents, p) for p in PERCENTILES),
+                within_budget=bisect_right(rents, budget) if budget > 0 else None,
+            )
+
+    def for_session(self, session: dict) -> tuple[RentStats, str] | None:
+        """
+        (stats, label) for the session's area and size — with its furnishing
+        when that cell is big enough — or None while either is unknown.
+        """
+        persona = session.get("persona")
+        area_id = session.get("area_id") or 0
+        if persona == "pg":
+            size = safe_int(session.get("Sharing") or session.get("size_bhk"), 0)
+            label = f"{_SHARING_LABELS.get(size, size)}-sharing PGs"
+            furnishing = ""
+        elif persona == "home":
+            size = safe_int(session.get("size_bhk"), 0)
+            label = f"{size}BHK homes"
+            furnishing = session.get("furnishing") or ""
+        else:
+            return None
+        if not area_id or not size:
+            return None
+        budget = safe_int(session.get("rent_price_inr_per_month"), 0)
+        area = AREA_NAMES.get(area_id, "this area")
+        if furnishing:
+            stats = self.lookup(persona, area_id, size, furnishing, budget)
+            if stats is not None:
+                return stats, f"{furnishing.lower()} {label} in {area}"
+        stats = self.lookup(persona, area_id, size, budget=budget)
+        return (stats, f"{label} in {area}") if stats is not None else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "cells": len(self._cells),
+                "listings": sum(len(v) for v in self._listings.values()),
+            }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Wording
+# ─────────────────────────────────────────────────────────────────────────────
+def _rupees(amount: int) -> str:
+    """Quoted rents, rounded to ₹500."""
+    return f"₹{round(amount / 500) * 500:,}"
+
+
+def market_line(stats: RentStats, label: str) -> str:
+    """One line of real numbers for the consultant / recommender prompts."""
+    line = (f"{label}: {stats.count} listings, typical rent {_rupees(stats.p25)}–{_rupees(stats.p75)} "
+            f"(median {_rupees(stats.p50)})")
+    if stats.within_budget is not None:
+        line += f", {stats.within_budget} at or under the stated budget"
+    return line
+
+
+def budget_note(stats: RentStats, label: str, budget: int) -> str | None:
+    """A heads-up when the budget is below what all but the cheapest tenth of the cell costs."""
+    if budget <= 0 or budget >= stats.p10:
+        return None
+    fits = (f"only {stats.within_budget} of {stats.count} listings fit ₹{budget:,}"
+            if stats.within_budget else f"none of {stats.count} listings go for ₹{budget:,} or less")
+    return (f"📊 Reality check: {label} usually rent for {_rupees(stats.p25)}–{_rupees(stats.p75)} "
+            f"(median {_rupees(stats.p50)}) — {fits}. A budget around {_rupees(stats.p25)} opens up "
+            f"about a quarter of them; or I can look at a nearby area.")
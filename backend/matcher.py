@@ -0,0 +1,234 @@
+"""
+matcher.py — Compiled string matchers used by the area normaliser.
+
+  AhoCorasick  : multi-pattern substring automaton. One left-to-right pass over
+                 the text reports EVERY pattern occurrence (overlaps included),
+                 so N keywords cost one scan instead of N `in` checks.
+  TrigramIndex : fuzzy lookup. Terms one edit away are found first through
+                 a single-deletion index (a few dict lookups); only when
+                 none qualifies do trigram postings shortlist candidates for
+                 a Damerau-Levenshtein (OSA) distance. Only matches above a
+                 similarity threshold are returned.
+
+Both are pure Python and built once at import time by their callers.
+"""
+
+from collections import Counter, defaultdict, deque
+from itertools import chain
+from typing import Hashable, Iterator
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Aho–Corasick automaton
+# ─────────────────────────────────────────────────────────────────────────────
+class AhoCorasick:
+    """
+    Usage:
+        ac = AhoCorasick({"hsr": "HSR Layout", "hsr layout": "HSR Layout"})
+        list(ac.finditer("pg in hsr layout")) → [(6, 9, "HSR Layout"), (6, 16, "HSR Layout")]
+
+    Patterns are matched literally (callers lowercase both sides).
+    """
+
+    __slots__ = ("_goto", "_fail", "_out")
+
+    def __init__(self, patterns: dict[str, Hashable]):
+        # node 0 = root; _goto[n] maps char → child node
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[list[tuple[int, Hashable]]] = [[]]
+
+        for pattern, label in patterns.items():
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), label))
+
+        # BFS for failure links; fold each node's fail-chain outputs into it
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[tuple[int, int, Hashable]]:
+        """Yields (start, end, label) for every occurrence, in order of end offset."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for length, label in out[node]:
+                    yield i + 1 - length, i + 1, label
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fuzzy index
+# ─────────────────────────────────────────────────────────────────────────────
+def osa_distance(a: str, b: str, limit: int | None = None) -> int:
+    """
+    Optimal-string-alignment edit distance (insert / delete / substitute /
+    adjacent transposition). With `limit`, only the diagonal band |i - j| <= limit
+    is filled and limit + 1 is returned as soon as the distance must exceed it.
+    """
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if limit is None:
+        limit = max(la, lb)
+    if abs(la - lb) > limit:
+        return limit + 1
+
+    big = limit + 1
+    prev2: list[int] | None = None
+    prev = [j if j <= limit else big for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        lo, hi = max(1, i - limit), min(lb, i + limit)
+        cur = [big] * (lb + 1)
+        if i <= limit:
+            cur[0] = i
+        ca = a[i - 1]
+        row_min = cur[0]
+        for j in range(lo, hi + 1):
+            v = prev[j - 1] + (ca != b[j - 1])
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if cur[j - 1] + 1 < v:
+                v = cur[j - 1] + 1
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1] and prev2[j - 2] + 1 < v:
+                v = prev2[j - 2] + 1
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > limit:
+            return big
+        prev2, prev = prev, cur
+    return min(prev[lb], big)
+
+
+def _edit_distance_upto_one(a: str, b: str) -> int:
+    """osa_distance(a, b) when it is 0 or 1, else 2 — by slicing, no DP table."""
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if la < lb:
+        a, b, la, lb = b, a, lb, la
+    if la - lb > 1:
+        return 2
+    i = 0
+    while i < lb and a[i] == b[i]:
+        i += 1
+    if la != lb:
+        return 1 if a[i + 1:] == b[i:] else 2
+    if a[i + 1:] == b[i + 1:]:
+        return 1                                   # substitution
+    if i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]:
+        return 1                                   # adjacent transposition
+    return 2
+
+
+def _deletions(s: str) -> set[str]:
+    """s and every string one deletion away from it."""
+    return {s, *(s[:i] + s[i + 1:] for i in range(len(s)))}
+
+
+def _trigrams(s: str) -> set[str]:
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Usage:
+        idx = TrigramIndex({"koramangala": "Koramangala", "hsr layout": "HSR Layout"})
+        idx.best("koramnagala")  → ("Koramangala", 0.82)
+        idx.best("xyz")          → None
+
+    Similarity = 1 - distance / max(len(query), len(term)).
+
+    Two strings one edit apart (insert, delete, substitute, transpose) share
+    a string reachable from each by at most one deletion, so the deletion
+    index yields every term within distance 1. For queries of 3+ characters
+    such a term, if it clears the threshold, outscores anything further
+    away, and the trigram shortlist is skipped.
+    """
+
+    def __init__(self, terms: dict[str, Hashable], threshold: float = 0.8, shortlist: int = 5):
+        self.threshold = threshold
+        self.shortlist = shortlist
+        self._terms: list[tuple[str, Hashable]] = list(terms.items())
+        postings: dict[str, list[int]] = defaultdict(list)
+        for tid, (term, _) in enumerate(self._terms):
+            for gram in _trigrams(term):
+                postings[gram].append(tid)
+        self._postings = dict(postings)
+        deletes: dict[str, list[int]] = defaultdict(list)
+        for tid, (term, _) in enumerate(self._terms):
+            for d in _deletions(term):
+                deletes[d].append(tid)
+        self._deletes = dict(deletes)
+
+    def best(self, query: str) -> tuple[Hashable, float] | None:
+        """Highest-scoring (label, similarity) above the threshold, or None."""
+        if len(query) >= 3:
+            near = self._near(query)
+            if near is not None:
+                return near
+        postings = self._postings
+        counts = Counter(chain.from_iterable(postings.get(g, ()) for g in _trigrams(query)))
+        if not counts:
+            return None
+
+        # Only candidates sharing a good fraction of the best trigram overlap
+        top = max(counts.values())
+        floor = max(1, top * 0.6)
+        shortlist = sorted(
+            (tid for tid, n in counts.items() if n >= floor),
+            key=counts.__getitem__, reverse=True,
+        )[:self.shortlist]
+        best_label, best_score = None, self.threshold
+        for tid in shortlist:
+            term, label = self._terms[tid]
+            longest = max(len(term), len(query))
+            budget = int(longest * (1 - best_score) + 1e-9)  # max distance that can still win
+            dist = osa_distance(query, term, limit=budget)
+            score = 1 - dist / longest
+            if score > best_score or (score == best_score and best_label is None):
+                best_label, best_score = label, score
+        return (best_label, best_score) if best_label is not None else None
+
+    def _near(self, query: str) -> tuple[Hashable, float] | None:
+        """Best term within one edit that clears the threshold, or None."""
+        deletes = self._deletes
+        seen = set()
+        best_label, best_score = None, self.threshold
+        for d in _deletions(query):
+            for tid in deletes.get(d, ()):
+                if tid in seen:
+                    continue
+                seen.add(tid)
+                term, label = self._terms[tid]
+                longest = max(len(term), len(query))
+                dist = _edit_distance_upto_one(query, term)
+                if dist > 1:
+                    continue
+                score = 1 - dist / longest
+                if score > best_score or (score == best_score and best_label is None):
+                    best_label, best_score = label, score
+        return (best_label, best_score) if best_label is not None else None
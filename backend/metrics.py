@@ -0,0 +1,155 @@
+"""
+metrics.py — Prometheus text exposition for GET /metrics.
+
+No client library: the numbers already live in the components that own them
+(groq_scheduler, turn_gate, resilience, model_router, search); this module only
+formats them.
+
+Usage:
+    out = MetricsText()
+    out.gauge("tatva_groq_queue_depth", "Calls waiting for quota", 3, model="llama-3.1-8b-instant")
+    out.render()   → "# HELP ...\n# TYPE ...\ntatva_groq_queue_depth{model=\"...\"} 3\n"
+"""
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in labels.items()
+    )
+    return "{" + body + "}"
+
+
+class MetricsText:
+    def __init__(self):
+        self._families: dict[str, tuple[str, str, list[str]]] = {}
+
+    def _add(self, kind: str, name: str, help_text: str, value, labels: dict) -> None:
+        family = self._families.setdefault(name, (kind, help_text, []))
+        family[2].append(f"{name}{_labels(labels)} {value}")
+
+    def gauge(self, name: str, help_text: str, value, **labels) -> None:
+        self._add("gauge", name, help_text, value, labels)
+
+    def counter(self, name: str, help_text: str, value, **labels) -> None:
+        self._add("counter", name, help_text, value, labels)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+_BREAKER_STATE = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def render_metrics(scheduler_metrics: dict, gate_snapshot: dict, resilience_snapshot: dict,
+                   router_snapshot: dict, search_snapshot: dict) -> str:
+    out = MetricsText()
+
+    for model, m in scheduler_metrics["models"].items():
+        for priority, depth in m["queue_depth"].items():
+            out.gauge("tatva_groq_queue_depth", "Groq calls waiting for quota",
+                      depth, model=model, priority=priority)
+        out.gauge("tatva_groq_remaining_requests", "Requests left in the model's bucket",
+                  m["remaining_requests"], model=model)
+        out.gauge("tatva_groq_remaining_tokens", "Tokens left in the model's bucket",
+                  m["remaining_tokens"], model=model)
+        out.gauge("tatva_groq_limit_requests", "Request limit reported by Groq",
+                  m["limit_requests"], model=model)
+        out.gauge("tatva_groq_limit_tokens", "Token limit reported by Groq",
+                  m["limit_tokens"], model=model)
+
+    for priority, w in scheduler_metrics["wait"].items():
+        for stat in ("p50_ms", "p95_ms", "max_ms"):
+            out.gauge("tatva_groq_queue_wait_ms", "Time spent waiting for admission (recent calls)",
+                      w[stat], priority=priority, stat=stat.removesuffix("_ms"))
+
+    for (event, model, priority), n in sorted(scheduler_metrics["counters"].items()):
+        out.counter("tatva_groq_calls_total", "Groq calls by admission outcome",
+                    n, event=event, model=model, priority=priority)
+
+    for model, u in scheduler_metrics["usage"].items():
+        for kind in ("prompt", "completion"):
+            out.counter("tatva_groq_tokens_total", "Tokens billed by Groq",
+                        u[f"{kind}_tokens"], model=model, kind=kind)
+        out.counter("tatva_groq_cost_usd_total", "Estimated Groq spend (PRICE_PER_M_TOKENS)",
+                    u["cost_usd"], model=model)
+
+    for (model, reason), n in sorted(router_snapshot["routes"].items()):
+        out.counter("tatva_consultant_turns_total", "Consultant replies by model and routing reason",
+                    n, model=model, reason=reason)
+    for reason, n in sorted(router_snapshot["escalations"].items()):
+        out.counter("tatva_consultant_escalations_total", "8B replies escalated to the 70B model",
+                    n, reason=reason)
+
+    for key in ("turns", "coalesced", "replayed"):
+        out.counter(f"tatva_chat_{key}_total", f"/chat requests: {key}", gate_snapshot[key])
+    for key in ("active_users", "inflight", "cached_results"):
+        out.gauge(f"tatva_chat_{key}", f"/chat turn gate: {key.replace('_', ' ')}", gate_snapshot[key])
+
+    prefetch, candidates = search_snapshot["prefetch"], search_snapshot["candidates"]
+    for outcome in ("started", "hit", "hit_inflight", "miss", "wasted", "failed"):
+        out.counter("tatva_search_prefetch_total", "Speculative searches by outcome",
+                    prefetch[outcome], outcome=outcome)
+    out.gauge("tatva_search_prefetch_entries", "Prefetched searches held (one per user)",
+              prefetch["entries"])
+    for outcome in ("local", "fetched", "exact", "counted", "evicted"):
+        out.counter("tatva_search_candidates_total", "Searches by how the candidate set answered them",
+                    candidates[outcome], outcome=outcome)
+    details = search_snapshot["details"]
+    for outcome in ("hit", "miss", "not_found"):
+        out.counter("tatva_listing_details_total", "GET /listing/{id} lookups by cache outcome",
+                    details[outcome], outcome=outcome)
+    out.gauge("tatva_listing_details_entries", "Listing details cached", details["entries"])
+    for page in ("first", "next", "stale", "restarted"):
+        out.counter("tatva_search_pages_total", "Result pages served (next: show more)",
+                    search_snapshot["pages"][page], page=page)
+    for key in ("users", "rows"):
+        out.gauge(f"tatva_search_candidate_{key}", f"Cached candidate sets: {key}", candidates[key])
+    facets = search_snapshot["facets"]
+    out.counter("tatva_facet_queries_total", "GET /facets counts served", facets["queries"])
+    out.counter("tatva_map_cluster_queries_total", "GET /map/clusters answers served", facets["cluster_queries"])
+    for outcome, key in (("ok", "refreshes"), ("failed", "refresh_failed")):
+        out.counter("tatva_facet_index_refreshes_total", "Facet index rebuilds", facets[key], outcome=outcome)
+    for persona, rows in facets["rows"].items():
+        out.gauge("tatva_facet_index_rows", "Listings in the facet index", rows, persona=persona)
+    market = search_snapshot["market"]
+    out.gauge("tatva_market_cells", "Market statistics cells (incl. roll-ups)", market["cells"])
+    out.counter("tatva_market_listings_changed_total", "Listings applied to the market cube", market["changed"])
+    jobs = search_snapshot["jobs"]
+    for outcome in ("submitted", "deduplicated", "done", "failed"):
+        out.counter("tatva_enrichment_jobs_total", "Background enrichment jobs by outcome",
+                    jobs[outcome], outcome=outcome)
+    out.gauge("tatva_enrichment_jobs_pending", "Enrichment jobs queued or running", jobs["pending"])
+    out.gauge("tatva_enrichment_polls_waiting", "GET /jobs long polls being held", jobs["waiting"])
+    out.counter("tatva_enrichment_polls_overflow_total", "Long polls answered at once (POLL_MAX_WAITERS reached)",
+                jobs["poll_overflow"])
+    similar = search_snapshot["similar"]
+    out.counter("tatva_similar_queries_total", "GET /listing/{id}/similar answers served", similar["queries"])
+    for persona, dims in similar["dims"].items():
+        out.gauge("tatva_similar_index_dims", "Feature columns per listing in the similarity index",
+                  dims, persona=persona)
+
+    for stage, stats in sorted(resilience_snapshot["latency"].items()):
+        for stat, ms in stats.items():
+            out.gauge("tatva_stage_latency_ms", "Stage latency of recent successful calls",
+                      ms, stage=stage, stat=stat.removesuffix("_ms"))
+    for (stage, outcome), n in sorted(resilience_snapshot["outcomes"].items()):
+        out.counter("tatva_stage_calls_total", "External calls by stage and outcome",
+                    n, stage=stage, outcome=outcome)
+    for stage, t in sorted(resilience_snapshot["prompt_tokens"].items()):
+        out.counter("tatva_stage_prompt_tokens_total", "Prompt tokens billed per LLM stage",
+                    t["tokens"], stage=stage)
+        out.gauge("tatva_stage_prompt_tokens_per_call", "Mean prompt tokens per LLM call",
+                  round(t["tokens"] / t["calls"], 1) if t["calls"] else 0, stage=stage)
+    for name, state in sorted(resilience_snapshot["breakers"].items()):
+        out.gauge("tatva_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+                  _BREAKER_STATE[state], circuit=name)
+
+    return out.render()
@@ -0,0 +1,223 @@
+"""
+model_router.py — Picks who writes the consultant reply: phase engine, 8B or 70B.
+
+Most consultant turns just acknowledge an answer and ask the next phase's two
+questions (get_pg_system_prompt / get_system_prompt spell them out word for
+word). Those on-script turns are answered by phase_engine.py without an LLM.
+The rest go to a model:
+
+  update     a field that was already known changed — 8B acknowledges it
+  midpoint   2+ family hubs — the MIDPOINT ADVISOR block is in the prompt  (70B)
+  hub        a college / office / tech park arrived this turn — nearby-area advice  (70B)
+  question   the user asked something rather than answering  (70B)
+  long       a long free-form message  (70B)
+  ambiguous  nothing was extracted (and it isn't a bare yes / no)  (70B)
+
+An 8B turn only goes out if the model's quota has room right now with
+SMALL_QUOTA_RESERVE of it left over. The extractor (PRIORITY_CRITICAL) runs on
+the same model every turn; chat calls only use the quota it isn't using, and
+never queue. Without room the turn goes straight to the 70B model. The 8B
+reply is checked against the OUTPUT RULES the prompt states
+(output_violations); a reply that breaks them, or no reply at all, escalates
+to the 70B model. Dashboards are not a reason to escalate —
+strip_llm_dashboard removes them from either model's reply.
+
+CONSULTANT_CASCADE=0 sends every turn to the 70B model, PHASE_ENGINE=0 sends
+on-script turns to the 8B model instead of the engine (kill switches / A-B runs).
+
+Usage:
+    from model_router import consult, field_snapshot
+    before = field_snapshot(session)                        # at the start of the turn
+    reply = consult(build_messages, session, msg, before)   → str | None
+    router_stats.snapshot()                                 → dict for GET /metrics
+"""
+
+import os
+import re
+import threading
+import time
+
+from groq_scheduler import PRIORITY_CHAT, groq_scheduler
+from reply_text import strip_llm_dashboard
+from phase_engine import next_reply
+from resilience import complete_llm, tracker
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+PHASE_ENGINE = "phase_engine"
+
+CASCADE_ENABLED = os.getenv("CONSULTANT_CASCADE", "1") != "0"
+ENGINE_ENABLED = os.getenv("PHASE_ENGINE", "1") != "0"
+
+SMALL_MAX_TOKENS = 300
+SMALL_QUOTA_RESERVE = 0.5      # share of the 8B buckets kept free for the extractor
+LONG_MESSAGE_WORDS = 30
+MAX_REPLY_CHARS = 600          # "Keep replies short" — a wall of text is the 8B model rambling
+
+_CONFIRMATIONS = {"yes", "yeah", "yep", "ok", "okay", "sure", "no", "nope", "fine", "cool", "great", "thanks"}
+# A short reply with one of these turns down the nice-to-haves just asked ("no gym needed")
+_NEGATIONS = {"no", "nope", "nah", "not", "don't", "dont", "skip", "nothing", "none"}
+SHORT_REPLY_WORDS = 6
+# Bookkeeping, not answers
+_UNTRACKED_FIELDS = {"history", "asked", "area_id", "search_cursor"}
+_QUESTION_START_RE = re.compile(
+    r"^\s*(what|which|where|why|how|is|are|can|could|should|would|will|do|does|any)\b", re.IGNORECASE,
+)
+_PREAMBLE_RE = re.compile(r"^\s*(sure|of course|certainly|as an ai)\b", re.IGNORECASE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|\n")
+_READY_PHRASE = "show me"
+
+# Words that, inside a question, mean the field is being asked for again
+_RE_ASK_WORDS = {
+    "rent_price_inr_per_month": ("budget",),
+    "Sharing": ("sharing",),
+    "gender_preference": ("boys", "girls", "unisex"),
+    "location": ("which area", "what area", "which part"),
+    "size_bhk": ("bhk",),
+    "furnishing": ("furnish",),
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Routing
+# ─────────────────────────────────────────────────────────────────────────────
+def _filled(value) -> bool:
+    return value not in (0, "", None, [], False)
+
+
+def field_snapshot(session: dict) -> dict:
+    return {k: (list(v) if isinstance(v, list) else v) for k, v in session.items() if k not in _UNTRACKED_FIELDS}
+
+
+def changed_fields(before: dict, session: dict) -> set:
+    """Session fields this turn filled in or changed."""
+    return {k for k, v in session.items() if k not in _UNTRACKED_FIELDS and before.get(k) != v}
+
+
+def choose_model(session: dict, msg: str, before: dict) -> tuple[str, str]:
+    """(model or PHASE_ENGINE, reason) for this turn's consultant reply."""
+    if not CASCADE_ENABLED:
+        return LARGE_MODEL, "cascade_off"
+    changed = changed_fields(before, session)
+    if len(session.get("family_hubs") or []) >= 2:
+        return LARGE_MODEL, "midpoint"
+    if changed & {"nearby_hub", "family_hubs"}:
+        return LARGE_MODEL, "hub"
+    text = msg.strip()
+    if "?" in text or _QUESTION_START_RE.match(text):
+        return LARGE_MODEL, "question"
+    words = text.lower().split()
+    if len(words) > LONG_MESSAGE_WORDS:
+        return LARGE_MODEL, "long"
+    if any(_filled(before.get(k)) for k in changed):
+        return SMALL_MODEL, "update"
+    if not changed and not (session.get("persona") and (
+        set(words) <= _CONFIRMATIONS
+        or (len(words) <= SHORT_REPLY_WORDS and _NEGATIONS & set(words))
+    )):
+        return LARGE_MODEL, "ambiguous"
+    return (PHASE_ENGINE if ENGINE_ENABLED else SMALL_MODEL), "scripted"
+
+
+def output_violations(reply: str, session: dict) -> list[str]:
+    """OUTPUT RULES a (dashboard-stripped) consultant reply breaks; [] if none."""
+    if not reply.strip():
+        return ["empty"]
+    violations = []
+    if _PREAMBLE_RE.match(reply):
+        violations.append("preamble")
+    if len(reply) > MAX_REPLY_CHARS:
+        violations.append("too_long")
+    questions = [seg for seg in _SENTENCE_END_RE.split(reply) if seg.endswith("?")] if "?" in reply else []
+    if len(questions) > 2 or (not questions and _READY_PHRASE not in reply.lower()):
+        violations.append("question_count")
+    asked = " ".join(questions).lower()
+    for field, words in _RE_ASK_WORDS.items():
+        if session.get(field) not in (0, "", None, []) and any(w in asked for w in words):
+            violations.append("re_ask")
+            break
+    return violations
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stats
+# ─────────────────────────────────────────────────────────────────────────────
+class RouterStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[tuple[str, str], int] = {}        # (model, reason) → turns
+        self.escalations: dict[str, int] = {}               # violation → count
+
+    def route(self, model: str, reason: str) -> None:
+        with self._lock:
+            key = (model, reason)
+            self.routes[key] = self.routes.get(key, 0) + 1
+
+    def escalate(self, reasons: list[str]) -> None:
+        with self._lock:
+            for reason in reasons:
+                self.escalations[reason] = self.escalations.get(reason, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"routes": dict(self.routes), "escalations": dict(self.escalations)}
+
+
+router_stats = RouterStats()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cascade
+# ─────────────────────────────────────────────────────────────────────────────
+def _reply_text(completion) -> str:
+    return strip_llm_dashboard(completion.choices[0].message.content)
+
+
+def consult(build_messages, session: dict, msg: str, before: dict) -> str | None:
+    """
+    Consultant reply for this turn, dashboard already stripped. None when no
+    model could answer in time (the caller falls back to the phase engine).
+    build_messages(model) returns the LLM prompt; it is only built if a model is used.
+    """
+    model, reason = choose_model(session, msg, before)
+    if model == PHASE_ENGINE:
+        router_stats.route(PHASE_ENGINE, reason)
+        started = time.monotonic()
+        reply = next_reply(session, changed_fields(before, session))
+        tracker.record("phase_engine", time.monotonic() - started, "ok")
+        return reply
+
+    messages = build_messages(model)
+    if model == SMALL_MODEL and not groq_scheduler.has_room(
+        SMALL_MODEL, messages, SMALL_MAX_TOKENS, reserve=SMALL_QUOTA_RESERVE,
+    ):
+        model, reason = LARGE_MODEL, "small_busy"
+        messages = build_messages(LARGE_MODEL)
+    draft = ""
+    if model == SMALL_MODEL:
+        completion = complete_llm(
+            "consultant_small", PRIORITY_CHAT,
+            model=SMALL_MODEL, messages=messages, max_tokens=SMALL_MAX_TOKENS,
+            max_wait_s=0.0, fallback=None,
+        )
+        if completion is None:
+            violations = ["unavailable"]
+        else:
+            draft = _reply_text(completion)
+            violations = output_violations(draft, session)
+            if not violations:
+                router_stats.route(SMALL_MODEL, reason)
+                return draft
+        router_stats.escalate(violations)
+        reason = "escalated"
+        messages = build_messages(LARGE_MODEL)     # the 70B gets a bigger history budget
+
+    router_stats.route(LARGE_MODEL, reason)
+    completion = complete_llm(
+        "consultant", PRIORITY_CHAT,
+        model=LARGE_MODEL, messages=messages, fallback=None,
+    )
+    if completion is None:
+        # A rule-breaking 8B reply still beats the scripted fallback
+        return draft or None
+    return _reply_text(completion)
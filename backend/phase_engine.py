@@ -0,0 +1,214 @@
+"""
+phase_engine.py — Next bundled question pair from the session alone, no LLM.
+
+The consultant prompts (prompts.py) script the whole conversation: 4 phases
+per persona, 2 questions per reply, never re-ask what is known. Which
+questions come next depends only on which session fields are filled, so an
+on-script turn doesn't need a completion — this module walks the same phases:
+
+  PG   : identity (gender + sharing) → location + budget →
+         daily life (food + nearby hub) → comfort (gym + anything else)
+  Home : core (location + BHK + budget) → lifestyle (solo/family + hubs) →
+         comforts (furnishing + bathrooms + balcony) → parking + gym
+
+Search essentials are asked until answered. Nice-to-haves (food, gym, hubs,
+furnishing…) are asked once — a "no" leaves the field empty, so
+session["asked"] records them. When nothing is left, the reply is the
+"just say show me" invite.
+
+Replies are acknowledgement + two questions, phrased from a few variants per
+field picked by turn number — deterministic, but not the same sentence on
+every turn. model_router decides when a turn is on-script (see choose_model).
+
+Usage:
+    from phase_engine import next_reply
+    reply = next_reply(session, changed_fields)    → str (updates session["asked"])
+"""
+
+from utils import safe_int
+
+QUESTIONS_PER_TURN = 2
+
+# (field, essential) per phase. Pseudo-fields (leading "_") are never filled.
+_PG_PHASES = (
+    (("gender_preference", True), ("Sharing", True)),
+    (("location", True), ("rent_price_inr_per_month", True)),
+    (("food_included", False), ("nearby_hub", False)),
+    (("gym_nearby", False), ("_anything_else", False)),
+)
+_HOME_PHASES = (
+    (("location", True), ("size_bhk", True), ("rent_price_inr_per_month", True)),
+    (("marital_status", False), ("family_hubs", False)),
+    (("furnishing", False), ("bath", False), ("balcony", False)),
+    (("_parking", False), ("gym_nearby", False)),
+)
+
+_QUESTIONS = {
+    "gender_preference": (
+        "Are you looking for a Boys, Girls, or Unisex PG? 🚻",
+        "Should it be a Boys, Girls or Unisex PG? 🚻",
+        "Which kind of PG suits you — Boys, Girls or Unisex? 🚻",
+    ),
+    "Sharing": (
+        "What kind of sharing do you prefer — Single, Double, or Triple? 🤝",
+        "Single, Double or Triple sharing — what works for you? 🤝",
+        "How many roommates are you okay with — Single, Double or Triple sharing? 🤝",
+    ),
+    "location": (
+        "Which area of Bengaluru are you looking in? 📍",
+        "Which part of Bengaluru should I search? 📍",
+        "Where in Bengaluru would you like to live? 📍",
+    ),
+    "rent_price_inr_per_month": (
+        "What's your monthly budget? 💰",
+        "How much are you planning to spend per month? 💰",
+        "What monthly rent should I keep it under? 💰",
+    ),
+    "food_included": (
+        "Do you want food/meals included? 🍱",
+        "Should meals be part of the deal? 🍱",
+        "Would you like a PG that includes food? 🍱",
+    ),
+    "nearby_hub": (
+        "Is there a college, office, or tech park you need to be close to? 🏫",
+        "Any college or workplace you'd like to be near? 🏫",
+        "Where do you study or work — should I look close to it? 🏫",
+    ),
+    "gym_nearby": (
+        "Would you like a gym nearby? 💪",
+        "Is a gym close by important to you? 💪",
+        "Should I look for places with a gym nearby? 💪",
+    ),
+    "_anything_else": (
+        "Anything else important to you before I pull up your matches?",
+        "Anything else I should keep in mind before I search?",
+    ),
+    "size_bhk": (
+        "How many BHK do you need? 🛏️",
+        "What size are you after — 1, 2 or 3 BHK? 🛏️",
+        "How many bedrooms should the home have? 🛏️",
+    ),
+    "marital_status": (
+        "Are you moving solo or with family? 👫",
+        "Is this home just for you, or for the family too? 👫",
+    ),
+    "family_hubs": (
+        "Where does everyone work or study, so I can keep every commute short? 🏢",
+        "Which offices or schools does the family travel to, so I can work out the best midpoint? 🏢",
+    ),
+    "furnishing": (
+        "Furnished, semi-furnished or unfurnished? 🛋️",
+        "Do you want it furnished, semi-furnished or bare? 🛋️",
+    ),
+    "bath": (
+        "How many bathrooms do you need? 🚿",
+        "How many bathrooms would be ideal? 🚿",
+    ),
+    "balcony": (
+        "Is a balcony a must? 🌿",
+        "Would you like a balcony? 🌿",
+    ),
+    "_parking": (
+        "Do you need bike or car parking? 🏍️",
+        "Any parking needs — bike, car or both? 🚗",
+    ),
+}
+
+_SHARING_LABELS = {1: "Single", 2: "Double", 3: "Triple", 4: "Four"}
+
+_GENERIC_ACKS = ("Got it! 👍", "Noted! ✅", "Awesome! 🙌", "Perfect! ✨")
+
+_READY = {
+    "pg": "Ready to see your perfect PG options? Just say show me! 🏠🔥",
+    "home": "Ready to see your matches? Just say show me! 🏠🔥",
+}
+
+
+def _filled(value) -> bool:
+    return value not in (0, "", None, [], False)
+
+
+def _pick(options: tuple, session: dict, salt: str) -> str:
+    turn = len(session.get("history") or []) // 2
+    return options[(turn + sum(map(ord, salt))) % len(options)]
+
+
+def _ack(field: str, session: dict) -> str | None:
+    """Acknowledgement for a field the user just gave, or None to use a generic one."""
+    value = session.get(field)
+    if field == "Sharing":
+        label = _SHARING_LABELS.get(safe_int(value, 0))
+        return f"{label} sharing — smart choice, great value for money! 💰" if label else None
+    if field == "gender_preference":
+        return f"{value} PG — got it! 🚻"
+    if field == "location":
+        return f"{value} — great pick! 📍"
+    if field == "rent_price_inr_per_month":
+        budget = safe_int(value, 0)
+        return f"₹{budget:,} a month — noted! 💰" if budget else None
+    if field == "size_bhk" and session.get("persona") != "pg":
+        return f"{safe_int(value, 0)}BHK — perfect! 🏠"
+    if field == "food_included":
+        return "Meals included — that saves ₹3,000-5,000 a month! 🍱"
+    if field == "marital_status":
+        return "Moving with family — lovely! 👨‍👩‍👧" if value == "Married" else "Solo move — exciting! 🎉"
+    if field == "furnishing":
+        return f"{value} it is! 🛋️"
+    if field == "gym_nearby":
+        return "Gym nearby — noted! 💪"
+    return None
+
+
+def _answered(field: str, essential: bool, session: dict, asked: set) -> bool:
+    if field == "_parking":
+        filled = session.get("two_wheeler_parking") or session.get("four_wheeler_parking")
+    elif field == "location" and len(session.get("family_hubs") or []) >= 2:
+        return True                       # the midpoint decides the area
+    else:
+        filled = _filled(session.get(field))
+    return bool(filled) or (not essential and field in asked)
+
+
+def _phases(session: dict) -> tuple:
+    return _PG_PHASES if session.get("persona") == "pg" else _HOME_PHASES
+
+
+def pending_fields(session: dict) -> list[str]:
+    """Fields still to ask about, in phase order."""
+    phases = _phases(session)
+    asked = set(session.get("asked") or ())
+    return [
+        field
+        for phase in phases
+        for field, essential in phase
+        if not _answered(field, essential, session, asked)
+    ]
+
+
+def next_reply(session: dict, changed: set = frozenset()) -> str:
+    """
+    Acknowledgement of this turn's answers plus the next two questions (or
+    the show-me invite). Records the asked fields in session["asked"].
+    """
+    persona = session.get("persona")
+    if not persona:
+        return "Are you looking for a **Home/Apartment** or a **PG/Co-living** spot? 🏠"
+
+    ack = None
+    for phase in _phases(session):
+        for field, _ in phase:
+            if field in changed and _filled(session.get(field)):
+                ack = ack or _ack(field, session)
+    ack = ack or _pick(_GENERIC_ACKS, session, "ack")
+
+    fields = pending_fields(session)[:QUESTIONS_PER_TURN]
+    if not fields:
+        return f"{ack} {_READY[persona]}" if changed else _READY[persona]
+
+    asked = session.setdefault("asked", [])
+    asked.extend(f for f in fields if f not in asked)
+
+    questions = [_pick(_QUESTIONS[f], session, f) for f in fields]
+    if len(questions) == 2:
+        questions[1] = "And " + questions[1][0].lower() + questions[1][1:]
+    return f"{ack} " + " ".join(questions)
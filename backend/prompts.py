@@ -22,7 +22,7 @@ def get_system_prompt(session: dict, model_features: list) -> str:
     current_knowledge = {
         k: v for k, v in session.items()
         if v not in [0, 0.0, None, False, "", []]
-        and k not in ["history", "stage", "persona"]
+        and k not in ["history", "stage", "persona", "area_id", "asked", "search_cursor"]
     }
     knowledge_str = "\n".join(
         f"  - {k.replace('_', ' ').title()}: {v}"
@@ -80,7 +80,7 @@ def get_pg_system_prompt(session: dict, model_features: list) -> str:
     current_knowledge = {
         k: v for k, v in session.items()
         if v not in [0, 0.0, None, False, "", []]
-        and k not in ["history", "stage", "persona"]
+        and k not in ["history", "stage", "persona", "area_id", "asked", "search_cursor"]
     }
     knowledge_str = "\n".join(
         f"  - {k.replace('_', ' ').title()}: {v}"
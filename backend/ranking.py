@@ -0,0 +1,164 @@
+"""
+ranking.py — Scores search candidates by how well they fit the session.
+
+Every term is in [0, 1] (1 = best) and computed for all candidates at once:
+
+  headroom   budget left under the ceiling: (budget − rent) / budget
+  hub        distance to the family hubs' midpoint (home, 2+ hubs), 0 at HUB_FAR_KM
+  metro      dist_to_metro_km, 0 at METRO_FAR_KM
+  commute    commute_time_peak_mins, 0 at COMMUTE_LONG_MIN
+  amenities  share of the nice-to-haves the user asked for that the listing has
+             (the ones search.py already filters on, food and gym for PGs, aren't
+             counted again)
+
+score = 100 × Σ weight × term over the terms that apply (no budget → no
+headroom, no midpoint → no hub, nothing asked → no amenities), with the
+weights of the terms that apply rescaled to sum to 1. A missing value scores
+0.5, so a listing isn't punished for a blank column. WEIGHTS are per persona
+and can be overridden with RANK_WEIGHTS_PG / RANK_WEIGHTS_HOME, e.g.
+"headroom=0.5,metro=0.3,commute=0.2" (terms left out weigh 0).
+
+RankFeatures turns the rows into column arrays once, when a candidate set is
+fetched; score() is then pure numpy — no per-row Python on the turn.
+
+Usage:
+    features = RankFeatures.from_rows(rows)
+    total, points = score(features, "home", budget=30000, wants=("gym_nearby",), origin=(12.93, 77.62))
+    order = ranked(candidate_indices, total)             # best first, ties keep row order
+    breakdown(total, points, i)                          → {"score": 83, "headroom": 27, ...}
+"""
+
+import math
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+HUB_FAR_KM = 10.0
+METRO_FAR_KM = 5.0
+COMMUTE_LONG_MIN = 90.0
+MISSING = 0.5                    # term value for a blank column
+KM_PER_DEG = 111.32
+
+TERMS = ("headroom", "hub", "metro", "commute", "amenities")
+# PG rows carry no coordinates, metro or commute columns (listing_cards.py)
+WEIGHTS = {
+    "pg":   {"headroom": 0.6, "amenities": 0.4},
+    "home": {"headroom": 0.3, "hub": 0.25, "metro": 0.15, "commute": 0.15, "amenities": 0.15},
+}
+# Session amenity fields that only rank (search.py filters on food / gym for PGs)
+WANT_FIELDS = {
+    "pg":   ("has_wifi", "has_washing_machine"),
+    "home": ("two_wheeler_parking", "four_wheeler_parking", "gym_nearby", "has_washing_machine"),
+}
+FEATURE_COLUMNS = {
+    "pg":   WANT_FIELDS["pg"],
+    "home": ("latitude", "longitude", "dist_to_metro_km", "commute_time_peak_mins", *WANT_FIELDS["home"]),
+}
+
+
+def _weights_from_env(persona: str) -> dict:
+    raw = os.getenv(f"RANK_WEIGHTS_{persona.upper()}", "")
+    if not raw:
+        return WEIGHTS[persona]
+    weights = {}
+    for part in raw.split(","):
+        term, _, value = part.partition("=")
+        if term.strip() in TERMS:
+            try:
+                weights[term.strip()] = max(0.0, float(value))
+            except ValueError:
+                pass
+    if not any(weights.values()):
+        print(f"⚠️  RANK_WEIGHTS_{persona.upper()}={raw!r} has no usable weights — using the defaults")
+        return WEIGHTS[persona]
+    return weights
+
+
+ACTIVE_WEIGHTS = {persona: _weights_from_env(persona) for persona in WEIGHTS}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Features
+# ─────────────────────────────────────────────────────────────────────────────
+def _number(value) -> float:
+    if value is None or value == "":
+        return math.nan
+    if isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class RankFeatures(NamedTuple):
+    rent: np.ndarray
+    columns: dict                # FEATURE_COLUMNS name → float array (nan = blank)
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "RankFeatures":
+        names = {c for cols in FEATURE_COLUMNS.values() for c in cols}
+        present = names.intersection(rows[0]) if rows else set()
+        return cls(
+            np.fromiter((_number(r.get("rent_price_inr_per_month")) for r in rows), float, len(rows)),
+            {c: np.fromiter((_number(r.get(c)) for r in rows), float, len(rows)) for c in present},
+        )
+
+    def __len__(self) -> int:
+        return len(self.rent)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scoring
+# ─────────────────────────────────────────────────────────────────────────────
+def _filled(term: np.ndarray) -> np.ndarray:
+    return np.where(np.isnan(term), MISSING, term)
+
+
+def _falloff(values: np.ndarray | None, far: float, n: int) -> np.ndarray:
+    """1 at 0, 0 at `far` and beyond; MISSING where blank or the column is absent."""
+    if values is None:
+        return np.full(n, MISSING)
+    return _filled(np.clip(1.0 - values / far, 0.0, 1.0))
+
+
+def score(features: RankFeatures, persona: str, budget: int = 0, wants: tuple = (),
+          origin: tuple | None = None) -> tuple[np.ndarray, dict]:
+    """(total 0–100 per row, {term: points per row}) — points sum to the total."""
+    n = len(features)
+    cols = features.columns
+    terms: dict[str, np.ndarray] = {}
+    if budget > 0:
+        terms["headroom"] = _filled(np.clip((budget - features.rent) / budget, 0.0, 1.0))
+    if origin is not None and "latitude" in cols:
+        lat0, lng0 = origin
+        dy = (cols["latitude"] - lat0) * KM_PER_DEG
+        dx = (cols["longitude"] - lng0) * KM_PER_DEG * math.cos(math.radians(lat0))
+        terms["hub"] = _falloff(np.hypot(dx, dy), HUB_FAR_KM, n)
+    if persona == "home":
+        terms["metro"] = _falloff(cols.get("dist_to_metro_km"), METRO_FAR_KM, n)
+        terms["commute"] = _falloff(cols.get("commute_time_peak_mins"), COMMUTE_LONG_MIN, n)
+    asked = [cols[w] if w in cols else np.full(n, math.nan) for w in wants]
+    if asked:
+        terms["amenities"] = _filled(np.mean(np.clip(np.vstack(asked), 0.0, 1.0), axis=0))
+
+    weights = ACTIVE_WEIGHTS.get(persona, {})
+    active = {t: weights.get(t, 0.0) for t in terms if weights.get(t, 0.0) > 0}
+    norm = sum(active.values())
+    points = {t: terms[t] * (100.0 * w / norm) for t, w in active.items()} if norm else {}
+    total = sum(points.values()) if points else np.zeros(n)
+    return total, points
+
+
+def ranked(indices: list[int], total: np.ndarray) -> list[int]:
+    """`indices` best score first; equal scores keep their order (the DB's rent order)."""
+    if not indices:
+        return []
+    idx = np.asarray(indices)
+    return idx[np.argsort(-total[idx], kind="stable")].tolist()
+
+
+def breakdown(total: np.ndarray, points: dict, i: int) -> dict:
+    """{"score": …, term: points, …} for row i, rounded for display."""
+    return {"score": int(round(float(total[i]))), **{t: int(round(float(p[i]))) for t, p in points.items()}}
@@ -1,14 +1,18 @@
-import os
-from groq import Groq
-from dotenv import load_dotenv
+from groq_scheduler import groq_scheduler, PRIORITY_CRITICAL
+from resilience import stage_timeout
+from search import apply_location_filter, area_ids_ready
 
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
-def get_smart_suggestions(session, supabase):
+def _in_area(query, session, loc):
+    """Canonical area-ID equality once the column is filled in, substring match otherwise."""
+    area_id = session.get('area_id') if area_ids_ready() else 0
+    return apply_location_filter(query, area_id or 0, loc)
+
+def get_smart_suggestions(session, supabase, market=""):
     """
     Refined Recommender: Handles PG vs Home personas and 
     stops hardcoded 'Metro' hallucinations.
+    market: market_stats.market_line() for the search, when known.
     """
     persona = session.get('persona', 'home')
     target_table = "PG_Listings" if persona == "pg" else "properties"
@@ -20,9 +24,7 @@ def get_smart_suggestions(session, supabase):
     is_metro_search = persona == "home" and session.get('dist_to_metro_km', 0) > 0
 
     # Probe A: Increase budget by 25%
-    probe_budget = supabase.table(target_table) \
-        .select("listing_id") \
-        .ilike("location", f"%{loc}%") \
+    probe_budget = _in_area(supabase.table(target_table).select("listing_id"), session, loc) \
         .eq("size_bhk", bhk) \
         .lte("rent_price_inr_per_month", int(budget * 1.25)) \
         .limit(5).execute()
@@ -33,20 +35,17 @@ def get_smart_suggestions(session, supabase):
 
     if persona == "home":
         if is_metro_search:
-            probe_relaxed = supabase.table("properties") \
-                .select("listing_id").ilike("location", f"%{loc}%") \
+            probe_relaxed = _in_area(supabase.table("properties").select("listing_id"), session, loc) \
                 .eq("size_bhk", bhk).lte("rent_price_inr_per_month", budget) \
                 .lte("dist_to_metro_km", 3.0).limit(5).execute()
             relaxed_logic_desc = "Increasing Metro distance to 3km"
         else:
-            probe_relaxed = supabase.table("properties") \
-                .select("listing_id").ilike("location", f"%{loc}%") \
+            probe_relaxed = _in_area(supabase.table("properties").select("listing_id"), session, loc) \
                 .eq("size_bhk", bhk).lte("rent_price_inr_per_month", budget) \
                 .limit(5).execute()
             relaxed_logic_desc = "Removing size/sqft constraints"
     else:
-        probe_relaxed = supabase.table("PG_Listings") \
-            .select("listing_id").ilike("location", f"%{loc}%") \
+        probe_relaxed = _in_area(supabase.table("PG_Listings").select("listing_id"), session, loc) \
             .eq("size_bhk", bhk).lte("rent_price_inr_per_month", budget) \
             .limit(5).execute()
         relaxed_logic_desc = "Relaxing amenity/food preferences"
@@ -56,6 +55,8 @@ def get_smart_suggestions(session, supabase):
     findings = f"- Increasing budget to ₹{int(budget*1.25)}: Found {len(probe_budget.data)} properties."
     if probe_relaxed:
         findings += f"\n- {relaxed_logic_desc}: Found {len(probe_relaxed.data)} properties."
+    if market:
+        findings += f"\n- Market rents — {market}."
 
     # ✅ FRIENDLY PROMPT FIX
     analyst_prompt = f"""
@@ -74,12 +75,15 @@ def get_smart_suggestions(session, supabase):
     4. Keep it to 2-3 friendly sentences.
     """
 
-    completion = client.chat.completions.create(
+    # Runs only when a search came back empty — it *is* the search answer
+    completion = groq_scheduler.complete(
+        PRIORITY_CRITICAL,
         model="llama-3.3-70b-versatile",
         messages=[
             {"role": "system", "content": "You are Tatva, a friendly rental assistant."},
             {"role": "user", "content": analyst_prompt}
-        ]
+        ],
+        timeout=stage_timeout("recommender"),
     )
 
     return completion.choices[0].message.content
\ No newline at end of file
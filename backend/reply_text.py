@@ -0,0 +1,340 @@
+"""
+reply_text.py — Post-processing for raw LLM output: the reply sanitizer.
+
+  ReplySanitizer    : strips the dashboards / requirement lists the consultant
+                      model prints despite being told not to. Filters run as
+                      a chain over the text, left to right; no stage rescans
+                      text it has already passed on, and none backtracks.
+                      Works on a whole reply or on streamed chunks.
+
+The extractor's reply is JSON mode and goes to ai_tools.decode_extraction.
+
+Usage:
+    strip_llm_dashboard(reply)                 → cleaned reply
+
+    sanitizer = ReplySanitizer()
+    for chunk in stream:
+        send(sanitizer.feed(chunk))            → text safe to show so far
+    send(sanitizer.close())
+"""
+
+import re
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Dashboard patterns (same rules as the original four-pass regex sanitizer)
+# ─────────────────────────────────────────────────────────────────────────────
+# A block starts at one of these headers…
+_BLOCK_HEADER_RE = re.compile(
+    r"###\s*(?:(STATUS DASHBOARD)|📋[^\n]*)|╔═[^\n]*╗|✨\s*Your Tatva PG Selections[^\n]*",
+    re.IGNORECASE,
+)
+# …and runs to the first box-bottom line, the first blank line before a new
+# paragraph, or the end of the reply.
+_BLOCK_END_RE = re.compile(r"╚|\n\n(?=[A-Z])", re.IGNORECASE)
+
+_PG_HEADER_RE = re.compile(r"✨\s*Your Tatva PG Selections", re.IGNORECASE)
+
+# Emoji that start a requirement line ("📍 Location: …"). Several are written
+# with a trailing U+FE0F variation selector; the bare codepoint does not count.
+_LABEL_EMOJI = (
+    "📍", "🛏️", "💰", "📐", "🛋️", "👫", "🏢", "🚿", "🌿", "✅", "🤝",
+    "🚻", "🏍️", "🚗", "💪", "🍱", "📶", "🫧", "👦", "👧", "🏫",
+)
+_LABEL_EMOJI_RE = re.compile("|".join(map(re.escape, _LABEL_EMOJI)))
+# A chunk ending in the first codepoint of a two-codepoint emoji is undecided
+_LABEL_EMOJI_PARTIAL = tuple({e[:-1] for e in _LABEL_EMOJI if len(e) > 1})
+
+_BLANK_RUN_RE = re.compile(r"\n{3,}")
+
+# Literals every match of each pattern starts with (see _AnchoredSearch)
+_BLOCK_HEADER_STARTS = ("###", "╔═", "✨")
+_PG_HEADER_STARTS = ("✨",)
+# A reply containing none of these characters only needs _TidyFilter
+_TRIGGER_CHARS = tuple({lit[0] for lit in _BLOCK_HEADER_STARTS + _LABEL_EMOJI})
+
+
+def _prefix_pattern(literal: str) -> str:
+    """Regex matching any non-empty prefix of `literal`."""
+    pattern = ""
+    for ch in reversed(literal):
+        pattern = re.escape(ch) + (f"(?:{pattern})?" if pattern else "")
+    return pattern
+
+
+# Header text that may still turn into a block header once more text arrives
+_HEADER_PARTIAL_RE = re.compile(
+    r"(?:#(?:#(?:#\s*(?:" + _prefix_pattern("STATUS DASHBOARD") + r")?)?)?"
+    r"|✨\s*(?:" + _prefix_pattern("Your Tatva PG Selections") + r")?)\Z",
+    re.IGNORECASE,
+)
+_PG_HEADER_PARTIAL_RE = re.compile(
+    r"✨\s*(?:" + _prefix_pattern("Your Tatva PG Selections") + r")?\Z", re.IGNORECASE
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Streaming filters
+# ─────────────────────────────────────────────────────────────────────────────
+class _AnchoredSearch:
+    """
+    pattern.search(buf, i) for a pattern whose matches always begin with one
+    of a few literals. re steps through an alternation with no common first
+    character one position at a time; str.find on each literal skips ahead in
+    C, and each literal's next position is remembered in `memo` (one dict per
+    buffer, owned by the caller) until passed.
+
+    present() checks the literals' first characters the same way, so a stage
+    whose text has none of them passes it straight through. Stateless: one
+    instance per pattern is shared by every sanitizer.
+    """
+
+    __slots__ = ("_pattern", "_starts", "_firsts", "_ascii_free")
+
+    def __init__(self, pattern: re.Pattern, starts: tuple[str, ...]):
+        self._pattern = pattern
+        self._starts = starts
+        self._firsts = tuple({lit[0] for lit in starts})
+        self._ascii_free = not any(ch.isascii() for ch in self._firsts)
+
+    def present(self, text: str) -> bool:
+        if self._ascii_free and text.isascii():
+            return False
+        return any(ch in text for ch in self._firsts)
+
+    def search(self, buf: str, i: int, memo: dict) -> re.Match | None:
+        while True:
+            best = -1
+            for lit in self._starts:
+                p = memo.get(lit, -2)                  # -2 = not looked up yet
+                if -1 < p < i or p == -2:
+                    p = memo[lit] = buf.find(lit, i)
+                if p >= 0 and (best < 0 or p < best):
+                    best = p
+            if best < 0:
+                return None
+            m = self._pattern.match(buf, best)
+            if m:
+                return m
+            i = best + 1
+
+
+_BLOCK_HEADER_SEARCH = _AnchoredSearch(_BLOCK_HEADER_RE, _BLOCK_HEADER_STARTS)
+_PG_HEADER_SEARCH = _AnchoredSearch(_PG_HEADER_RE, _PG_HEADER_STARTS)
+_LABEL_EMOJI_SEARCH = _AnchoredSearch(_LABEL_EMOJI_RE, _LABEL_EMOJI)
+
+
+# Each filter takes text in feed(chunk, final) and returns the part of its
+# output that no later input can change. Undecided text stays in self._buf.
+
+class _BlockFilter:
+    """Removes header-to-end dashboard blocks."""
+
+    __slots__ = ("_buf", "_in_block")
+
+    def __init__(self):
+        self._buf = ""
+        self._in_block = False
+
+    def feed(self, chunk: str, final: bool) -> str:
+        if not self._buf and not self._in_block and not _BLOCK_HEADER_SEARCH.present(chunk):
+            return chunk                     # no '#', '╔' or '✨': nothing here can start a block
+        buf = self._buf + chunk
+        self._buf = ""
+        memo = {}
+        out = []
+        i, n = 0, len(buf)
+        while i < n:
+            if self._in_block:
+                end, keep = self._block_end(buf, i, final)
+                if end is None:              # end not decidable yet
+                    self._buf = buf[keep:]
+                    break
+                self._in_block = False
+                i = end
+                continue
+
+            m = _BLOCK_HEADER_SEARCH.search(buf, i, memo)
+            hold = n if final else self._hold_from(buf, i)
+            if m is not None and m.start() < hold and (
+                final or m.group(1) or buf.find("\n", m.end()) >= 0
+            ):
+                out.append(buf[i:m.start()])
+                self._in_block = True
+                i = m.end()
+                continue
+            # No header yet; a header ending in [^\n]* or ╗ waits for its line to end
+            if m is not None and m.start() < hold:
+                hold = m.start()
+            out.append(buf[i:hold])
+            self._buf = buf[hold:]
+            break
+        return "".join(out)
+
+    @staticmethod
+    def _hold_from(buf: str, i: int) -> int:
+        """Earliest index ≥ i where a header might still start once more text arrives."""
+        hold = len(buf)
+        line_start = max(i, buf.rfind("\n") + 1)
+        box = buf.find("╔═", line_start)
+        if box >= 0:
+            hold = box
+        elif buf.endswith("╔") and len(buf) - 1 >= line_start:
+            hold = len(buf) - 1
+        # A partial "###…" / "✨…" header runs to the end, so it starts at the last '#' run or '✨'
+        hashes = buf.rfind("#", i)
+        for k in (buf.rfind("✨", i), hashes - 2, hashes - 1, hashes):
+            if i <= k < hold and _HEADER_PARTIAL_RE.match(buf, k):
+                hold = k
+        return hold
+
+    @staticmethod
+    def _block_end(buf: str, i: int, final: bool) -> tuple[int | None, int]:
+        """
+        (index just past the block whose body starts at i, _) — or, if more
+        text is needed to decide, (None, index to keep the buffer from).
+        """
+        n = len(buf)
+        pos = i
+        while True:
+            m = _BLOCK_END_RE.search(buf, pos)
+            if m is None:
+                if final:
+                    return n, n
+                # Only a trailing "\n" / "\n\n" can still become a paragraph break
+                return None, max(pos, len(buf.rstrip("\n")), n - 2)
+            p = m.start()
+            if buf[p] == "\n":
+                return p, p
+            # Box bottom: '╚' … last '╝' on the same line, plus one newline
+            line_end = buf.find("\n", p)
+            if line_end < 0:
+                if not final:
+                    return None, p
+                line_end = n
+            q = buf.rfind("╝", p, line_end)
+            if q < 0:
+                pos = line_end               # no later '╚' on this line can close either
+                continue
+            end = q + 1
+            if end == n and not final:
+                return None, p               # the newline after '╝' is part of the block
+            if end < n and buf[end] == "\n":
+                end += 1
+            return end, end
+
+
+class _LineDropFilter:
+    """Removes from each trigger match to the end of its line (newline included)."""
+
+    __slots__ = ("_buf", "_dropping", "_trigger", "_partial")
+
+    def __init__(self, trigger: _AnchoredSearch, partial):
+        self._buf = ""
+        self._dropping = False
+        self._trigger = trigger
+        self._partial = partial      # callable(buf, i) → index where an undecided trigger starts
+
+    def feed(self, chunk: str, final: bool) -> str:
+        if not self._buf and not self._dropping and not self._trigger.present(chunk):
+            return chunk
+        buf = self._buf + chunk
+        memo = {}
+        out = []
+        i = 0
+        n = len(buf)
+        while i < n:
+            if self._dropping:
+                nl = buf.find("\n", i)
+                if nl < 0:
+                    break
+                self._dropping = False
+                i = nl + 1
+                continue
+            m = self._trigger.search(buf, i, memo)
+            hold = n if final else self._partial(buf, i)
+            if m is None or m.start() >= hold:
+                out.append(buf[i:hold])
+                self._buf = buf[hold:]
+                return "".join(out)
+            out.append(buf[i:m.start()])
+            self._dropping = True
+            i = m.end()
+        self._buf = ""
+        return "".join(out)
+
+
+def _pg_header_hold(buf: str, i: int) -> int:
+    k = buf.rfind("✨", i)
+    return k if k >= 0 and _PG_HEADER_PARTIAL_RE.match(buf, k) else len(buf)
+
+
+def _label_emoji_hold(buf: str, i: int) -> int:
+    return len(buf) - 1 if len(buf) > i and buf.endswith(_LABEL_EMOJI_PARTIAL) else len(buf)
+
+
+class _TidyFilter:
+    """Collapses 3+ newlines to a blank line and strips the reply's ends."""
+
+    __slots__ = ("_pending", "_started")
+
+    def __init__(self):
+        self._pending = ""          # trailing whitespace, emitted only if text follows
+        self._started = False
+
+    def feed(self, chunk: str, final: bool) -> str:
+        buf = self._pending + chunk
+        body = buf.rstrip()
+        self._pending = "" if final else buf[len(body):]
+        if not self._started:
+            body = body.lstrip()
+            if not body:
+                return ""
+            self._started = True
+        return _BLANK_RUN_RE.sub("\n\n", body) if "\n\n\n" in body else body
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API — reply sanitizer
+# ─────────────────────────────────────────────────────────────────────────────
+class ReplySanitizer:
+    """
+    Streaming dashboard stripper. The concatenation of every feed() result
+    plus close() equals strip_llm_dashboard(full_reply).
+    """
+
+    __slots__ = ("_stages", "_closed")
+
+    def __init__(self):
+        self._stages = (
+            _BlockFilter(),
+            _LineDropFilter(_PG_HEADER_SEARCH, _pg_header_hold),
+            _LineDropFilter(_LABEL_EMOJI_SEARCH, _label_emoji_hold),
+            _TidyFilter(),
+        )
+        self._closed = False
+
+    def _run(self, text: str, final: bool) -> str:
+        for stage in self._stages:
+            text = stage.feed(text, final)
+        return text
+
+    def feed(self, chunk: str) -> str:
+        if self._closed:
+            raise ValueError("ReplySanitizer is closed")
+        return self._run(chunk, False) if chunk else ""
+
+    def close(self, chunk: str = "") -> str:
+        """Flushes everything still held back; `chunk` is an optional last piece of text."""
+        if self._closed:
+            raise ValueError("ReplySanitizer is closed")
+        self._closed = True
+        return self._run(chunk, True)
+
+
+def strip_llm_dashboard(text: str) -> str:
+    """Removes every LLM-generated dashboard variant (Home and PG) from a reply."""
+    if not text:
+        return ""
+    if not any(ch in text for ch in _TRIGGER_CHARS):
+        return _TidyFilter().feed(text, True)
+    return ReplySanitizer().close(text)
@@ -0,0 +1,337 @@
+"""
+resilience.py — Deadlines, circuit breakers and hedging around every external call.
+
+One /chat turn has a total budget (TURN_BUDGET_S). Each stage — extractor,
+consultant, geocode, maps, db, recommender — gets its own cap, cut to whatever
+is left of the turn, so a slow upstream can only spend its share:
+
+    with turn_budget():                       # once per turn (main._chat_turn)
+        data = call("db", query.execute, breaker="supabase")
+        reply = complete_llm("consultant", PRIORITY_CHAT, model=..., messages=..., fallback=None)
+
+call() runs the function on a worker thread and stops waiting at the stage
+deadline. A stage that times out, errors, or whose breaker is open returns
+`fallback` (or raises StageUnavailable when none is given) — instantly once
+the breaker has opened.
+
+complete_llm() adds hedging: if the first Groq call hasn't answered by the
+stage's recent p95, one duplicate goes out (only if the scheduler has room
+right now) and the first answer wins.
+
+Every stage's latency and outcome, and the prompt tokens of each LLM stage,
+are kept for GET /metrics (snapshot()).
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from contextlib import contextmanager
+
+from groq_scheduler import GroqShed, groq_scheduler
+
+TURN_BUDGET_S = 12.0
+STAGE_BUDGET_S = {
+    "extractor":   4.0,
+    "consultant":  7.0,           # 70B model (model_router)
+    "consultant_small": 3.0,      # 8B model; leaves room to escalate to the 70B
+    "recommender": 6.0,
+    "geocode":     2.0,
+    "maps":        2.0,
+    "db":          4.0,
+}
+
+BREAKER_FAILURES = 5          # consecutive failures that open a breaker
+BREAKER_COOLDOWN_S = 15.0     # open → half-open (one trial call) after this
+
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20        # no hedging until the stage has this much history
+HEDGE_FLOOR_S = 0.25
+
+LATENCY_SAMPLES = 500
+
+_RAISE = object()
+_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="upstream")
+
+
+class StageUnavailable(Exception):
+    """The stage timed out, failed, or its breaker is open, and there is no fallback."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Turn budget
+# ─────────────────────────────────────────────────────────────────────────────
+class TurnBudget:
+    __slots__ = ("deadline",)
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+_current_budget: contextvars.ContextVar[TurnBudget | None] = contextvars.ContextVar(
+    "turn_budget", default=None,
+)
+
+
+@contextmanager
+def turn_budget(seconds: float = TURN_BUDGET_S):
+    budget = TurnBudget(seconds)
+    token = _current_budget.set(budget)
+    started = time.monotonic()
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+        tracker.record("turn", time.monotonic() - started, "ok" if budget.remaining() >= 0 else "over_budget")
+
+
+def stage_timeout(stage: str) -> float:
+    """Seconds this stage may still take (≤ 0 → the turn is out of time)."""
+    cap = STAGE_BUDGET_S[stage]
+    budget = _current_budget.get()
+    return cap if budget is None else min(cap, budget.remaining())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Latency / outcome tracking
+# ─────────────────────────────────────────────────────────────────────────────
+class LatencyTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = {}
+        self._outcomes: dict[tuple[str, str], int] = {}
+        self._prompt_tokens: dict[str, list[int]] = {}      # stage → [calls, tokens]
+
+    def record(self, stage: str, seconds: float, outcome: str) -> None:
+        with self._lock:
+            key = (stage, outcome)
+            self._outcomes[key] = self._outcomes.get(key, 0) + 1
+            if outcome in ("ok", "over_budget"):
+                self._samples.setdefault(stage, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+    def count(self, stage: str, outcome: str) -> None:
+        with self._lock:
+            key = (stage, outcome)
+            self._outcomes[key] = self._outcomes.get(key, 0) + 1
+
+    def prompt_tokens(self, stage: str, tokens: int) -> None:
+        with self._lock:
+            spent = self._prompt_tokens.setdefault(stage, [0, 0])
+            spent[0] += 1
+            spent[1] += tokens
+
+    def percentile(self, stage: str, q: float, min_samples: int = 1) -> float | None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if not samples or len(samples) < min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {stage: sorted(s) for stage, s in self._samples.items()}
+            outcomes = dict(self._outcomes)
+            prompt_tokens = {stage: {"calls": c, "tokens": t} for stage, (c, t) in self._prompt_tokens.items()}
+        latency = {}
+        for stage, ordered in stages.items():
+            n = len(ordered)
+            latency[stage] = {
+                f"p{int(q * 100)}_ms": round(ordered[min(n - 1, int(n * q))] * 1000, 1)
+                for q in (0.5, 0.95, 0.99)
+            }
+        return {"latency": latency, "outcomes": outcomes, "prompt_tokens": prompt_tokens}
+
+
+tracker = LatencyTracker()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Circuit breakers
+# ─────────────────────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    """closed → (N consecutive failures) → open → (cooldown) → half-open → one trial."""
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_S):
+        self.name = name
+        self.failures_to_open = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.state = "closed"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self.state = "closed"
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failures_to_open:
+                if self.state != "open":
+                    print(f"⚠️  Circuit '{self.name}' opened after {self._failures} failure(s)")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        b = _breakers.get(name)
+        if b is None:
+            b = _breakers[name] = CircuitBreaker(name)
+        return b
+
+
+def breaker_states() -> dict[str, str]:
+    with _breakers_lock:
+        return {name: b.state for name, b in _breakers.items()}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Guarded calls
+# ─────────────────────────────────────────────────────────────────────────────
+def _unavailable(stage: str, fallback, reason: str):
+    if fallback is _RAISE:
+        raise StageUnavailable(f"{stage}: {reason}")
+    return fallback
+
+
+def call(stage: str, fn, *args, breaker: str | None = None, fallback=_RAISE, **kwargs):
+    """
+    fn(*args, **kwargs) under the stage deadline and (optionally) a breaker.
+    A timed-out call keeps running on its worker thread; its result is dropped.
+    """
+    guard = _breaker_for(breaker)
+    if guard is not None and not guard.allow():
+        tracker.count(stage, "short_circuit")
+        return _unavailable(stage, fallback, "circuit open")
+    timeout = stage_timeout(stage)
+    if timeout <= 0:
+        tracker.count(stage, "no_budget")
+        return _unavailable(stage, fallback, "turn out of time")
+
+    started = time.monotonic()
+    future = _pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+    try:
+        result = future.result(timeout=timeout)
+    except TimeoutError:
+        if guard is not None:
+            guard.failure()
+        tracker.count(stage, "timeout")
+        return _unavailable(stage, fallback, f"no answer within {timeout:.1f}s")
+    except Exception as exc:
+        if guard is not None:
+            guard.failure()
+        tracker.count(stage, "error")
+        print(f"⚠️  {stage} failed: {type(exc).__name__}: {exc}")
+        return _unavailable(stage, fallback, type(exc).__name__)
+    if guard is not None:
+        guard.success()
+    tracker.record(stage, time.monotonic() - started, "ok")
+    return result
+
+
+def _breaker_for(name: str | None) -> CircuitBreaker | None:
+    return breaker(name) if name else None
+
+
+def complete_llm(stage: str, priority: int, *, model: str, messages: list, fallback=_RAISE,
+                 max_wait_s: float | None = None, **kwargs):
+    """
+    groq_scheduler.complete under the stage deadline, a per-model breaker and
+    hedging. Returns the completion, or `fallback` when the stage can't answer.
+    max_wait_s caps the time spent queueing for quota (0 = only if there's room now).
+    """
+    guard = breaker(f"groq:{model}")
+    if not guard.allow():
+        tracker.count(stage, "short_circuit")
+        return _unavailable(stage, fallback, "circuit open")
+    timeout = stage_timeout(stage)
+    if timeout <= 0:
+        tracker.count(stage, "no_budget")
+        return _unavailable(stage, fallback, "turn out of time")
+
+    started = time.monotonic()
+    deadline = started + timeout
+    ctx = contextvars.copy_context()
+
+    def attempt(max_wait: float | None):
+        return groq_scheduler.complete(
+            priority, model=model, messages=messages,
+            max_wait_s=max_wait, timeout=max(0.1, deadline - time.monotonic()), **kwargs,
+        )
+
+    futures = {_pool.submit(ctx.copy().run, attempt, timeout if max_wait_s is None else min(timeout, max_wait_s))}
+    hedge_after = tracker.percentile(stage, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    hedged = False
+    last_error: Exception | None = None
+
+    while futures:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        until = deadline - now
+        if not hedged and hedge_after is not None:
+            until = min(until, max(HEDGE_FLOOR_S, hedge_after) - (now - started))
+        done, futures = wait(futures, timeout=max(0.0, until), return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                result = f.result()
+            except GroqShed as exc:
+                last_error = exc           # a shed hedge isn't an upstream failure
+                continue
+            except Exception as exc:
+                last_error = exc
+                continue
+            guard.success()
+            tracker.record(stage, time.monotonic() - started, "ok")
+            usage = getattr(result, "usage", None)
+            if usage is not None:
+                tracker.prompt_tokens(stage, getattr(usage, "prompt_tokens", 0) or 0)
+            if hedged:
+                tracker.count(stage, "hedge_used")
+            return result
+        if not done and not hedged and hedge_after is not None:
+            # Slower than this stage's recent p95: one duplicate, only if Groq
+            # has room for it right now (max_wait_s=0 — hedges never queue)
+            hedged = True
+            tracker.count(stage, "hedged")
+            futures.add(_pool.submit(ctx.copy().run, attempt, 0.0))
+
+    if futures:
+        guard.failure()
+        tracker.count(stage, "timeout")
+        return _unavailable(stage, fallback, f"no answer within {timeout:.1f}s")
+    if not isinstance(last_error, GroqShed):
+        guard.failure()
+    tracker.count(stage, "shed" if isinstance(last_error, GroqShed) else "error")
+    print(f"⚠️  {stage} failed: {type(last_error).__name__}: {last_error}")
+    return _unavailable(stage, fallback, type(last_error).__name__)
+
+
+def snapshot() -> dict:
+    return {**tracker.snapshot(), "breakers": breaker_states()}
@@ -236,13 +236,14 @@ class RentalExtractionMonitor(BaseModel):
         Never clears fields when property_type is None (early in conversation).
         """
         if self.property_type == "PG":
-            self.size_bhk = None
-            self.total_sqft = None
-            self.marital_status = None
-
+            cleared = ("size_bhk", "total_sqft", "marital_status")
         elif self.property_type in ("Apartment", "Independent House", "Villa"):
-            self.Sharing = None
-            self.gender_preference = None
-            self.nearby_hub = None
-
+            cleared = ("Sharing", "gender_preference", "nearby_hub")
+        else:
+            return self
+
+        # Write straight to __dict__: with validate_assignment=True a normal
+        # assignment re-runs this validator and recurses until RecursionError.
+        for field in cleared:
+            self.__dict__[field] = None
         return self
\ No newline at end of file
@@ -0,0 +1,793 @@
+"""
+fake_services.py — Local stand-ins for Groq, Supabase (PostgREST) and Google Maps.
+
+One FastAPI app that speaks enough of each API for every backend code path to
+run, with injected latency and errors, so /chat can be load-tested without
+real tokens or quota. Point the backend at it with FAKE_SERVICES_URL (see
+service_endpoints.py).
+
+Served endpoints:
+  POST /openai/v1/chat/completions        Groq chat completions (plain and stream=true).
+                                          Extraction prompts get a compact JSON object
+                                          (ai_tools.py keys) parsed from the latest user
+                                          message, fenced now and then unless
+                                          response_format is json_object; consultant and
+                                          recommender prompts get canned replies.
+                                          Responses carry x-ratelimit-* headers.
+  GET|HEAD|PATCH /rest/v1/<table>         PostgREST: select, eq/neq/gt/gte/lt/lte,
+                                          like/ilike, in, is, not.*, or=(…) / and=(…)
+                                          logic trees (nested, quoted values), order,
+                                          limit, offset, Prefer: count=exact.
+                                          properties  ← data_pipeline CSV (+ area_id, lat/lng)
+                                          PG_Listings ← synthesised, seeded
+  GET /maps/api/geocode/json              area centroid of the address, or ZERO_RESULTS
+  GET /maps/api/place/nearbysearch/json   metro stations within `radius`
+  GET /maps/api/distancematrix/json       straight line × road factor at peak-hour speed
+  GET|POST /__fake/config                 read / change latency and error settings live
+  GET /__fake/stats                       request, error, latency and response-byte
+                                          counters per service (bytes: PostgREST)
+
+Latency is lognormal: delay = median × exp(sigma × N(0, 1)). Profiles are looked
+up as "<service>:<model>" first (Groq only), then "<service>".
+
+Usage (from backend/):
+    python scripts/fake_services.py                                   # port 8900
+    python scripts/fake_services.py --latency groq=0 --latency postgrest=0
+    python scripts/fake_services.py --latency groq:llama-3.3-70b-versatile=1500,0.6 \\
+                                    --errors groq=0.02 --enforce-rate-limits
+    FAKE_SERVICES_URL=http://127.0.0.1:8900 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import uuid
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from location_areas import AREA_IDS, area_id_for, normalise_area  # noqa: E402
+
+# --- CONFIGURATION ---
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data_pipeline", "data")
+PROPERTIES_CSV = os.path.join(DATA_DIR, "bangalore_rentals_enhanced_with_real_properties.csv")
+PG_LISTING_COUNT = 1500
+DEFAULT_PORT = 8900
+SEED = 31
+
+# (median ms, sigma) — roughly what production sees from Bengaluru
+DEFAULT_LATENCY = {
+    "groq": (600.0, 0.5),
+    "groq:llama-3.1-8b-instant": (300.0, 0.4),
+    "groq:llama-3.3-70b-versatile": (1100.0, 0.5),
+    "postgrest": (45.0, 0.5),
+    "maps": (120.0, 0.4),
+}
+# Per-model quota reported in x-ratelimit-* headers (and enforced with --enforce-rate-limits)
+DEFAULT_RATE_LIMITS = {"requests_per_min": 1000, "tokens_per_min": 300_000}
+
+# Approximate area centroids (lat, lng); areas not listed get a stable point inside the city
+AREA_CENTROIDS = {
+    "Jayanagar": (12.9250, 77.5938), "JP Nagar": (12.9063, 77.5857), "BTM Layout": (12.9166, 77.6101),
+    "Banashankari": (12.9255, 77.5468), "Basavanagudi": (12.9406, 77.5738), "Koramangala": (12.9352, 77.6245),
+    "HSR Layout": (12.9116, 77.6474), "Bellandur": (12.9304, 77.6784), "Sarjapur Road": (12.9100, 77.6850),
+    "Marathahalli": (12.9569, 77.7011), "Whitefield": (12.9698, 77.7500), "Indiranagar": (12.9784, 77.6408),
+    "Domlur": (12.9610, 77.6387), "HAL": (12.9590, 77.6650), "Old Airport Road": (12.9600, 77.6480),
+    "Frazer Town": (12.9980, 77.6150), "Ulsoor": (12.9817, 77.6200), "MG Road": (12.9756, 77.6050),
+    "Brigade Road": (12.9719, 77.6070), "Richmond Town": (12.9620, 77.6030), "Shivajinagar": (12.9857, 77.6057),
+    "Malleswaram": (13.0035, 77.5710), "Rajajinagar": (12.9910, 77.5520), "Vijayanagar": (12.9719, 77.5350),
+    "Yeshwanthpur": (13.0220, 77.5400), "Hebbal": (13.0358, 77.5970), "Manyata Tech Park": (13.0450, 77.6210),
+    "Nagawara": (13.0400, 77.6200), "Thanisandra": (13.0550, 77.6330), "Hennur": (13.0370, 77.6400),
+    "Banaswadi": (13.0140, 77.6510), "Kammanahalli": (13.0150, 77.6380), "Kalyan Nagar": (13.0220, 77.6400),
+    "RT Nagar": (13.0210, 77.5950), "Sahakara Nagar": (13.0620, 77.5860), "Electronic City": (12.8452, 77.6602),
+    "Begur": (12.8760, 77.6270), "Hosa Road": (12.8820, 77.6600), "Bommanahalli": (12.9000, 77.6250),
+    "Haralur Road": (12.9050, 77.6600), "Kadugodi": (12.9980, 77.7600), "ITPL": (12.9860, 77.7370),
+    "Brookefield": (12.9660, 77.7180), "KR Puram": (13.0050, 77.6950), "Hoodi": (12.9920, 77.7160),
+    "Mahadevapura": (12.9910, 77.6900), "Yelahanka": (13.1007, 77.5963), "Devanahalli": (13.2470, 77.7120),
+    "Doddaballapur Road": (13.0800, 77.5600), "Tumkur Road": (13.0300, 77.5200), "Magadi Road": (12.9800, 77.5300),
+    "Mysore Road": (12.9500, 77.5300), "Kanakapura Road": (12.8900, 77.5600), "Bannerghatta Road": (12.8900, 77.5970),
+    "Hulimavu": (12.8800, 77.6000), "Gottigere": (12.8570, 77.5880), "Konanakunte": (12.8860, 77.5660),
+    "Electronic City Phase 1": (12.8450, 77.6600), "Electronic City Phase 2": (12.8230, 77.6790),
+    "Bommasandra": (12.8170, 77.6950), "Jigani": (12.7830, 77.6380), "Attibele": (12.7780, 77.7710),
+    "Chandapura": (12.8000, 77.7000), "Sarjapur": (12.8600, 77.7860), "Varthur": (12.9400, 77.7470),
+    "Gunjur": (12.9270, 77.7440), "Panathur": (12.9350, 77.7100), "Wilson Garden": (12.9480, 77.5970),
+    "Langford Town": (12.9570, 77.6020), "Cleveland Town": (12.9960, 77.6140), "Lingarajapuram": (13.0130, 77.6280),
+    "CV Raman Nagar": (12.9850, 77.6630), "Kasturinagar": (13.0030, 77.6600), "Ramamurthy Nagar": (13.0120, 77.6770),
+    "Vimanapura": (12.9620, 77.6770), "Peenya": (13.0280, 77.5190), "Dasarahalli": (13.0450, 77.5130),
+    "HBR Layout": (13.0350, 77.6300), "Horamavu": (13.0280, 77.6600), "Krishnarajapuram": (13.0050, 77.6950),
+    "Munnekolala": (12.9550, 77.7150), "Basaveshwara Nagar": (12.9880, 77.5380), "Nandini Layout": (13.0150, 77.5400),
+    "Nagarabhavi": (12.9600, 77.5100), "RR Nagar": (12.9270, 77.5170), "Uttarahalli": (12.9050, 77.5450),
+    "Anekal": (12.7100, 77.6960), "Jakkur": (13.0780, 77.6070), "Vidyaranyapura": (13.0770, 77.5590),
+    "Sanjaynagar": (13.0350, 77.5760), "Sampangi Ram Nagar": (12.9650, 77.5950), "Ashok Nagar": (12.9690, 77.6070),
+    "Residency Road": (12.9680, 77.6050), "Vasanth Nagar": (12.9900, 77.5930), "Mathikere": (13.0330, 77.5610),
+    "Cunningham Road": (12.9870, 77.5950), "Jalahalli": (13.0460, 77.5490),
+}
+
+METRO_STATIONS = [
+    ("Nadaprabhu Kempegowda Station, Majestic", 12.9757, 77.5729), ("MG Road", 12.9755, 77.6068),
+    ("Trinity", 12.9730, 77.6170), ("Halasuru", 12.9760, 77.6265), ("Indiranagar", 12.9784, 77.6386),
+    ("Swami Vivekananda Road", 12.9858, 77.6449), ("Baiyappanahalli", 12.9908, 77.6525),
+    ("Krishnarajapura", 13.0005, 77.6780), ("Mahadevapura", 12.9965, 77.6925),
+    ("Garudacharapalya", 12.9935, 77.7035), ("Hoodi", 12.9886, 77.7114), ("Kundalahalli", 12.9770, 77.7160),
+    ("Whitefield (Kadugodi)", 12.9955, 77.7580), ("Cubbon Park", 12.9810, 77.5970),
+    ("Dr. B.R. Ambedkar Station, Vidhana Soudha", 12.9796, 77.5907), ("Sir M. Visvesvaraya", 12.9740, 77.5840),
+    ("Mantri Square Sampige Road", 12.9910, 77.5710), ("Srirampura", 12.9970, 77.5640),
+    ("Rajajinagar", 13.0050, 77.5500), ("Yeshwanthpur", 13.0230, 77.5500), ("Peenya", 13.0330, 77.5330),
+    ("Jalahalli", 13.0390, 77.5190), ("Chickpete", 12.9670, 77.5740), ("National College", 12.9500, 77.5740),
+    ("Lalbagh", 12.9470, 77.5800), ("Jayanagar", 12.9300, 77.5800), ("Banashankari", 12.9150, 77.5730),
+    ("JP Nagar", 12.9070, 77.5730), ("Konanakunte Cross", 12.8840, 77.5530), ("Vijayanagar", 12.9710, 77.5370),
+    ("Mysuru Road", 12.9470, 77.5300), ("RV Road", 12.9210, 77.5800), ("BTM Layout", 12.9160, 77.6110),
+    ("Central Silk Board", 12.9170, 77.6230), ("Bommanahalli", 12.9000, 77.6250),
+    ("Electronic City", 12.8450, 77.6650), ("Bommasandra", 12.8160, 77.6940),
+]
+
+PG_HUBS = [
+    "Manyata Tech Park", "Embassy Tech Village", "Bagmane Tech Park", "ITPL", "Electronic City Infosys",
+    "Christ University", "RV College of Engineering", "PES University", "Ecospace", "Global Village Tech Park",
+]
+_TENANT_NAMES = ["Ravi Kumar", "Lakshmi Devi", "Suresh Reddy", "Anita Rao", "Manoj Kumar", "Farah Khan", "Prakash Gowda"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Latency / error injection
+# ─────────────────────────────────────────────────────────────────────────────
+class Injector:
+    def __init__(self, latency: dict, errors: dict, seed: int):
+        self.latency = dict(latency)               # name → (median_ms, sigma)
+        self.errors = dict(errors)                 # name → probability
+        self._rng = random.Random(seed)
+        self.stats = defaultdict(lambda: {"requests": 0, "errors": 0, "delay_ms_total": 0.0, "bytes_out": 0})
+
+    def _lookup(self, table: dict, service: str, model: str | None, default):
+        if model and f"{service}:{model}" in table:
+            return table[f"{service}:{model}"]
+        return table.get(service, default)
+
+    async def delay(self, service: str, model: str | None = None) -> float:
+        median, sigma = self._lookup(self.latency, service, model, (0.0, 0.0))
+        ms = median * math.exp(sigma * self._rng.gauss(0.0, 1.0)) if median > 0 else 0.0
+        stats = self.stats[service]
+        stats["requests"] += 1
+        stats["delay_ms_total"] += ms
+        if ms:
+            await asyncio.sleep(ms / 1000)
+        return ms
+
+    def should_fail(self, service: str, model: str | None = None) -> bool:
+        if self._rng.random() < self._lookup(self.errors, service, model, 0.0):
+            self.stats[service]["errors"] += 1
+            return True
+        return False
+
+
+class RateWindow:
+    """Per-model request / token buckets, refilled continuously like Groq's."""
+
+    def __init__(self, limits: dict, enforce: bool):
+        self.limits = limits
+        self.enforce = enforce
+        self._buckets: dict[str, list] = {}        # model → [last_refill, requests_left, tokens_left]
+
+    def take(self, model: str, tokens: int) -> tuple[bool, dict]:
+        now = time.time()
+        rpm, tpm = self.limits["requests_per_min"], self.limits["tokens_per_min"]
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            bucket = self._buckets[model] = [now, float(rpm), float(tpm)]
+        elapsed, bucket[0] = now - bucket[0], now
+        bucket[1] = min(rpm, bucket[1] + elapsed * rpm / 60)
+        bucket[2] = min(tpm, bucket[2] + elapsed * tpm / 60)
+        allowed = not self.enforce or (bucket[1] >= 1 and bucket[2] >= tokens)
+        if allowed:
+            bucket[1] -= 1
+            bucket[2] -= tokens
+        # reset = time until the bucket is full again (Groq's meaning)
+        reset_requests = (rpm - bucket[1]) * 60 / rpm
+        reset_tokens = (tpm - bucket[2]) * 60 / tpm
+        headers = {
+            "x-ratelimit-limit-requests": str(rpm),
+            "x-ratelimit-remaining-requests": str(max(0, int(bucket[1]))),
+            "x-ratelimit-reset-requests": f"{reset_requests:.2f}s",
+            "x-ratelimit-limit-tokens": str(tpm),
+            "x-ratelimit-remaining-tokens": str(max(0, int(bucket[2]))),
+            "x-ratelimit-reset-tokens": f"{reset_tokens:.2f}s",
+        }
+        if not allowed:
+            short = max((1 - bucket[1]) * 60 / rpm, (tokens - bucket[2]) * 60 / tpm)
+            headers["retry-after"] = str(max(1, math.ceil(short)))
+        return allowed, headers
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Data
+# ─────────────────────────────────────────────────────────────────────────────
+def _centroid(area: str) -> tuple[float, float]:
+    if area in AREA_CENTROIDS:
+        return AREA_CENTROIDS[area]
+    h = zlib.crc32(area.encode())
+    return 12.85 + (h % 1000) / 1000 * 0.25, 77.50 + (h // 1000 % 1000) / 1000 * 0.25
+
+
+def _with_geo(df: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    canonical = df["location"].map(lambda loc: normalise_area(loc) or loc)
+    centroids = canonical.map(_centroid)
+    df["area_id"] = df["location"].map(lambda loc: area_id_for(loc) or 0).astype("int64")
+    df["latitude"] = centroids.map(lambda c: c[0]) + rng.normal(0, 0.006, len(df))
+    df["longitude"] = centroids.map(lambda c: c[1]) + rng.normal(0, 0.006, len(df))
+    return df
+
+
+def load_properties(seed: int) -> pd.DataFrame:
+    df = pd.read_csv(PROPERTIES_CSV)
+    return _with_geo(df, np.random.default_rng(seed))
+
+
+def synth_pg_listings(n: int, areas: list[str], seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    sharing = rng.choice([1, 2, 3, 4], n, p=[0.2, 0.4, 0.3, 0.1])
+    base = np.array([0, 15000, 10500, 8000, 6500])[sharing]
+    rent = (base * rng.lognormal(0, 0.2, n) / 100).round().astype("int64") * 100
+    location = rng.choice(areas, n)
+    df = pd.DataFrame({
+        "listing_id": [f"PG-{i:05d}" for i in range(n)],
+        "property_name": [f"Tatva Stay {loc}" for loc in location],
+        "location": location,
+        "property_type": "PG",
+        "size_bhk": sharing.astype("int64"),
+        "rent_price_inr_per_month": rent,
+        "legal_security_deposit": rent * 2,
+        "preferred_tenants": rng.choice(["Boys", "Girls", "Unisex"], n, p=[0.45, 0.35, 0.2]),
+        "food_included": rng.random(n) < 0.6,
+        "has_gym": rng.random(n) < 0.25,
+        "has_wifi": rng.random(n) < 0.85,
+        "has_washing_machine": rng.random(n) < 0.5,
+        "nearby_hub": rng.choice(PG_HUBS, n),
+        "contact_person": rng.choice(_TENANT_NAMES, n),
+        "contact_number": [f"+91 9{rng.integers(100000000, 999999999)}" for _ in range(n)],
+    })
+    df["detailed_address"] = [f"#{rng.integers(1, 900)}, {loc}, Bangalore" for loc in location]
+    return _with_geo(df, rng)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PostgREST
+# ─────────────────────────────────────────────────────────────────────────────
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status, self.code, self.message = status, code, message
+
+
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_LOGIC_PARAMS = {"or", "and", "not.or", "not.and"}
+
+
+def _like_regex(pattern: str) -> str:
+    out = []
+    for ch in pattern:
+        out.append(".*" if ch in "%*" else "." if ch == "_" else re.escape(ch))
+    return "".join(out)
+
+
+def _typed(series: pd.Series, raw: str):
+    if pd.api.types.is_bool_dtype(series):
+        return raw.lower() == "true"
+    if pd.api.types.is_numeric_dtype(series):
+        try:
+            return float(raw)
+        except ValueError:
+            raise PostgrestError(400, "22P02", f'invalid input syntax for type numeric: "{raw}"')
+    return raw
+
+
+def _mask(df: pd.DataFrame, column: str, expr: str) -> pd.Series:
+    if column not in df.columns:
+        raise PostgrestError(400, "42703", f"column {column} does not exist")
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, arg = expr.partition(".")
+    col = df[column]
+
+    if op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        value = _typed(col, arg)
+        mask = {"eq": col == value, "neq": col != value, "gt": col > value,
+                "gte": col >= value, "lt": col < value, "lte": col <= value}[op]
+    elif op in ("like", "ilike"):
+        mask = col.astype(str).str.fullmatch(_like_regex(arg), case=(op == "like")) & col.notna()
+    elif op == "in":
+        values = [v.strip().strip('"') for v in arg.strip("()").split(",") if v.strip()]
+        mask = col.isin([_typed(col, v) for v in values])
+    elif op == "is":
+        if arg == "null":
+            mask = col.isna()
+        elif arg in ("true", "false"):
+            mask = col == (arg == "true")
+        else:
+            raise PostgrestError(400, "PGRST100", f"unsupported is.{arg}")
+    else:
+        raise PostgrestError(400, "PGRST100", f"unsupported operator {op}")
+    mask = mask.fillna(False).astype(bool)
+    return ~mask if negate else mask
+
+
+def _split_terms(body: str) -> list[str]:
+    """Top-level comma-separated terms of a logic tree body (parentheses / quotes respected)."""
+    terms, depth, quoted, start = [], 0, False, 0
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if quoted:
+            if ch == "\\":
+                i += 1
+            elif ch == '"':
+                quoted = False
+        elif ch == '"':
+            quoted = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            terms.append(body[start:i])
+            start = i + 1
+        i += 1
+    terms.append(body[start:])
+    return [t.strip() for t in terms if t.strip()]
+
+
+def _unquoted(expr: str) -> str:
+    op, _, arg = expr.partition(".")
+    if len(arg) >= 2 and arg[0] == arg[-1] == '"':
+        arg = re.sub(r"\\(.)", r"\1", arg[1:-1])
+    return f"{op}.{arg}"
+
+
+def _logic_mask(df: pd.DataFrame, op: str, body: str) -> pd.Series:
+    """or=(a.gt.1,and(b.eq.2,c.lt.3)) — each term is a column filter or a nested tree."""
+    negate = op.startswith("not.")
+    op = op.removeprefix("not.")
+    if not (body.startswith("(") and body.endswith(")")):
+        raise PostgrestError(400, "PGRST100", f"malformed {op} tree: {body}")
+    masks = []
+    for term in _split_terms(body[1:-1]):
+        head, paren, rest = term.partition("(")
+        if paren and head in _LOGIC_PARAMS:
+            masks.append(_logic_mask(df, head, "(" + rest))
+            continue
+        negated = term.startswith("not.")
+        column, _, expr = term.removeprefix("not.").partition(".")
+        masks.append(_mask(df, column, ("not." if negated else "") + _unquoted(expr)))
+    mask = masks[0]
+    for m in masks[1:]:
+        mask = (mask | m) if op == "or" else (mask & m)
+    return ~mask if negate else mask
+
+
+def _select_columns(df: pd.DataFrame, select: str) -> list[str]:
+    if not select or select.strip() == "*":
+        return list(df.columns)
+    cols = []
+    for item in select.split(","):
+        name = item.strip().split("::")[0].split(":")[-1].strip()
+        if name == "*":
+            cols.extend(df.columns)
+        elif name not in df.columns:
+            raise PostgrestError(400, "42703", f"column {name} does not exist")
+        else:
+            cols.append(name)
+    return cols
+
+
+def _order(df: pd.DataFrame, order: str) -> pd.DataFrame:
+    keys, ascending = [], []
+    for term in order.split(","):
+        parts = term.strip().split(".")
+        if parts[0] not in df.columns:
+            raise PostgrestError(400, "42703", f"column {parts[0]} does not exist")
+        keys.append(parts[0])
+        ascending.append("desc" not in parts[1:])
+    return df.sort_values(keys, ascending=ascending, kind="stable")
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Groq
+# ─────────────────────────────────────────────────────────────────────────────
+_BUDGET_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(k\b|thousand|lakhs?|l\b)|\b(\d{4,6})\b", re.IGNORECASE)
+_BHK_RE = re.compile(r"(\d)\s*bhk", re.IGNORECASE)
+_SHARING_RE = re.compile(r"\b(single|double|triple|four|[1-4])[\s-]*(?:sharing|room|occupancy)", re.IGNORECASE)
+_SHARING_WORDS = {"single": 1, "double": 2, "triple": 3, "four": 4}
+_LOCATION_RE = re.compile(r"\b(?:in|at|near|around)\s+([A-Za-z][A-Za-z ]{2,30})", re.IGNORECASE)
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _rupees(m: re.Match) -> int:
+    if m.group(3):
+        return int(m.group(3))
+    unit = m.group(2).lower()
+    scale = 100_000 if unit.startswith("l") else 1000
+    return int(float(m.group(1)) * scale)
+
+
+def fake_extraction(system: str, message: str) -> dict:
+    """What a well-behaved extractor returns for the latest message (compact keys, see ai_tools.py)."""
+    lower = message.lower()
+    out: dict = {}
+    m = _BUDGET_RE.search(message)
+    if m:
+        out["rent"] = _rupees(m)
+    location = None
+    for m in _LOCATION_RE.finditer(message):
+        words = m.group(1).split()
+        for n in range(min(3, len(words)), 0, -1):
+            location = normalise_area(" ".join(words[:n]))
+            if location in AREA_IDS:
+                break
+            location = None
+        if location:
+            break
+    if location is None and len(message.split()) <= 3:
+        candidate = normalise_area(message)
+        location = candidate if candidate in AREA_IDS else None
+    if location:
+        out["loc"] = location
+
+    if "PERSONA: PG SEARCH" in system:
+        m = _SHARING_RE.search(message)
+        if m:
+            token = m.group(1).lower()
+            out["share"] = int(_SHARING_WORDS.get(token, token))
+        if any(w in lower for w in ("girls", "female", "ladies")):
+            out["gen"] = "G"
+        elif any(w in lower for w in ("boys", "male", "gents")):
+            out["gen"] = "B"
+        elif any(w in lower for w in ("unisex", "any gender", "co-living")):
+            out["gen"] = "U"
+        for key, words in (("food", ("food", "meal", "mess", "tiffin")),
+                           ("gym", ("gym", "fitness")),
+                           ("wash", ("laundry", "washing"))):
+            if any(w in lower for w in words):
+                out[key] = True
+    elif "PERSONA: HOME SEARCH" in system:
+        m = _BHK_RE.search(message)
+        if m:
+            out["bhk"] = int(m.group(1))
+        if any(w in lower for w in ("wife", "husband", "family", "married", "kids")):
+            out["mar"] = "M"
+        elif any(w in lower for w in ("alone", "bachelor", "single", "solo")):
+            out["mar"] = "S"
+    return out
+
+
+def fake_consultant_reply(system: str, message: str, rng: random.Random, model: str = "") -> str:
+    lower = message.lower()
+    if "GROUND TRUTH" in system and any(w in lower for w in ("show", "list", "find")):
+        body = "Here you go — pulling up the best matches for you now! 🏠"
+    elif "Database Findings" in message:
+        body = ("I searched everywhere, but nothing matched exactly. 😕 "
+                "Should we stretch the budget a little, or look at a wider area?")
+    else:
+        body = rng.choice([
+            "Great choice! 🏠 What's your monthly budget, and which area do you prefer?",
+            "Got it! 👍 Do you need food included, and would you like a gym nearby?",
+            "Perfect. Is this for yourself, and do you prefer single or double sharing?",
+            "Ready to see your matches? Just say show me! 🏠🔥",
+        ])
+    if "8b" in model and rng.random() < 0.15:
+        # The small model breaks the OUTPUT RULES more often (model_router escalates these)
+        body = rng.choice([
+            "Sure! " + body,
+            body + " Also, do you smoke? And do you have pets? Any parking needs?",
+        ])
+    if rng.random() < 0.2:
+        # The real model ignores the "no dashboard" rule now and then
+        body = "### STATUS DASHBOARD\n📍 Location: noted\n💰 Budget: noted\n\n" + body
+    return body
+
+
+def completion_payload(model: str, content: str, prompt_tokens: int) -> dict:
+    completion_tokens = _approx_tokens(content)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "logprobs": None,
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Maps
+# ─────────────────────────────────────────────────────────────────────────────
+def _haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def _latlng(value: str) -> tuple[float, float] | None:
+    try:
+        lat, lng = (float(v) for v in value.split("|")[0].split(","))
+        return lat, lng
+    except ValueError:
+        return None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# App
+# ─────────────────────────────────────────────────────────────────────────────
+def create_app(injector: Injector, rates: RateWindow, seed: int = SEED) -> FastAPI:
+    app = FastAPI(title="Fake Groq / Supabase / Maps")
+    properties = load_properties(seed)
+    areas = sorted(properties["location"].unique())
+    tables = {
+        "properties": properties,
+        "PG_Listings": synth_pg_listings(PG_LISTING_COUNT, areas, seed),
+    }
+    reply_rng = random.Random(seed)
+    print(f"🧪 Fake services ready: {', '.join(f'{k} ({len(v)} rows)' for k, v in tables.items())}")
+
+    # ── Groq ────────────────────────────────────────────────────────────────
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "unknown")
+        messages = body.get("messages", [])
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        latest = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        prompt_tokens = sum(_approx_tokens(m.get("content") or "") for m in messages)
+
+        allowed, rate_headers = rates.take(model, prompt_tokens + int(body.get("max_tokens") or 256))
+        await injector.delay("groq", model)
+        if not allowed or injector.should_fail("groq", model):
+            rate_headers.setdefault("retry-after", "1")
+            return JSONResponse(status_code=429, headers=rate_headers, content={"error": {
+                "message": f"Rate limit reached for model `{model}`.",
+                "type": "tokens", "code": "rate_limit_exceeded",
+            }})
+
+        if system.startswith("You are a strict data-extraction unit"):
+            content = json.dumps(fake_extraction(system, latest), separators=(",", ":"))
+            if (body.get("response_format") or {}).get("type") != "json_object" and reply_rng.random() < 0.3:
+                # Outside JSON mode the model wraps the object in a fence now and then
+                content = f"```json\n{content}\n```"
+        else:
+            content = fake_consultant_reply(system, latest, reply_rng, model)
+
+        payload = completion_payload(model, content, prompt_tokens)
+        if not body.get("stream"):
+            return JSONResponse(payload, headers=rate_headers)
+
+        async def sse():
+            base = {k: payload[k] for k in ("id", "created", "model")}
+            words = re.findall(r"\S+\s*", content)
+            for i, word in enumerate(words):
+                delta = {"role": "assistant", "content": word} if i == 0 else {"content": word}
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0.01)
+            final = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                     "x_groq": {"usage": payload["usage"]}}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream", headers=rate_headers)
+
+    # ── PostgREST ───────────────────────────────────────────────────────────
+    def _filtered(table: str, request: Request) -> pd.DataFrame:
+        if table not in tables:
+            raise PostgrestError(404, "42P01", f'relation "public.{table}" does not exist')
+        df = tables[table]
+        mask = None
+        for key, value in request.query_params.multi_items():
+            if key in _RESERVED_PARAMS:
+                continue
+            m = _logic_mask(df, key, value) if key in _LOGIC_PARAMS else _mask(df, key, value)
+            mask = m if mask is None else mask & m
+        return df if mask is None else df[mask]
+
+    def _error(exc: PostgrestError) -> JSONResponse:
+        return JSONResponse(status_code=exc.status, content={
+            "code": exc.code, "message": exc.message, "details": None, "hint": None,
+        })
+
+    @app.api_route("/rest/v1/{table}", methods=["GET", "HEAD"])
+    async def postgrest_select(table: str, request: Request):
+        await injector.delay("postgrest")
+        if injector.should_fail("postgrest"):
+            return _error(PostgrestError(503, "PGRST000", "Could not connect to the database"))
+        params = request.query_params
+        try:
+            df = _filtered(table, request)
+            total = len(df)
+            if "order" in params:
+                df = _order(df, params["order"])
+            offset = int(params.get("offset", 0))
+            limit = int(params["limit"]) if "limit" in params else None
+            page = df.iloc[offset:offset + limit] if limit is not None else df.iloc[offset:]
+            page = page[_select_columns(df, params.get("select", "*"))]
+        except PostgrestError as exc:
+            return _error(exc)
+
+        end = offset + len(page) - 1
+        count = str(total) if "count=exact" in request.headers.get("prefer", "") else "*"
+        headers = {"Content-Range": f"{offset}-{end}/{count}" if len(page) else f"*/{count}"}
+        if request.method == "HEAD":
+            return Response(status_code=200, headers=headers)
+        rows = _records(page)
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return _error(PostgrestError(406, "PGRST116", "JSON object requested, multiple (or no) rows returned"))
+            response = JSONResponse(rows[0], headers=headers)
+        else:
+            response = JSONResponse(rows, headers=headers)
+        injector.stats["postgrest"]["bytes_out"] += len(response.body)
+        return response
+
+    @app.patch("/rest/v1/{table}")
+    async def postgrest_update(table: str, request: Request):
+        await injector.delay("postgrest")
+        if injector.should_fail("postgrest"):
+            return _error(PostgrestError(503, "PGRST000", "Could not connect to the database"))
+        changes = await request.json()
+        try:
+            df = tables.get(table)
+            target = _filtered(table, request).index
+            for column, value in changes.items():
+                if column not in df.columns:
+                    raise PostgrestError(400, "PGRST204", f"Could not find the '{column}' column")
+                df.loc[target, column] = value
+        except PostgrestError as exc:
+            return _error(exc)
+        if "return=representation" in request.headers.get("prefer", ""):
+            return JSONResponse(_records(df.loc[target]))
+        return Response(status_code=204)
+
+    # ── Google Maps ─────────────────────────────────────────────────────────
+    async def _maps_guard():
+        await injector.delay("maps")
+        if injector.should_fail("maps"):
+            return JSONResponse(status_code=500, content={"status": "UNKNOWN_ERROR", "results": []})
+        return None
+
+    @app.get("/maps/api/geocode/json")
+    async def geocode(address: str = ""):
+        if (failed := await _maps_guard()) is not None:
+            return failed
+        area = normalise_area(re.sub(r",?\s*(bengaluru|bangalore).*$", "", address, flags=re.IGNORECASE))
+        if area not in AREA_IDS:
+            return {"results": [], "status": "ZERO_RESULTS"}
+        lat, lng = _centroid(area)
+        return {"status": "OK", "results": [{
+            "formatted_address": f"{area}, Bengaluru, Karnataka, India",
+            "geometry": {"location": {"lat": lat, "lng": lng}, "location_type": "APPROXIMATE"},
+            "place_id": f"fake-{AREA_IDS[area]}",
+            "types": ["sublocality", "political"],
+        }]}
+
+    @app.get("/maps/api/place/nearbysearch/json")
+    async def nearby_search(location: str = "", radius: float = 2000, keyword: str = ""):
+        if (failed := await _maps_guard()) is not None:
+            return failed
+        origin = _latlng(location)
+        if origin is None:
+            return {"results": [], "status": "INVALID_REQUEST"}
+        results = []
+        if "metro" in keyword.lower() or not keyword:
+            for name, lat, lng in METRO_STATIONS:
+                km = _haversine_km(origin[0], origin[1], lat, lng)
+                if km * 1000 <= radius:
+                    results.append((km, {"name": f"{name} Metro Station",
+                                         "geometry": {"location": {"lat": lat, "lng": lng}},
+                                         "types": ["subway_station", "transit_station"]}))
+        results.sort(key=lambda r: r[0])
+        return {"results": [r for _, r in results], "status": "OK" if results else "ZERO_RESULTS"}
+
+    @app.get("/maps/api/distancematrix/json")
+    async def distance_matrix(origins: str = "", destinations: str = "", mode: str = "driving"):
+        if (failed := await _maps_guard()) is not None:
+            return failed
+        a, b = _latlng(origins), _latlng(destinations)
+        if a is None or b is None:
+            return {"rows": [{"elements": [{"status": "NOT_FOUND"}]}], "status": "OK"}
+        km = _haversine_km(a[0], a[1], b[0], b[1]) * 1.4           # road detour factor
+        speed_kmh = {"walking": 4.8, "bicycling": 12.0, "transit": 18.0}.get(mode, 20.0)
+        return {"status": "OK", "origin_addresses": [origins], "destination_addresses": [destinations],
+                "rows": [{"elements": [{
+                    "status": "OK",
+                    "distance": {"value": int(km * 1000), "text": f"{km:.1f} km"},
+                    "duration": {"value": int(km / speed_kmh * 3600), "text": f"{round(km / speed_kmh * 60)} mins"},
+                }]}]}
+
+    # ── Control ─────────────────────────────────────────────────────────────
+    @app.get("/__fake/stats")
+    async def stats():
+        return {name: {**s, "mean_delay_ms": round(s["delay_ms_total"] / s["requests"], 1) if s["requests"] else 0.0}
+                for name, s in injector.stats.items()}
+
+    @app.get("/__fake/config")
+    async def get_config():
+        return {"latency": injector.latency, "errors": injector.errors,
+                "rate_limits": rates.limits, "enforce_rate_limits": rates.enforce}
+
+    @app.post("/__fake/config")
+    async def set_config(request: Request):
+        """Body: {"latency": {"groq": [median_ms, sigma]}, "errors": {"maps": 0.1}, ...} — merged in."""
+        body = await request.json()
+        for name, value in body.get("latency", {}).items():
+            injector.latency[name] = (float(value[0]), float(value[1]))
+        for name, value in body.get("errors", {}).items():
+            injector.errors[name] = float(value)
+        rates.limits.update({k: int(v) for k, v in body.get("rate_limits", {}).items()})
+        if "enforce_rate_limits" in body:
+            rates.enforce = bool(body["enforce_rate_limits"])
+        return await get_config()
+
+    return app
+
+
+def _parse_pairs(items: list[str], parse_value) -> dict:
+    out = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        out[name.strip()] = parse_value(value)
+    return out
+
+
+def _latency_value(value: str) -> tuple[float, float]:
+    median, _, sigma = value.partition(",")
+    return float(median), float(sigma or 0.4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-ins for Groq, Supabase and Google Maps.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--latency", action="append", default=[], metavar="NAME=MEDIAN_MS[,SIGMA]",
+                        help="e.g. groq=800,0.5  groq:llama-3.1-8b-instant=250  postgrest=0")
+    parser.add_argument("--errors", action="append", default=[], metavar="NAME=RATE",
+                        help="e.g. groq=0.02 (429s)  postgrest=0.01 (503s)  maps=0.05 (500s)")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RATE_LIMITS["requests_per_min"])
+    parser.add_argument("--tpm", type=int, default=DEFAULT_RATE_LIMITS["tokens_per_min"])
+    parser.add_argument("--enforce-rate-limits", action="store_true",
+                        help="answer 429 once a model's per-minute quota is used up")
+    args = parser.parse_args()
+
+    latency = {**DEFAULT_LATENCY, **_parse_pairs(args.latency, _latency_value)}
+    errors = _parse_pairs(args.errors, float)
+    injector = Injector(latency, errors, args.seed)
+    rates = RateWindow({"requests_per_min": args.rpm, "tokens_per_min": args.tpm}, args.enforce_rate_limits)
+    uvicorn.run(create_app(injector, rates, args.seed), host=args.host, port=args.port, log_level="warning")
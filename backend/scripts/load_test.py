@@ -0,0 +1,420 @@
+"""
+load_test.py — End-to-end load generator that replays scripted conversations against /chat.
+
+Each virtual user walks one scripted conversation, PG or home, with a thinking
+pause between turns. PG: greeting → persona → area → budget → gender/sharing →
+amenities → "show me" → "show more" → a stricter "show me …" (refine).
+Home: greeting → persona → area → budget → family → "show me" → "show more"
+→ refine. Area, budget, sharing and so on are drawn from a seeded RNG, so two
+runs with the same flags send the same messages.
+
+Reported per turn type: request count, p50 / p95 / p99 latency, error rate
+and p50 response size. Also reported: overall throughput, per-user session memory (size of
+the session JSON the server returns, plus server RSS growth per user when
+--server-pid is given or the server was started with --spawn), Groq tokens
+and estimated spend per turn, the search prefetch hit / waste rates and how
+searches were answered (cached candidates / query), read from the backend's
+GET /metrics. With --spawn (or --fake-url), also the PostgREST requests and
+response bytes the run caused, from the fakes' GET /__fake/stats.
+
+Outcomes:
+  ok        HTTP 200 with a normal reply
+  degraded  HTTP 200 but answered by a fallback ("degraded": true, or the older
+            "things are a bit slow" text) because an upstream call failed
+  error     HTTP ≥ 400, status "error", or a transport failure / timeout
+
+Usage (from backend/):
+    # Start fake services + backend, run 500 users, write a JSON report
+    python scripts/load_test.py --spawn --users 500 --concurrency 200 --out report.json
+
+    # Against an already running backend (pointed at the fakes via FAKE_SERVICES_URL)
+    python scripts/load_test.py --base-url http://127.0.0.1:8000 --users 2000
+
+    # Compare with a report from an earlier commit
+    python scripts/load_test.py --spawn --users 500 --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# --- CONFIGURATION ---
+SEED = 32
+DEFAULT_BASE_URL = "http://127.0.0.1:8000"
+SPAWN_BACKEND_PORT = 8765
+SPAWN_FAKE_PORT = 8901
+SLOW_FALLBACK = "things are a bit slow"
+
+AREAS = ["Koramangala", "HSR Layout", "Indiranagar", "Whitefield", "BTM Layout", "Marathahalli",
+         "Electronic City", "Bellandur", "JP Nagar", "Jayanagar", "Hebbal", "Yelahanka"]
+HUBS = ["Manyata Tech Park", "Embassy Tech Village", "ITPL", "Ecospace", "Bagmane Tech Park"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Conversation scripts
+# ─────────────────────────────────────────────────────────────────────────────
+def pg_script(rng: random.Random) -> list[tuple[str, str]]:
+    """(turn type, message) pairs for one PG seeker."""
+    budget = rng.choice([7, 8, 10, 12, 15, 18])
+    return [
+        ("greeting", rng.choice(["hi", "hello", "hey"])),
+        ("persona", rng.choice(["I'm looking for a PG", "need a pg for myself", "looking for co-living"])),
+        ("location", f"somewhere in {rng.choice(AREAS)}, close to {rng.choice(HUBS)}"),
+        ("budget", f"my budget is {budget}k"),
+        ("pg_details", f"{rng.choice(['boys', 'girls'])}, {rng.choice(['single', 'double', 'triple'])} sharing"),
+        ("amenities", rng.choice(["food included please", "need food and a gym nearby", "no food needed"])),
+        ("show_me", "show me"),
+        ("show_more", "show more"),
+        ("refine", rng.choice([f"show me ones under {budget - 1}k", "show me only the ones with food",
+                               "show me places with a gym"])),
+    ]
+
+
+def home_script(rng: random.Random) -> list[tuple[str, str]]:
+    """(turn type, message) pairs for one home seeker."""
+    budget = rng.choice([15, 20, 25, 30, 40])
+    return [
+        ("greeting", rng.choice(["hi", "hello"])),
+        ("persona", f"looking for a {rng.choice([1, 2, 3])}bhk home"),
+        ("location", f"in {rng.choice(AREAS)}"),
+        ("budget", f"around {budget}k per month"),
+        ("family", rng.choice(["I'm married, my wife works at " + rng.choice(HUBS),
+                               "just me, I'm a bachelor", "family of four"])),
+        ("show_me", "show me"),
+        ("show_more", "show more"),
+        ("refine", f"show me ones under {budget - 3}k"),
+    ]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Runner
+# ─────────────────────────────────────────────────────────────────────────────
+class Results:
+    def __init__(self):
+        self.latency_ms: dict[str, list[float]] = defaultdict(list)
+        self.outcomes: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.response_bytes: dict[str, list[int]] = defaultdict(list)
+        self.session_bytes: list[int] = []
+        self.history_len: list[int] = []
+
+    def record(self, turn: str, ms: float, outcome: str) -> None:
+        self.latency_ms[turn].append(ms)
+        self.outcomes[turn][outcome] += 1
+
+
+async def run_user(client: httpx.AsyncClient, user_no: int, args, results: Results, gate: asyncio.Semaphore):
+    rng = random.Random(args.seed * 1_000_003 + user_no)
+    script = pg_script(rng) if rng.random() < args.pg_share else home_script(rng)
+    user_id = f"load-{args.seed}-{user_no}"
+    last_data = None
+
+    async with gate:
+        for turn_no, (turn, message) in enumerate(script):
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post("/chat", json={
+                    "user_id": user_id, "message": message, "message_id": f"{user_id}-{turn_no}",
+                })
+                ms = (time.perf_counter() - t0) * 1000
+                results.response_bytes[turn].append(len(resp.content))
+                body = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+                if resp.status_code >= 400 or body.get("status") == "error":
+                    outcome = "error"
+                elif body.get("degraded") or SLOW_FALLBACK in (body.get("response") or ""):
+                    outcome = "degraded"
+                else:
+                    outcome = "ok"
+                last_data = body.get("data", last_data)
+            except (httpx.HTTPError, ValueError):
+                ms = (time.perf_counter() - t0) * 1000
+                outcome = "error"
+            results.record(turn, ms, outcome)
+            if args.think_ms:
+                await asyncio.sleep(rng.lognormvariate(0, 0.5) * args.think_ms / 1000)
+
+    if isinstance(last_data, dict):
+        results.session_bytes.append(len(json.dumps(last_data, ensure_ascii=False).encode()))
+        results.history_len.append(len(last_data.get("history", [])))
+
+
+def _rss_kb(pid: int | None) -> int | None:
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return round(ordered[k], 1)
+
+
+def build_report(args, results: Results, wall_s: float, rss_before: int | None, rss_after: int | None,
+                 usage: dict | None = None, prefetch: dict | None = None,
+                 candidates: dict | None = None, db: dict | None = None) -> dict:
+    turns = {}
+    total_requests = total_errors = total_degraded = 0
+    for turn, values in results.latency_ms.items():
+        outcomes = results.outcomes[turn]
+        n = len(values)
+        total_requests += n
+        total_errors += outcomes["error"]
+        total_degraded += outcomes["degraded"]
+        turns[turn] = {
+            "requests": n,
+            "p50_ms": _pct(values, 50), "p95_ms": _pct(values, 95), "p99_ms": _pct(values, 99),
+            "mean_ms": round(statistics.fmean(values), 1),
+            "error_rate": round(outcomes["error"] / n, 4),
+            "degraded_rate": round(outcomes["degraded"] / n, 4),
+            "response_bytes_p50": _pct(results.response_bytes[turn], 50),
+        }
+    all_ms = [v for values in results.latency_ms.values() for v in values]
+    sb = results.session_bytes
+    memory = {
+        "session_json_bytes_p50": _pct(sb, 50), "session_json_bytes_max": max(sb) if sb else 0,
+        "history_entries_p50": _pct(results.history_len, 50),
+    }
+    if rss_before and rss_after:
+        memory["server_rss_growth_kb"] = rss_after - rss_before
+        memory["server_rss_growth_kb_per_user"] = round((rss_after - rss_before) / max(1, args.users), 2)
+
+    return {
+        "commit": _git_commit(),
+        "config": {k: getattr(args, k) for k in ("users", "concurrency", "think_ms", "pg_share", "seed", "base_url")},
+        "wall_s": round(wall_s, 2),
+        "throughput_rps": round(total_requests / wall_s, 2) if wall_s else 0.0,
+        "requests": total_requests,
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "degraded_rate": round(total_degraded / total_requests, 4) if total_requests else 0.0,
+        "latency_ms": {"p50": _pct(all_ms, 50), "p95": _pct(all_ms, 95), "p99": _pct(all_ms, 99)},
+        "turns": turns,
+        "memory": memory,
+        "llm": {
+            "models": usage or {},
+            "cost_usd_per_1k_turns": round(
+                sum(m["cost_usd"] for m in (usage or {}).values()) / total_requests * 1000, 4,
+            ) if total_requests else 0.0,
+        },
+        "prefetch": _prefetch_rates(prefetch or {}),
+        "candidates": candidates or {},
+        "db": db or {},
+    }
+
+
+def _prefetch_rates(counts: dict) -> dict:
+    """hit_rate: share of "show me" searches served by a prefetch; waste_rate: share of prefetches never used."""
+    if not counts:
+        return {}
+    hits = counts.get("hit", 0) + counts.get("hit_inflight", 0)
+    searches = hits + counts.get("miss", 0) + counts.get("failed", 0)
+    return {
+        **counts,
+        "hit_rate": round(hits / searches, 3) if searches else 0.0,
+        "waste_rate": round(counts.get("wasted", 0) / counts["started"], 3) if counts.get("started") else 0.0,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    def delta(cur, key_path):
+        if not baseline:
+            return ""
+        ref = baseline
+        for key in key_path:
+            ref = ref.get(key, {}) if isinstance(ref, dict) else {}
+        if not isinstance(ref, (int, float)) or not ref:
+            return ""
+        return f" ({(cur - ref) / ref * 100:+.0f}%)"
+
+    print(f"\n📊 Load test @ {report['commit'] or 'unknown commit'} — {report['config']['users']} users, "
+          f"concurrency {report['config']['concurrency']}")
+    print(f"   throughput {report['throughput_rps']} req/s{delta(report['throughput_rps'], ['throughput_rps'])}, "
+          f"errors {report['error_rate']:.2%}, degraded {report['degraded_rate']:.2%}, wall {report['wall_s']}s")
+    p95_width = 18 if baseline else 10
+    print(f"\n   {'turn':<12}{'n':>7}{'p50':>10}{'p95':>{p95_width}}{'p99':>10}{'err':>8}{'bytes':>9}")
+    for turn, t in sorted(report["turns"].items()):
+        p95 = f"{t['p95_ms']:.0f}{delta(t['p95_ms'], ['turns', turn, 'p95_ms'])}"
+        print(f"   {turn:<12}{t['requests']:>7}{t['p50_ms']:>10.0f}{p95:>{p95_width}}{t['p99_ms']:>10.0f}"
+              f"{t['error_rate']:>8.2%}{t.get('response_bytes_p50', 0):>9.0f}")
+    print(f"\n   memory: {report['memory']}")
+    llm = report.get("llm")
+    if llm and llm["models"]:
+        cost = llm["cost_usd_per_1k_turns"]
+        print(f"   groq: ${cost:.4f} per 1k turns{delta(cost, ['llm', 'cost_usd_per_1k_turns'])} — "
+              + ", ".join(f"{m} {u['tokens']} tok" for m, u in sorted(llm["models"].items())))
+    prefetch = report.get("prefetch")
+    if prefetch:
+        print(f"   prefetch: hit rate {prefetch['hit_rate']:.0%}, waste rate {prefetch['waste_rate']:.0%} — "
+              + ", ".join(f"{k} {prefetch.get(k, 0)}" for k in ("started", "hit", "hit_inflight", "miss", "wasted", "failed")))
+    candidates = report.get("candidates")
+    if candidates:
+        print("   candidates: " + ", ".join(f"{k} {v}" for k, v in candidates.items()))
+    db = report.get("db")
+    if db:
+        kb = db["bytes"] / 1024
+        print(f"   db: {db['requests']} PostgREST requests, {kb:.0f} KB out{delta(db['bytes'], ['db', 'bytes'])}"
+              f" ({db['bytes_per_request'] / 1024:.1f} KB per request)")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Spawned services
+# ─────────────────────────────────────────────────────────────────────────────
+def _wait_for(url: str, timeout_s: float = 60) -> None:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.3)
+    raise RuntimeError(f"{url} did not come up within {timeout_s}s")
+
+
+def spawn_stack(args) -> list[subprocess.Popen]:
+    fake_url = f"http://127.0.0.1:{SPAWN_FAKE_PORT}"
+    fake = subprocess.Popen(
+        [sys.executable, "scripts/fake_services.py", "--port", str(SPAWN_FAKE_PORT), "--seed", str(args.seed),
+         *[f"--latency={v}" for v in args.fake_latency], *[f"--errors={v}" for v in args.fake_errors]],
+        cwd=BACKEND_DIR,
+    )
+    _wait_for(f"{fake_url}/__fake/config")
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(SPAWN_BACKEND_PORT), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, "FAKE_SERVICES_URL": fake_url},
+    )
+    _wait_for(f"http://127.0.0.1:{SPAWN_BACKEND_PORT}/areas/suggest?q=k")
+    args.base_url = f"http://127.0.0.1:{SPAWN_BACKEND_PORT}"
+    args.server_pid = backend.pid
+    args.fake_url = fake_url
+    return [backend, fake]
+
+
+async def scrape_metrics(client: httpx.AsyncClient) -> tuple[dict, dict, dict]:
+    """(Groq token / cost per model, prefetch outcomes, candidate-set outcomes) from GET /metrics."""
+    try:
+        resp = await client.get("/metrics")
+    except httpx.HTTPError:
+        return {}, {}, {}
+    usage: dict = {}
+    prefetch: dict = {}
+    candidates: dict = {}
+    for line in resp.text.splitlines():
+        if not line.startswith("tatva_") or "{" not in line:
+            continue
+        name, rest = line.split("{", 1)
+        labels, value = rest.rsplit("} ", 1)
+        labels = {k: v.strip('"') for k, v in (part.split("=", 1) for part in labels.split(","))}
+        if name in ("tatva_groq_cost_usd_total", "tatva_groq_tokens_total"):
+            key = "cost_usd" if name == "tatva_groq_cost_usd_total" else "tokens"
+            entry = usage.setdefault(labels["model"], {"cost_usd": 0.0, "tokens": 0})
+            entry[key] += float(value) if key == "cost_usd" else int(float(value))
+        elif name == "tatva_search_prefetch_total":
+            prefetch[labels["outcome"]] = int(float(value))
+        elif name == "tatva_search_candidates_total":
+            candidates[labels["outcome"]] = int(float(value))
+    return usage, prefetch, candidates
+
+
+async def postgrest_counters(fake_url: str | None) -> dict:
+    """{"requests", "bytes"} the fake PostgREST has served so far ({} without fakes)."""
+    if not fake_url:
+        return {}
+    try:
+        async with httpx.AsyncClient(base_url=fake_url, timeout=10) as client:
+            stats = (await client.get("/__fake/stats")).json().get("postgrest", {})
+    except (httpx.HTTPError, ValueError):
+        return {}
+    return {"requests": stats.get("requests", 0), "bytes": stats.get("bytes_out", 0)}
+
+
+def _db_transfer(before: dict, after: dict) -> dict:
+    if not before or not after:
+        return {}
+    requests = after["requests"] - before["requests"]
+    sent = after["bytes"] - before["bytes"]
+    return {"requests": requests, "bytes": sent, "bytes_per_request": round(sent / requests) if requests else 0}
+
+
+async def main_async(args) -> dict:
+    results = Results()
+    gate = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    rss_before = _rss_kb(args.server_pid)
+    db_before = await postgrest_counters(args.fake_url)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout_s, limits=limits) as client:
+        t0 = time.perf_counter()
+        tasks = []
+        for n in range(args.users):
+            tasks.append(asyncio.create_task(run_user(client, n, args, results, gate)))
+            if args.ramp_s:
+                await asyncio.sleep(args.ramp_s / args.users)
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - t0
+        usage, prefetch, candidates = await scrape_metrics(client)
+    db = _db_transfer(db_before, await postgrest_counters(args.fake_url))
+    return build_report(args, results, wall, rss_before, _rss_kb(args.server_pid), usage, prefetch, candidates, db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay scripted conversations against /chat.")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100, help="users in a conversation at once")
+    parser.add_argument("--think-ms", type=float, default=500, help="median pause between turns")
+    parser.add_argument("--ramp-s", type=float, default=0, help="spread user starts over this many seconds")
+    parser.add_argument("--pg-share", type=float, default=0.5, help="fraction of users running the PG script")
+    parser.add_argument("--timeout-s", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--server-pid", type=int, default=None, help="backend PID, for RSS growth")
+    parser.add_argument("--spawn", action="store_true", help="start fake services + backend locally")
+    parser.add_argument("--fake-url", default=None, help="fake services URL, for DB transfer (set by --spawn)")
+    parser.add_argument("--fake-latency", action="append", default=[], help="passed to fake_services.py --latency")
+    parser.add_argument("--fake-errors", action="append", default=[], help="passed to fake_services.py --errors")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to show deltas against")
+    args = parser.parse_args()
+
+    procs = spawn_stack(args) if args.spawn else []
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.out}")
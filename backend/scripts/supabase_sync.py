@@ -0,0 +1,95 @@
+"""
+supabase_sync.py — Ingest stage that stamps every listing with its canonical area ID.
+
+Searches used to filter with `ilike("location", "%<area>%")`: a leading-wildcard
+scan no B-tree index can serve, which also over-matches ("Electronic City"
+pulls in "Electronic City Phase 2"). This stage runs `normalise_area` over the
+listing `location` column once, at ingest time, and stores the integer ID from
+`location_areas.AREA_IDS`. The chat session carries the same ID, so the search
+becomes an indexed equality filter.
+
+One-time schema change (run in the Supabase SQL editor):
+
+    alter table properties  add column if not exists area_id smallint;
+    alter table "PG_Listings" add column if not exists area_id smallint;
+    create index if not exists properties_area_bhk_rent_idx
+        on properties (area_id, size_bhk, rent_price_inr_per_month);
+    create index if not exists pg_listings_area_bhk_rent_idx
+        on "PG_Listings" (area_id, size_bhk, rent_price_inr_per_month);
+
+Usage (from backend/):
+    python scripts/supabase_sync.py              # both tables
+    python scripts/supabase_sync.py properties   # one table
+"""
+
+import os
+import sys
+from collections import defaultdict
+
+from dotenv import load_dotenv
+from supabase import Client
+
+# 1. LOAD ENV (before service_endpoints reads it)
+env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
+load_dotenv(dotenv_path=env_path)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from location_areas import area_id_for  # noqa: E402
+from service_endpoints import make_supabase_client  # noqa: E402
+
+# --- CONFIGURATION ---
+TABLES = ("properties", "PG_Listings")
+BATCH_SIZE = 500
+
+
+def sync_area_ids(supabase: Client, table: str) -> dict:
+    """
+    Walks `table` in listing_id order (keyset pagination — no OFFSET scans)
+    and writes area_id wherever it is missing or stale.
+    Returns {"scanned": n, "updated": n, "unresolved": {location: count}}.
+    """
+    stats = {"scanned": 0, "updated": 0, "unresolved": defaultdict(int)}
+    last_id = ""
+
+    while True:
+        query = supabase.table(table).select("listing_id, location, area_id").order("listing_id")
+        if last_id:
+            query = query.gt("listing_id", last_id)
+        rows = query.limit(BATCH_SIZE).execute().data
+        if not rows:
+            break
+        last_id = rows[-1]["listing_id"]
+        stats["scanned"] += len(rows)
+
+        # Group listing IDs by target area so each area costs one UPDATE per batch
+        pending: dict[int, list[str]] = defaultdict(list)
+        for row in rows:
+            new_id = area_id_for(row.get("location") or "")
+            if new_id is None:
+                stats["unresolved"][row.get("location") or ""] += 1
+                continue
+            if row.get("area_id") != new_id:
+                pending[new_id].append(row["listing_id"])
+
+        for new_id, ids in pending.items():
+            supabase.table(table).update({"area_id": new_id}).in_("listing_id", ids).execute()
+            stats["updated"] += len(ids)
+
+        print(f"  {table}: scanned {stats['scanned']}, updated {stats['updated']} (last {last_id})")
+
+    return stats
+
+
+if __name__ == "__main__":
+    supabase: Client = make_supabase_client()    # FAKE_SERVICES_URL points it at the stand-in
+    tables = sys.argv[1:] or TABLES
+
+    print("🚀 Syncing canonical area IDs...")
+    for table in tables:
+        result = sync_area_ids(supabase, table)
+        print(f"✅ {table}: {result['updated']} of {result['scanned']} rows updated.")
+        if result["unresolved"]:
+            print(f"⚠️ {table}: locations with no canonical area (add them to location_areas.py):")
+            for loc, count in sorted(result["unresolved"].items(), key=lambda kv: -kv[1]):
+                print(f"     {count:5d}  {loc!r}")
+    print("🏁 Area ID sync finished.")
@@ -0,0 +1,702 @@
+"""
+search.py — Listing search for "show me" turns: candidate sets, local refinement,
+pagination, prefetch.
+
+What a search returns is fixed by a handful of session fields — the
+essentials (PG: budget, sharing, gender; Home: budget, BHK, and location or
+2+ family hubs) plus the optional filters. SearchSpec captures exactly those.
+
+Only the core of a spec goes to Supabase — size, budget, location / midpoint
+(SearchSpec.core()) — selecting the card columns (listing_cards.py). That
+query returns a broad candidate set (up to CANDIDATE_LIMIT rows); gender, food, gym and nearby hub are applied to it
+locally. The set is kept per user (CandidateCache, bounded by users and total
+rows), so a later search that is only stricter — lower budget, an amenity
+added, a gender picked — is answered from it with no round trip. A new
+query runs only when a core filter loosens or changes (higher budget, other
+area, BHK, hubs), or when the set was cut at the limit and the local filter
+leaves fewer than RESULT_LIMIT rows.
+
+Supabase returns rows cheapest first, listing_id breaking ties
+(ORDER_COLUMNS — a total order, so keyset pages never overlap or skip). A
+complete candidate set holds every match, so it is served best fit first
+instead (ranking.py: budget headroom, hub midpoint, metro, commute, asked-for
+amenities; each card carries its score breakdown). A truncated set keeps the
+database order — the best fit may lie past the limit. A page ends in an
+opaque Cursor (kept in session["search_cursor"]): the filters it was issued
+for, the last row's (rent, listing_id), how many matches came before and the
+total, and whether the pages are in fit order. "Show more" continues from
+it — inside the candidate set when the set reaches that far (a ranked cursor
+refetches an evicted set rather than change order mid-list, and starts over
+at the first page, flagged `restarted`, when the refetched set is cut short
+or no longer holds the cursor's listing), otherwise with a keyset query
+(rent, listing_id) > cursor, never OFFSET. The total is exact:
+counted locally when the set is complete, taken from the candidate query's
+count (Prefer: count=exact on the core filters, same round trip) when the
+spec is the core itself, and otherwise counted once by a separate query;
+later pages reuse it from the cursor.
+
+The essentials are usually complete a turn or two before the user types
+"show me". Prefetcher fetches the candidate set (Supabase query, hub
+geocoding) in the background at the end of that turn; the "show me" turn takes it if the core still matches, waits for it if
+it is still running, and otherwise queries inline. Prefetch is keyed by the
+core, so an amenity answered after the essentials doesn't replace it.
+
+Outcomes for GET /metrics (ListingSearch.snapshot):
+  prefetch   started / hit / hit_inflight / miss / wasted / failed
+             (hit: ready when needed, hit_inflight: waited for it, miss: no
+             prefetch for this core, wasted: never used — replaced, expired,
+             reset; failed: errored or still running at the deadline)
+  candidates local (answered from the cached set, no round trip) / fetched
+             (candidate set queried or prefetched) / exact (set cut short —
+             the exact query ran too) / counted (total needed its own count
+             query) / evicted
+  pages      first / next ("show more") / stale (cursor for other filters —
+             restarted at the first page) / restarted (ranked pages changed
+             under the cursor — restarted at the first page)
+
+SEARCH_PREFETCH=0 turns prefetching off. Areas are matched on the indexed
+area_id column once probe_area_ids() finds it filled in (startup; see
+scripts/supabase_sync.py) — until then, and with AREA_ID_FILTER=off, with
+ilike on location as before. AREA_ID_FILTER=on skips the probe.
+
+Usage:
+    listing_search = ListingSearch(supabase)
+    listing_search.prefetch(user_id, SearchSpec.from_session(session))   # end of a normal turn
+    result = listing_search.find(user_id, spec, timeout)                 → SearchResult
+    session["search_cursor"] = result.cursor(spec)
+    result = listing_search.next_page(user_id, spec, session["search_cursor"], timeout)
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+import traceback
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import NamedTuple
+
+from geospatial import get_coordinates
+from listing_cards import TABLES, ListingDetails, search_columns
+from ranking import WANT_FIELDS, RankFeatures, breakdown, ranked, score
+from resilience import call
+from utils import safe_int
+
+PREFETCH_ENABLED = os.getenv("SEARCH_PREFETCH", "1") != "0"
+AREA_ID_FILTER = os.getenv("AREA_ID_FILTER", "auto").lower()   # auto | on | off
+PREFETCH_TTL_S = 5 * 60          # listings change slowly; sessions go idle
+PREFETCH_MAX_USERS = 2000
+PREFETCH_WORKERS = 8             # I/O-bound: Supabase + Maps round-trips
+RESULT_LIMIT = 15
+CANDIDATE_LIMIT = 200            # rows per candidate set (core filters only)
+CANDIDATE_MAX_USERS = 1000
+CANDIDATE_MAX_ROWS = 50_000      # all cached sets together (card columns, ~0.4 KB a row)
+MIDPOINT_BOX_DEG = 0.04          # ± lat/lng around the family-hub midpoint
+# Result order: cheapest first; listing_id (unique) makes it a total order for
+# keyset pagination. (area_id, size_bhk, rent) is indexed — scripts/supabase_sync.py
+ORDER_COLUMNS = ("rent_price_inr_per_month", "listing_id")
+
+PG_ESSENTIALS = ("rent_price_inr_per_month", "Sharing", "gender_preference")
+HOME_ESSENTIALS = ("rent_price_inr_per_month", "size_bhk")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Filters
+# ─────────────────────────────────────────────────────────────────────────────
+_area_ids_ready = AREA_ID_FILTER == "on"
+
+
+def area_ids_ready() -> bool:
+    """Whether location filters may use area_id equality (else ilike on location)."""
+    return _area_ids_ready
+
+
+def probe_area_ids(supabase) -> bool:
+    """
+    AREA_ID_FILTER=auto: switches area_id filtering on when both listing
+    tables have the column with IDs in it (scripts/supabase_sync.py ran).
+    A missing column or a failed probe leaves it off.
+    """
+    global _area_ids_ready
+    if AREA_ID_FILTER != "auto":
+        return _area_ids_ready
+    try:
+        _area_ids_ready = all(
+            supabase.table(table).select("listing_id").gt("area_id", 0).limit(1).execute().data
+            for table in TABLES.values()
+        )
+    except Exception as exc:
+        print(f"⚠️  area_id probe failed: {type(exc).__name__}: {exc}")
+        _area_ids_ready = False
+    return _area_ids_ready
+
+
+def _filled(value) -> bool:
+    return value not in (0, "", None, [])
+
+
+def essentials(session: dict) -> list[str]:
+    """Fields a search needs for this persona (location unless 2+ hubs give a midpoint)."""
+    if session.get("persona") == "pg":
+        return list(PG_ESSENTIALS)
+    if len(session.get("family_hubs") or []) < 2:
+        return [*HOME_ESSENTIALS, "location"]
+    return list(HOME_ESSENTIALS)
+
+
+def missing_essentials(session: dict) -> list[str]:
+    return [k for k in essentials(session) if not _filled(session.get(k))]
+
+
+class SearchSpec(NamedTuple):
+    persona: str                  # "pg" | "home"
+    budget: int
+    size: int                     # PG: sharing count (stored as size_bhk), Home: BHK
+    area_id: int
+    location: str
+    gender: str = ""
+    food: bool = False
+    gym: bool = False
+    nearby_hub: str = ""
+    hubs: tuple = ()
+    wants: tuple = ()             # amenities that only rank (ranking.WANT_FIELDS)
+
+    @classmethod
+    def from_session(cls, session: dict, partial: bool = False) -> "SearchSpec | None":
+        """
+        None until the essentials are in — unless partial: then the filters
+        the session has so far, size 0 meaning any (facet counts, never searched).
+        """
+        if missing_essentials(session) and not partial:
+            return None
+        default_size = 0 if partial else 1
+        budget = safe_int(session.get("rent_price_inr_per_month"), 0)
+        area_id = (session.get("area_id") or 0) if _area_ids_ready else 0
+        location = "" if area_id else (session.get("location") or "")
+        if session.get("persona") == "pg":
+            return cls(
+                persona="pg", budget=budget,
+                size=safe_int(session.get("Sharing") or session.get("size_bhk"), default_size),
+                area_id=area_id, location=location,
+                gender=session.get("gender_preference") or "",
+                food=bool(session.get("food_included")),
+                gym=bool(session.get("gym_nearby")),
+                nearby_hub=session.get("nearby_hub") or "",
+                wants=tuple(f for f in WANT_FIELDS["pg"] if session.get(f)),
+            )
+        raw_size = session.get("size_bhk")
+        return cls(
+            persona="home", budget=budget,
+            size=safe_int(raw_size) if raw_size else default_size,
+            area_id=area_id, location=location,
+            hubs=tuple(session.get("family_hubs") or ()),
+            wants=tuple(f for f in WANT_FIELDS["home"] if session.get(f)),
+        )
+
+    def core(self) -> "SearchSpec":
+        """The part of the spec the candidate query runs; the rest is filtered locally."""
+        return self._replace(gender="", food=False, gym=False, nearby_hub="", wants=())
+
+    def within(self, core: "SearchSpec") -> bool:
+        """True when every listing matching this spec is in `core`'s candidate set."""
+        if self.core()._replace(budget=0) != core._replace(budget=0):
+            return False
+        return core.budget == 0 or 0 < self.budget <= core.budget
+
+    def fingerprint(self) -> int:
+        return zlib.crc32(repr(self).encode())
+
+    def matches(self, row: dict) -> bool:
+        """The filters core() leaves out — and the budget — on one candidate row."""
+        if self.budget > 0 and safe_int(row.get("rent_price_inr_per_month"), 0) > self.budget:
+            return False
+        if self.gender and self.gender != "Unisex" and row.get("preferred_tenants") not in (self.gender, "Unisex"):
+            return False
+        if self.food and row.get("food_included") is not True:
+            return False
+        if self.gym and row.get("has_gym") is not True:
+            return False
+        if self.nearby_hub and self.nearby_hub.lower() not in (row.get("nearby_hub") or "").lower():
+            return False
+        return True
+
+
+class Cursor(NamedTuple):
+    spec: int                          # SearchSpec.fingerprint() it was issued for
+    rent: int                          # last row shown, (rent, listing_id)
+    listing_id: str
+    shown: int                         # matches on this and earlier pages
+    total: int | None
+    ranked: bool = False               # pages come in fit order (a complete candidate set)
+
+    def encode(self) -> str:
+        raw = json.dumps(list(self), separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, spec: SearchSpec) -> "Cursor | None":
+        """None when the token is malformed or was issued for other filters."""
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            cursor = cls(*json.loads(raw))
+        except (ValueError, TypeError):
+            return None
+        return cursor if cursor.spec == spec.fingerprint() else None
+
+
+class SearchResult(NamedTuple):
+    rows: list
+    recommendation_text: str = ""
+    total: int | None = None           # matches on all pages (None: count unavailable)
+    offset: int = 0                    # matches on earlier pages
+    fit: tuple = ()                    # ranking.breakdown() per row
+    ranked: bool = False               # best fit first (else ORDER_COLUMNS order)
+    origin: tuple | None = None        # family-hub midpoint (lat, lng), home searches
+    restarted: bool = False            # "show more" had to start over at the first page
+
+    @property
+    def more(self) -> bool:
+        if self.total is None:
+            return len(self.rows) == RESULT_LIMIT
+        return self.offset + len(self.rows) < self.total
+
+    def cursor(self, spec: SearchSpec) -> str:
+        """Token for the page after this one (past the last page: one that yields no rows)."""
+        last = self.rows[-1] if self.rows else {}
+        shown = self.offset + len(self.rows)
+        return Cursor(
+            spec.fingerprint(), safe_int(last.get("rent_price_inr_per_month"), 0),
+            str(last.get("listing_id") or ""), shown, shown if not self.more else self.total, self.ranked,
+        ).encode()
+
+
+class CandidateSet(NamedTuple):
+    core: SearchSpec                   # the spec the rows were queried with
+    rows: list                         # in ORDER_COLUMNS order
+    complete: bool                     # False when the query hit CANDIDATE_LIMIT
+    total: int | None = None           # rows matching the core (count=exact)
+    recommendation_text: str = ""
+    origin: tuple | None = None        # family-hub midpoint (lat, lng), home searches
+    features: RankFeatures | None = None
+
+    def page(self, spec: SearchSpec, after: str | None = None) -> SearchResult | None:
+        """
+        Up to RESULT_LIMIT rows matching `spec` (which must be within the core),
+        starting after listing `after` — best fit first when the set is
+        complete. None when the set was cut short and may be missing some of
+        them, or doesn't hold `after`. The total is set on a first page when
+        the set alone determines it.
+        """
+        matched = [i for i, row in enumerate(self.rows) if spec.matches(row)]
+        total_fit, points = score(self.features, spec.persona, spec.budget, spec.wants, self.origin)
+        if self.complete:
+            matched = ranked(matched, total_fit)
+        start = 0
+        if after is not None:
+            start = next((k + 1 for k, i in enumerate(matched) if self.rows[i].get("listing_id") == after), -1)
+            if start < 0:
+                return None
+        picked = matched[start:start + RESULT_LIMIT]
+        if len(picked) < RESULT_LIMIT and not self.complete:
+            return None
+        total = None
+        if after is None:
+            total = len(matched) if self.complete else self.total if spec == self.core else None
+        return SearchResult(
+            [self.rows[i] for i in picked], self.recommendation_text, total,
+            fit=tuple(breakdown(total_fit, points, i) for i in picked), ranked=self.complete,
+            origin=self.origin,
+        )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Search
+# ─────────────────────────────────────────────────────────────────────────────
+def apply_location_filter(query, area_id: int, location: str):
+    """
+    Indexed equality on the canonical area ID (see scripts/supabase_sync.py);
+    substring match for locations that don't resolve to a known area — and for
+    every location while the column isn't filled in (area_id is 0 then).
+    """
+    if area_id:
+        return query.eq("area_id", area_id)
+    if location:
+        return query.ilike("location", f"%{location}%")
+    return query
+
+
+def _pg_query(query, spec: SearchSpec):
+    # Sharing count (stored as size_bhk in PG table)
+    query = query.eq("size_bhk", spec.size)
+    # Gender — PG table uses 'preferred_tenants'; Unisex PGs show for everyone
+    if spec.gender and spec.gender != "Unisex":
+        query = query.in_("preferred_tenants", [spec.gender, "Unisex"])
+    if spec.budget > 0:
+        query = query.lte("rent_price_inr_per_month", spec.budget)
+    query = apply_location_filter(query, spec.area_id, spec.location)
+    if spec.food:
+        query = query.eq("food_included", True)
+    if spec.gym:
+        query = query.eq("has_gym", True)
+    if spec.nearby_hub:
+        query = query.ilike("nearby_hub", f"%{spec.nearby_hub}%")
+    return query
+
+
+def _home_query(query, spec: SearchSpec) -> tuple:
+    """
+    (query, recommendation_text, origin) — a midpoint box around origin when
+    2+ hubs geocode. Its transport block is a background job (jobs.py).
+    """
+    family_coords = []
+    for hub in spec.hubs:
+        try:
+            c = get_coordinates(hub)
+            if c and c.get("lat") and c.get("lng"):
+                family_coords.append({"name": hub, **c})
+        except Exception:
+            print(f"⚠️ Geocoding failed: {hub}")
+
+    recommendation_text = ""
+    origin = None
+    if len(family_coords) >= 2:
+        try:
+            midpoint_lat = sum(c["lat"] for c in family_coords) / len(family_coords)
+            midpoint_lng = sum(c["lng"] for c in family_coords) / len(family_coords)
+            hub_names = ", ".join(c["name"] for c in family_coords)
+            query = (
+                query
+                .gte("latitude",  midpoint_lat - MIDPOINT_BOX_DEG).lte("latitude",  midpoint_lat + MIDPOINT_BOX_DEG)
+                .gte("longitude", midpoint_lng - MIDPOINT_BOX_DEG).lte("longitude", midpoint_lng + MIDPOINT_BOX_DEG)
+            )
+            recommendation_text = (
+                f"\n\n💡 **Tatva Midpoint Choice:**\n"
+                f"Optimal midpoint between **{hub_names}** — "
+                f"saves everyone daily commute time and transport cost! 🚀"
+            )
+            origin = (midpoint_lat, midpoint_lng)
+        except Exception:
+            traceback.print_exc()
+
+    if origin is None:
+        query = apply_location_filter(query, spec.area_id, spec.location)
+    query = query.eq("size_bhk", spec.size)
+    if spec.budget > 0:
+        query = query.lte("rent_price_inr_per_month", spec.budget)
+    return query, recommendation_text, origin
+
+
+def _query(spec: SearchSpec, supabase, columns: str | None = None, count: bool = False) -> tuple:
+    """Card columns unless `columns` says otherwise (listing_cards.py)."""
+    query = supabase.table(TABLES[spec.persona]).select(
+        columns or search_columns(spec.persona), count="exact" if count else None,
+    )
+    if spec.persona == "pg":
+        return _pg_query(query, spec), "", None
+    return _home_query(query, spec)
+
+
+def _ordered(query):
+    for column in ORDER_COLUMNS:
+        query = query.order(column)
+    return query
+
+
+def _quoted(value: str) -> str:
+    """A PostgREST logic-tree value, quoted so commas / parentheses stay literal."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _after(query, cursor: Cursor):
+    """Rows ranked after the cursor: (rent, listing_id) > (cursor.rent, cursor.listing_id)."""
+    rent, listing_id = ORDER_COLUMNS
+    return query.or_(
+        f"{rent}.gt.{cursor.rent},"
+        f"and({rent}.eq.{cursor.rent},{listing_id}.gt.{_quoted(cursor.listing_id)})"
+    )
+
+
+def fetch_candidates(core: SearchSpec, supabase) -> CandidateSet:
+    """The candidate set for a core spec. Raises StageUnavailable when Supabase can't answer."""
+    query, recommendation_text, origin = _query(core, supabase, count=True)
+    result = call("db", _ordered(query).limit(CANDIDATE_LIMIT).execute, breaker="supabase")
+    rows = result.data or []
+    return CandidateSet(core, rows, len(rows) < CANDIDATE_LIMIT, result.count,
+                        recommendation_text, origin, RankFeatures.from_rows(rows))
+
+
+def _scored(spec: SearchSpec, result: SearchResult, origin: tuple | None) -> SearchResult:
+    """Score breakdowns for rows that came straight from Supabase (order unchanged)."""
+    total_fit, points = score(RankFeatures.from_rows(result.rows), spec.persona, spec.budget, spec.wants, origin)
+    fit = tuple(breakdown(total_fit, points, i) for i in range(len(result.rows)))
+    return result._replace(fit=fit, origin=origin)
+
+
+def run_search(spec: SearchSpec, supabase, after: Cursor | None = None) -> SearchResult:
+    """
+    One page of the exact query for `spec` (all filters in Supabase), for when
+    a candidate set falls short. A first page is counted in the same request.
+    """
+    query, recommendation_text, origin = _query(spec, supabase, count=after is None)
+    query = _ordered(query) if after is None else _after(_ordered(query), after)
+    result = call("db", query.limit(RESULT_LIMIT).execute, breaker="supabase")
+    if after is not None:
+        return _scored(spec, SearchResult(result.data or [], total=after.total, offset=after.shown), origin)
+    return _scored(spec, SearchResult(result.data or [], recommendation_text, result.count), origin)
+
+
+def count_matches(spec: SearchSpec, supabase) -> int | None:
+    """Exact number of listings matching `spec`; None when Supabase can't answer in time."""
+    query = _query(spec, supabase, columns=ORDER_COLUMNS[1], count=True)[0]
+    result = call("db", query.limit(1).execute, breaker="supabase", fallback=None)
+    return None if result is None else result.count
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prefetch
+# ─────────────────────────────────────────────────────────────────────────────
+class _Entry:
+    __slots__ = ("spec", "future", "started", "used")
+
+    def __init__(self, spec: SearchSpec, future):
+        self.spec = spec
+        self.future = future
+        self.started = time.monotonic()
+        self.used = False
+
+
+class Prefetcher:
+    def __init__(self, search, ttl: float = PREFETCH_TTL_S, max_users: int = PREFETCH_MAX_USERS,
+                 workers: int = PREFETCH_WORKERS, enabled: bool = PREFETCH_ENABLED):
+        self._search = search                  # core SearchSpec → CandidateSet
+        self.ttl = ttl
+        self.max_users = max_users
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.stats = dict.fromkeys(("started", "hit", "hit_inflight", "miss", "wasted", "failed"), 0)
+
+    # ── Public ────────────────────────────────────────────────────────────────
+    def prefetch(self, user_id: str, spec: SearchSpec | None) -> None:
+        """Starts the search for `spec` unless it is already cached or running; None drops it."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.spec == spec:
+                return
+            if entry is not None:
+                self._drop(user_id)
+            if spec is None:
+                return
+            self._entries[user_id] = _Entry(spec, self._pool.submit(self._search, spec))
+            self.stats["started"] += 1
+            while len(self._entries) > self.max_users:
+                self._drop(next(iter(self._entries)))
+
+    def take(self, user_id: str, spec: SearchSpec, timeout: float) -> CandidateSet | None:
+        """
+        The prefetched candidates for `spec` — waiting up to `timeout` for a
+        fetch still running — or None when the caller has to query itself.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.spec != spec or self._expired(entry):
+                self.stats["miss"] += 1
+                return None
+        ready = entry.future.done()
+        try:
+            result = entry.future.result(timeout=max(0.0, timeout))
+        except TimeoutError:
+            self._fail(user_id, entry, "still running")
+            return None
+        except Exception as exc:
+            self._fail(user_id, entry, f"{type(exc).__name__}: {exc}")
+            return None
+        with self._lock:
+            entry.used = True
+            self.stats["hit" if ready else "hit_inflight"] += 1
+        return result
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            if user_id in self._entries:
+                self._drop(user_id)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+    # ── Internals (under self._lock) ──────────────────────────────────────────
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.started > self.ttl
+
+    def _expire(self) -> None:
+        # Entries are in start order, so the expired ones are at the front
+        while self._entries:
+            user_id, entry = next(iter(self._entries.items()))
+            if not self._expired(entry):
+                break
+            self._drop(user_id)
+
+    def _drop(self, user_id: str) -> None:
+        entry = self._entries.pop(user_id)
+        if not entry.used:
+            self.stats["wasted"] += 1
+            entry.future.cancel()              # not started yet → never runs
+
+    def _fail(self, user_id: str, entry: _Entry, reason: str) -> None:
+        print(f"⚠️  Prefetch unusable, searching inline: {reason}")
+        with self._lock:
+            self.stats["failed"] += 1
+            entry.used = True                  # counted as failed, not wasted
+            if self._entries.get(user_id) is entry:
+                self._entries.pop(user_id)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Candidate sets per user
+# ─────────────────────────────────────────────────────────────────────────────
+class CandidateCache:
+    """Each user's last candidate set, least recently used evicted first."""
+
+    def __init__(self, max_users: int = CANDIDATE_MAX_USERS, max_rows: int = CANDIDATE_MAX_ROWS):
+        self.max_users = max_users
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._sets: OrderedDict[str, CandidateSet] = OrderedDict()
+        self._rows = 0
+        self.stats = dict.fromkeys(("local", "fetched", "exact", "counted", "evicted"), 0)
+
+    def covering(self, user_id: str, spec: SearchSpec) -> CandidateSet | None:
+        with self._lock:
+            cands = self._sets.get(user_id)
+            if cands is None or not spec.within(cands.core):
+                return None
+            self._sets.move_to_end(user_id)
+            return cands
+
+    def put(self, user_id: str, cands: CandidateSet) -> None:
+        with self._lock:
+            self._pop(user_id)
+            self._sets[user_id] = cands
+            self._rows += len(cands.rows)
+            while len(self._sets) > 1 and (len(self._sets) > self.max_users or self._rows > self.max_rows):
+                self._pop(next(iter(self._sets)))
+                self.stats["evicted"] += 1
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._pop(user_id)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "users": len(self._sets), "rows": self._rows}
+
+    def _pop(self, user_id: str) -> None:
+        cands = self._sets.pop(user_id, None)
+        if cands is not None:
+            self._rows -= len(cands.rows)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Facade used by main.py
+# ─────────────────────────────────────────────────────────────────────────────
+class ListingSearch:
+    def __init__(self, supabase):
+        self._supabase = supabase
+        self.candidates = CandidateCache()
+        self.prefetcher = Prefetcher(lambda core: fetch_candidates(core, supabase))
+        self.details = ListingDetails(supabase)
+        self._lock = threading.Lock()
+        self.pages = dict.fromkeys(("first", "next", "stale", "restarted"), 0)
+
+    def prefetch(self, user_id: str, spec: SearchSpec | None) -> None:
+        """End of a normal turn: fetch candidates for `spec` unless the cached set already covers it."""
+        if spec is not None and self.candidates.covering(user_id, spec) is not None:
+            spec = None
+        self.prefetcher.prefetch(user_id, spec.core() if spec is not None else None)
+
+    def find(self, user_id: str, spec: SearchSpec, timeout: float) -> SearchResult:
+        """
+        The first page of listings for `spec`, with the total. Raises
+        StageUnavailable when a needed query can't be answered.
+        """
+        self._count_page("first")
+        cands = self.candidates.covering(user_id, spec)
+        cached = cands is not None
+        if not cached:
+            core = spec.core()
+            cands = self.prefetcher.take(user_id, core, timeout) or fetch_candidates(core, self._supabase)
+            self.candidates.put(user_id, cands)
+            self.candidates.count("fetched")
+        found = cands.page(spec)
+        if found is None:
+            self.candidates.count("exact")
+            return run_search(spec, self._supabase)
+        if cached:
+            self.candidates.count("local")
+        if found.total is None:
+            self.candidates.count("counted")
+            found = found._replace(total=count_matches(spec, self._supabase))
+        return found
+
+    def next_page(self, user_id: str, spec: SearchSpec, token: str, timeout: float) -> SearchResult:
+        """
+        The page after `token` (SearchResult.cursor) — no rows, and no query,
+        past the last one. A token issued for other filters starts over at
+        the first page; so does a ranked token whose fit order can't be
+        continued (that result is flagged `restarted`).
+        """
+        cursor = Cursor.decode(token, spec)
+        if cursor is None:
+            self._count_page("stale")
+            return self.find(user_id, spec, timeout)
+        self._count_page("next")
+        if cursor.total is not None and cursor.shown >= cursor.total:
+            return SearchResult([], total=cursor.total, offset=cursor.shown)
+        cands = self.candidates.covering(user_id, spec)
+        if cursor.ranked and (cands is None or not cands.complete):
+            # Fit order only exists inside a candidate set: fetch it again
+            # rather than continue by rent and repeat or skip listings
+            cands = fetch_candidates(spec.core(), self._supabase)
+            self.candidates.put(user_id, cands)
+            self.candidates.count("fetched")
+        found = None
+        if cands is not None and cands.complete == cursor.ranked:
+            found = cands.page(spec, cursor.listing_id)
+        if found is None and cursor.ranked:
+            # The set outgrew CANDIDATE_LIMIT or lost the last listing shown.
+            # Continuing by rent from a position in fit order would repeat some
+            # listings and skip others, so start the list over.
+            self._count_page("restarted")
+            return self.find(user_id, spec, timeout)._replace(restarted=True)
+        if found is None:
+            self.candidates.count("exact")
+            return run_search(spec, self._supabase, after=cursor)
+        self.candidates.count("local")
+        return found._replace(recommendation_text="", total=cursor.total, offset=cursor.shown)
+
+    def forget(self, user_id: str) -> None:
+        self.prefetcher.forget(user_id)
+        self.candidates.forget(user_id)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            pages = dict(self.pages)
+        return {"prefetch": self.prefetcher.snapshot(), "candidates": self.candidates.snapshot(),
+                "pages": pages, "details": self.details.snapshot()}
+
+    def _count_page(self, outcome: str) -> None:
+        with self._lock:
+            self.pages[outcome] += 1
@@ -0,0 +1,71 @@
+"""
+service_endpoints.py — Where the backend's external clients point.
+
+By default every client talks to the real service with the keys in .env.
+Setting FAKE_SERVICES_URL (e.g. http://127.0.0.1:8900, served by
+scripts/fake_services.py) points Groq, Supabase and Google Maps at the local
+stand-ins instead, with dummy credentials, so /chat can be load-tested without
+spending tokens or Maps quota.
+
+Usage:
+    from service_endpoints import make_groq_client, make_supabase_client, make_gmaps_client
+    groq_client = make_groq_client()
+    url = f"{MAPS_BASE_URL}/maps/api/distancematrix/json"
+"""
+
+import os
+
+import googlemaps
+from dotenv import load_dotenv
+from groq import Groq
+from supabase import create_client, Client, ClientOptions
+
+load_dotenv()
+
+FAKE_SERVICES_URL = os.getenv("FAKE_SERVICES_URL", "").rstrip("/")
+USING_FAKE_SERVICES = bool(FAKE_SERVICES_URL)
+
+# googlemaps validates the key shape, so the dummy has to look like a real one
+_FAKE_MAPS_KEY = "AIza" + "0" * 35
+
+if USING_FAKE_SERVICES:
+    GROQ_API_KEY = "fake-groq-key"
+    GROQ_BASE_URL = FAKE_SERVICES_URL
+    SUPABASE_URL = FAKE_SERVICES_URL
+    SUPABASE_KEY = "fake-supabase-key"
+    GOOGLE_MAPS_API_KEY = _FAKE_MAPS_KEY
+    MAPS_BASE_URL = FAKE_SERVICES_URL
+    # The stand-in is meant to be hammered; don't let the client throttle itself
+    MAPS_QUERIES_PER_SECOND = 10_000
+else:
+    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_BASE_URL = None                 # SDK default (honours GROQ_BASE_URL itself)
+    SUPABASE_URL = os.getenv("SUPABASE_URL")
+    SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+    GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
+    MAPS_BASE_URL = "https://maps.googleapis.com"
+    MAPS_QUERIES_PER_SECOND = 60         # googlemaps default
+
+
+def make_groq_client() -> Groq:
+    return Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+
+
+def make_supabase_client() -> Client:
+    return create_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=ClientOptions(postgrest_client_timeout=60),
+    )
+
+
+def make_gmaps_client() -> googlemaps.Client:
+    return googlemaps.Client(
+        key=GOOGLE_MAPS_API_KEY,
+        base_url=MAPS_BASE_URL,
+        queries_per_second=MAPS_QUERIES_PER_SECOND,
+        # Callers stop waiting at their stage deadline (resilience.py); don't let
+        # an abandoned call keep retrying for the library's default 60s
+        timeout=5,
+        retry_timeout=5,
+    )
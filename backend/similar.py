@@ -0,0 +1,199 @@
+"""
+similar.py — "More like this one": nearest listings by feature vector.
+
+Each listing table becomes one float32 matrix, a row per listing, laid out
+like data_pipeline/data/cleaned_data_v2_no_leakage.csv (the rent model's
+training set; see notebooks/01_preprocessing_data.ipynb):
+
+  numeric columns            standardised (z-score; blank = the column mean)
+  furnishing, building_age   the notebook's ordinal codes, standardised
+  yes / no amenities         0 / 1 (blank = 0.5)
+  area_type, property_type,  one-hot, every value kept (drop_first would make
+  facing, zone, …            the dropped value closer to all the others)
+
+plus what the CSV leaves out because it is the target or the row's place:
+log rent, latitude and longitude. WEIGHTS stretches the columns a renter
+compares first (size, rent, place). A one-hot mismatch flips two columns,
+so they are scaled by 1/√2 to count like any other column.
+
+A query is one matrix-vector product (squared L2 distance to every row of
+the persona's table), a budget mask, and argpartition for the top k — about
+a tenth of a millisecond for a few thousand listings; no ANN index needed
+at this size.
+
+The matrices are built from the facet index's table load (facets.py), like
+market_stats.MarketCube: FacetIndex loads LOAD_COLUMNS on top of its own,
+and each load swaps a fresh catalogue in. Results are precomputed cards
+(listing_cards.to_card).
+
+Usage:
+    index = SimilarIndex()
+    index.load("home", rows)                                 # FacetIndex on_load
+    index.similar("BLR-XPND-1000", persona="home", budget=30000, k=6)
+        → [{"listing_id": …, "formatted_rent": …, "similarity": 0.87, …}, …] | None
+"""
+
+import math
+import threading
+
+import numpy as np
+
+from listing_cards import search_columns, to_card
+from utils import coerce_flag, safe_int
+
+MAX_RESULTS = 20
+
+NUMERIC = {
+    "pg": ("size_bhk", "latitude", "longitude"),
+    "home": ("size_bhk", "total_sqft", "bath", "balcony", "distance_to_major_office_km", "dist_to_metro_km",
+             "nearby_hospitals", "commute_time_peak_mins", "latitude", "longitude"),
+}
+ORDINAL = {
+    "pg": {},
+    "home": {
+        "furnishing": {"unfurnished": 0, "semi furnished": 1, "fully furnished": 2},
+        "building_age": {"10+ years": 0, "5-10 years": 1, "1-5 years": 2, "new": 3},
+    },
+}
+FLAGS = {
+    "pg": ("food_included", "has_gym", "has_wifi", "has_washing_machine"),
+    "home": ("gym_nearby", "park_nearby", "swimming_pool", "food_delivery", "has_ac", "has_refrigerator",
+             "has_washing_machine", "two_wheeler_parking", "four_wheeler_parking"),
+}
+ONE_HOT = {
+    "pg": ("preferred_tenants", "nearby_hub"),
+    "home": ("area_type", "property_type", "facing", "water_source", "dietary_preference", "zone"),
+}
+WEIGHTS = {"size_bhk": 2.0, "rent": 2.0, "latitude": 1.5, "longitude": 1.5}
+
+# What SimilarIndex.load needs from a row: its features plus the card columns
+LOAD_COLUMNS = {
+    persona: tuple(dict.fromkeys(
+        search_columns(persona).split(",") + list(NUMERIC[persona]) + list(ORDINAL[persona])
+        + list(FLAGS[persona]) + list(ONE_HOT[persona])
+    ))
+    for persona in NUMERIC
+}
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _label(value) -> str:
+    """'Semi-Furnished' / 'semi furnished' → 'semi furnished' (the notebook's standardisation)."""
+    return " ".join(str(value or "").replace("/", " ").replace("-", " ").lower().split())
+
+
+def _standardised(column: np.ndarray) -> np.ndarray:
+    mean = np.nanmean(column) if np.isfinite(column).any() else 0.0
+    std = np.nanstd(column) if np.isfinite(column).any() else 0.0
+    column = np.where(np.isnan(column), mean, column)
+    return (column - mean) / std if std > 0 else np.zeros_like(column)
+
+
+def feature_matrix(persona: str, rows: list) -> tuple[np.ndarray, list]:
+    """(float32 matrix, column names) for `rows` of this persona's table."""
+    columns, names = [], []
+
+    def add(name: str, values: np.ndarray) -> None:
+        columns.append(values * WEIGHTS.get(name, 1.0))
+        names.append(name)
+
+    n = len(rows)
+    rents = np.fromiter((_number(r.get("rent_price_inr_per_month")) for r in rows), float, n)
+    add("rent", _standardised(np.log1p(np.where(rents > 0, rents, np.nan))))
+    for name in NUMERIC[persona]:
+        add(name, _standardised(np.fromiter((_number(r.get(name)) for r in rows), float, n)))
+    for name, codes in ORDINAL[persona].items():
+        add(name, _standardised(np.fromiter((codes.get(_label(r.get(name)), math.nan) for r in rows), float, n)))
+    for name in FLAGS[persona]:
+        flags = (coerce_flag(r.get(name)) for r in rows)
+        add(name, np.fromiter((0.5 if f is None else float(f) for f in flags), float, n))
+    for name in ONE_HOT[persona]:
+        labels = [_label(r.get(name)) for r in rows]
+        for value in sorted(set(labels) - {""}):
+            add(f"{name}={value}", np.fromiter((v == value for v in labels), float, n) / math.sqrt(2))
+    matrix = np.column_stack(columns).astype(np.float32) if columns and n else np.zeros((n, 0), np.float32)
+    return matrix, names
+
+
+class _Catalogue:
+    """One persona's listings: feature matrix, squared row norms, rents, cards."""
+
+    def __init__(self, persona: str, rows: list):
+        self.matrix, self.names = feature_matrix(persona, rows)
+        self.norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.rents = np.fromiter((safe_int(r.get("rent_price_inr_per_month"), 0) for r in rows), np.int64, len(rows))
+        self.cards = [to_card(r) for r in rows]
+        self.position = {r["listing_id"]: i for i, r in enumerate(rows)}
+        # Distance at which similarity is 0.5: the typical distance between two listings
+        self.scale = float(np.sqrt(2 * max(len(self.names), 1)))
+
+    def nearest(self, i: int, budget: int, k: int) -> list:
+        distance = self.norms - 2 * (self.matrix @ self.matrix[i]) + self.norms[i]
+        allowed = self.rents > 0
+        if budget > 0:
+            allowed &= self.rents <= budget
+        allowed[i] = False
+        candidates = np.flatnonzero(allowed)
+        if not len(candidates):
+            return []
+        distance = np.sqrt(np.maximum(distance[candidates], 0))
+        top = np.argpartition(distance, k - 1)[:k] if len(candidates) > k else np.arange(len(candidates))
+        top = top[np.argsort(distance[top], kind="stable")]
+        return [
+            {**self.cards[candidates[j]], "similarity": round(1 / (1 + float(distance[j]) / self.scale), 3)}
+            for j in top.tolist()
+        ]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Index
+# ─────────────────────────────────────────────────────────────────────────────
+class SimilarIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalogues: dict[str, _Catalogue] = {}
+        self.stats = dict.fromkeys(("loads", "queries", "not_found"), 0)
+
+    def load(self, persona: str, rows: list) -> None:
+        """Replace `persona`'s catalogue with `rows` (the whole table)."""
+        catalogue = _Catalogue(persona, rows)
+        with self._lock:
+            self._catalogues[persona] = catalogue
+            self.stats["loads"] += 1
+
+    def ready(self) -> bool:
+        with self._lock:
+            return bool(self._catalogues)
+
+    def similar(self, listing_id: str, persona: str | None = None, budget: int = 0,
+                k: int = 6) -> list | None:
+        """
+        Up to k cards most like the listing (nearest first), at or under
+        `budget` when one is given. persona names the table; without it both
+        are tried. None when no catalogue holds the listing.
+        """
+        k = max(1, min(k, MAX_RESULTS))
+        with self._lock:
+            self.stats["queries"] += 1
+            catalogues = [self._catalogues.get(persona)] if persona else list(self._catalogues.values())
+        for catalogue in catalogues:
+            i = catalogue.position.get(listing_id) if catalogue is not None else None
+            if i is not None:
+                return catalogue.nearest(i, budget, k)
+        with self._lock:
+            self.stats["not_found"] += 1
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "rows": {persona: len(c.cards) for persona, c in self._catalogues.items()},
+                "dims": {persona: len(c.names) for persona, c in self._catalogues.items()},
+            }
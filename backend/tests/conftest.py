@@ -0,0 +1,71 @@
+"""
+Shared setup for the backend tests (run from backend/: python -m pytest -q).
+
+Modules are imported the way main.py imports them (flat, from backend/).
+Nothing here talks to Groq, Supabase or Maps: tests that need a table use
+FakeSupabase, which answers the query-builder chain the modules use.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing main-adjacent modules builds clients; point them at the local stand-ins
+os.environ.setdefault("FAKE_SERVICES_URL", "http://127.0.0.1:8900")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:8900")
+os.environ.setdefault("SUPABASE_KEY", "test")
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data)
+
+
+class _Query:
+    def __init__(self, fake, table: str):
+        self._fake = fake
+        self._table = table
+        self._tests = []
+        self._order = None
+        self._limit = None
+
+    def select(self, *_args, **_kwargs):
+        return self
+
+    def eq(self, column, value):
+        self._tests.append((column, lambda v: v == value))
+        return self
+
+    def gt(self, column, value):
+        self._tests.append((column, lambda v: v is not None and v > value))
+        return self
+
+    def order(self, column, *, desc: bool = False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def execute(self):
+        self._fake.queries.append(self._table)
+        rows = [r for r in self._fake.tables.get(self._table, [])
+                if all(test(r.get(column)) for column, test in self._tests)]
+        if self._order is not None:
+            column, desc = self._order
+            rows.sort(key=lambda r: r.get(column), reverse=desc)
+        return _Result(rows[:self._limit] if self._limit is not None else rows)
+
+
+class FakeSupabase:
+    """supabase.Client stand-in over in-memory tables: {"PG_Listings": [row, ...], ...}."""
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self.queries = []
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
@@ -0,0 +1,21 @@
+from ai_tools import decode_extraction
+
+
+def test_decode_maps_short_keys_and_enum_codes():
+    raw = decode_extraction('{"loc": "HSR", "rent": 15000, "share": 2, "gen": "b", "food": true}', "pg")
+    assert raw == {"location": "HSR", "rent_price_inr_per_month": 15000, "Sharing": 2,
+                   "gender_preference": "Boys", "food_included": True}
+
+
+def test_decode_drops_keys_outside_the_persona_nulls_and_unknown_codes():
+    raw = decode_extraction('{"bhk": 2, "share": 3, "mar": "X", "furn": "Semi", "loc": null, "zzz": 1}', "home")
+    assert raw == {"size_bhk": 2, "furnishing": "Semi-Furnished"}
+
+
+def test_decode_without_persona_accepts_every_key():
+    assert decode_extraction('{"bhk": 2, "share": 3}', None) == {"size_bhk": 2, "Sharing": 3}
+
+
+def test_decode_tolerates_non_object_replies():
+    for text in ("", "not json", "[1, 2]", '"loc"', None):
+        assert decode_extraction(text, "home") == {}
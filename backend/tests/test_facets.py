@@ -0,0 +1,88 @@
+import threading
+
+from area_suggest import area_listing_counts
+from conftest import FakeSupabase
+from facets import FacetIndex
+from location_areas import area_id_for
+from search import SearchSpec
+
+
+def _home(listing_id: str, rent: int, **columns) -> dict:
+    return {"listing_id": listing_id, "rent_price_inr_per_month": rent,
+            "latitude": 12.9, "longitude": 77.6, **columns}
+
+
+def _index(home_rows: list, pg_rows: list = ()) -> FacetIndex:
+    index = FacetIndex(FakeSupabase({"properties": home_rows, "PG_Listings": list(pg_rows)}))
+    index.refresh()
+    return index
+
+
+def test_parking_counts_are_indexed_as_present_or_absent():
+    index = _index([
+        _home("H1", 20000, two_wheeler_parking=2, four_wheeler_parking=0),
+        _home("H2", 25000, two_wheeler_parking=3, four_wheeler_parking=1.0),
+        _home("H3", 30000, two_wheeler_parking=0, four_wheeler_parking="2"),
+        _home("H4", 35000, two_wheeler_parking=None, four_wheeler_parking="no"),
+    ])
+    spec = SearchSpec("home", 0, 0, 0, "")
+    facets = index.counts(spec)["facets"]
+    assert facets["two_wheeler_parking"] == {"false": 1, "true": 2}
+    assert facets["four_wheeler_parking"] == {"false": 2, "true": 2}
+
+    ticked = index.counts(spec, {"two_wheeler_parking": {True}})
+    assert ticked["total"] == 2
+
+
+def test_never_loaded_index_refreshes_on_first_query(monkeypatch):
+    # Shortly after boot monotonic time is below FACET_REFRESH_S; a failed
+    # startup load must still be retried by the next query
+    monkeypatch.setattr("facets.time.monotonic", lambda: 10.0)
+    index = FacetIndex(FakeSupabase({"properties": [_home("H1", 20000)], "PG_Listings": []}))
+    spec = SearchSpec("home", 0, 0, 0, "")
+    assert index.counts(spec) is None
+    for thread in threading.enumerate():
+        if thread.name == "facet-refresh":
+            thread.join()
+    assert index.counts(spec)["total"] == 1
+    assert index.snapshot()["age_s"] == 0.0
+
+
+def test_counts_follow_the_search_filters_and_leave_out_own_selection():
+    index = _index([
+        _home("H1", 20000, size_bhk=2, furnishing="Semi-Furnished", has_ac=True),
+        _home("H2", 25000, size_bhk=2, furnishing="Fully Furnished", has_ac=False),
+        _home("H3", 30000, size_bhk=2, furnishing="Semi-Furnished", has_ac=False),
+        _home("H4", 45000, size_bhk=2, furnishing="Fully Furnished", has_ac=True),
+        _home("H5", 22000, size_bhk=3, furnishing="Semi-Furnished", has_ac=True),
+    ])
+    spec = SearchSpec("home", 30000, 2, 0, "")
+    plain = index.counts(spec)
+    assert plain["total"] == 3
+    assert plain["facets"]["furnishing"] == {"Fully Furnished": 1, "Semi-Furnished": 2}
+
+    ticked = index.counts(spec, {"furnishing": {"Semi-Furnished"}, "has_ac": {True}})
+    assert ticked["total"] == 1
+    assert ticked["facets"]["furnishing"] == {"Fully Furnished": 0, "Semi-Furnished": 1}
+    assert ticked["facets"]["has_ac"] == {"false": 1, "true": 1}
+
+
+def test_pg_gender_filter_includes_unisex():
+    index = _index([], [
+        {"listing_id": "P1", "rent_price_inr_per_month": 8000, "preferred_tenants": "Boys", "size_bhk": 2},
+        {"listing_id": "P2", "rent_price_inr_per_month": 9000, "preferred_tenants": "Unisex", "size_bhk": 2},
+        {"listing_id": "P3", "rent_price_inr_per_month": 9500, "preferred_tenants": "Girls", "size_bhk": 2},
+    ])
+    counts = index.counts(SearchSpec("pg", 10000, 0, 0, "", gender="Boys"))
+    assert counts["total"] == 2
+    assert counts["facets"]["preferred_tenants"] == {"Boys": 1, "Girls": 0, "Unisex": 1}
+
+
+def test_area_counts_cover_both_tables():
+    index = _index(
+        [_home("H1", 20000, location="HSR Layout"), _home("H2", 25000, location="hsr"),
+         _home("H3", 30000, location="Whitefield"), _home("H4", 31000, location="Nowhere Town")],
+        [{"listing_id": "P1", "rent_price_inr_per_month": 8000, "location": "HSR Layout"}],
+    )
+    assert index.area_counts() == {area_id_for("HSR Layout"): 3, area_id_for("Whitefield"): 1}
+    assert area_listing_counts(index.area_counts()) == {"HSR Layout": 3, "Whitefield": 1}
@@ -0,0 +1,54 @@
+from conftest import FakeSupabase
+from listing_cards import ListingDetails, to_card
+
+HOME = {"listing_id": "BLR-1", "location": "HSR Layout", "rent_price_inr_per_month": 30000,
+        "legal_security_deposit": 0, "property_name": "Sunrise Apartments"}
+PG = {"listing_id": "PG-7", "location": "Koramangala", "rent_price_inr_per_month": 9000,
+      "legal_security_deposit": 18000}
+
+
+def _details():
+    fake = FakeSupabase({"properties": [HOME], "PG_Listings": [PG]})
+    return ListingDetails(fake), fake
+
+
+def test_card_formats_rent_and_deposit():
+    card = to_card(HOME, {"score": 82, "budget": 40})
+    assert card["display_title"] == "Sunrise Apartments"
+    assert card["formatted_rent"] == "₹30,000"
+    assert card["formatted_deposit"] == "On request"
+    assert card["match_score"] == 82 and card["match_breakdown"] == {"budget": 40}
+
+
+def test_details_found_in_named_table():
+    details, _ = _details()
+    assert details.get("BLR-1", persona="home")["formatted_rent"] == "₹30,000"
+    assert details.get("PG-7", persona="pg")["location"] == "Koramangala"
+
+
+def test_wrong_persona_miss_does_not_hide_listing_from_other_scopes():
+    details, _ = _details()
+    assert details.get("BLR-1", persona="pg") is None
+    assert details.get("BLR-1", persona="home")["listing_id"] == "BLR-1"
+    assert details.get("BLR-1")["listing_id"] == "BLR-1"
+
+
+def test_unscoped_miss_does_not_answer_scoped_lookup_from_cache():
+    details, fake = _details()
+    assert details.get("NOPE") is None
+    queries = len(fake.queries)
+    assert details.get("NOPE", persona="home") is None
+    assert len(fake.queries) == queries + 1
+
+
+def test_repeat_lookup_is_served_from_cache():
+    details, fake = _details()
+    details.get("PG-7", persona="pg")
+    details.get("PG-7", persona="pg")
+    assert len(fake.queries) == 1
+    assert details.snapshot()["hit"] == 1
+
+
+def test_unknown_persona_searches_every_table():
+    details, _ = _details()
+    assert details.get("PG-7", persona="villa")["listing_id"] == "PG-7"
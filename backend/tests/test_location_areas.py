@@ -0,0 +1,28 @@
+import pytest
+
+from location_areas import area_id_for, normalise_area
+
+
+@pytest.mark.parametrize("typed, canonical", [
+    ("koramangla", "Koramangala"),
+    ("HSR layot", "HSR Layout"),
+    ("indranagar", "Indiranagar"),
+    ("whitefeild", "Whitefield"),
+    ("sarjapura road", "Sarjapur Road"),
+    ("btm", "BTM Layout"),
+    ("Jp nagar", "JP Nagar"),
+    ("Bellandur ", "Bellandur"),
+])
+def test_typos_and_aliases_resolve_to_the_canonical_area(typed, canonical):
+    assert normalise_area(typed) == canonical
+    assert area_id_for(typed) == area_id_for(canonical) is not None
+
+
+def test_longer_canonical_name_is_not_collapsed_into_a_shorter_one():
+    assert normalise_area("electronic city phase 2") == "Electronic City Phase 2"
+    assert area_id_for("electronic city phase 2") != area_id_for("electronic city")
+
+
+def test_unknown_place_has_no_area_id():
+    assert area_id_for("xyzzy") is None
+    assert area_id_for("") is None
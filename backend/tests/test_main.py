@@ -0,0 +1,21 @@
+import json
+
+import main
+
+
+def _session_with_cursor() -> dict:
+    session = main._empty_session()
+    session.update(persona="home", location="HSR Layout", rent_price_inr_per_month=30000, size_bhk=2,
+                   search_cursor="eyJub3QiOiJhIGN1cnNvciJ9")
+    return session
+
+
+def test_show_more_failure_is_an_error_reply_not_an_exception(monkeypatch):
+    def broken_page(*_args):
+        raise RuntimeError("postgrest said no")
+
+    monkeypatch.setitem(main.user_sessions, "u-show-more", _session_with_cursor())
+    monkeypatch.setattr(main, "_next_page_turn", broken_page)
+    response = main._answer_turn("u-show-more", "show more")
+    assert response.status_code == 500
+    assert json.loads(response.body)["status"] == "error"
@@ -0,0 +1,37 @@
+import random
+
+from reply_text import ReplySanitizer, strip_llm_dashboard
+
+REPLIES = [
+    "Great choice! Koramangala has excellent PGs. 🏠\n\nWhat's your budget?",
+    "### STATUS DASHBOARD\n📍 Location: HSR Layout\n💰 Budget: ₹15,000\n🛏️ BHK: 2\n\n"
+    "Perfect! Do you need parking?",
+    "╔══════════════════╗\n║  REQUIREMENTS    ║\n╚══════════════════╝\nAwesome — shall I look near your office?",
+    "✨ Your Tatva PG Selections:\n👦 Gender Preference: Boys\n🍱 Food: Yes\n\nGot it! Which area?",
+    "Here's what I have so far:\n📍 Whitefield\n💰 ₹25k\n\n\n\nAny preference on furnishing?",
+    "No dashboard here, just a ✅ tick inline and 🛏 bare bed emoji.",
+]
+
+
+def _streamed(text: str, cuts: list[int]) -> str:
+    sanitizer = ReplySanitizer()
+    bounds = [0, *cuts, len(text)]
+    out = "".join(sanitizer.feed(text[a:b]) for a, b in zip(bounds, bounds[1:]))
+    return out + sanitizer.close()
+
+
+def test_dashboards_are_stripped():
+    assert strip_llm_dashboard(REPLIES[1]) == "Perfect! Do you need parking?"
+    assert strip_llm_dashboard(REPLIES[2]) == "Awesome — shall I look near your office?"
+    assert strip_llm_dashboard(REPLIES[3]) == "Got it! Which area?"
+    assert strip_llm_dashboard(REPLIES[0]) == REPLIES[0]
+
+
+def test_streamed_output_matches_whole_reply():
+    rng = random.Random(30)
+    for text in REPLIES:
+        whole = strip_llm_dashboard(text)
+        assert _streamed(text, list(range(1, len(text)))) == whole       # one char at a time
+        for _ in range(50):
+            cuts = sorted(rng.sample(range(len(text) + 1), rng.randint(0, 6)))
+            assert _streamed(text, cuts) == whole
@@ -0,0 +1,24 @@
+from schemas import RentalExtractionMonitor
+
+
+def test_pg_extraction_clears_home_fields():
+    # Regression: with validate_assignment=True the validator's own writes
+    # re-ran it until RecursionError, and the whole extraction was dropped
+    data = RentalExtractionMonitor(property_type="PG", size_bhk=2, marital_status="Married",
+                                   Sharing="2", location="HSR Layout")
+    assert data.size_bhk is None and data.marital_status is None
+    assert data.Sharing == 2 and data.location == "HSR Layout"
+
+
+def test_home_extraction_clears_pg_fields():
+    data = RentalExtractionMonitor(property_type="Apartment", size_bhk="2BHK", Sharing=3,
+                                   gender_preference="Boys", nearby_hub="Manyata")
+    assert data.size_bhk == 2
+    assert (data.Sharing, data.gender_preference, data.nearby_hub) == (None, None, None)
+
+
+def test_persona_set_by_assignment_still_clears():
+    data = RentalExtractionMonitor(size_bhk=2, Sharing=2)
+    assert (data.size_bhk, data.Sharing) == (2, 2)        # no property_type yet: nothing cleared
+    data.property_type = "PG"
+    assert data.size_bhk is None and data.Sharing == 2
@@ -0,0 +1,65 @@
+import pytest
+
+import search
+from conftest import FakeSupabase
+from search import Cursor, SearchResult, SearchSpec, probe_area_ids
+
+SESSION = {"persona": "home", "location": "hsr", "area_id": 7, "rent_price_inr_per_month": 30000,
+           "size_bhk": "2"}
+
+
+@pytest.fixture
+def area_ids(monkeypatch):
+    """Restores the area_id switch a test flips."""
+    monkeypatch.setattr(search, "_area_ids_ready", search._area_ids_ready)
+    monkeypatch.setattr(search, "AREA_ID_FILTER", "auto")
+
+
+def test_probe_keeps_ilike_until_area_ids_are_synced(area_ids):
+    rows = [{"listing_id": "H1", "location": "HSR Layout"}]
+    assert probe_area_ids(FakeSupabase({"properties": rows, "PG_Listings": rows})) is False
+    spec = SearchSpec.from_session(SESSION)
+    assert (spec.area_id, spec.location) == (0, "hsr")
+
+
+def test_probe_switches_to_area_id_once_both_tables_have_it(area_ids):
+    synced = [{"listing_id": "H1", "location": "HSR Layout", "area_id": 7}]
+    assert probe_area_ids(FakeSupabase({"properties": synced, "PG_Listings": []})) is False
+    assert probe_area_ids(FakeSupabase({"properties": synced, "PG_Listings": synced})) is True
+    spec = SearchSpec.from_session(SESSION)
+    assert (spec.area_id, spec.location) == (7, "")
+
+
+def test_failed_probe_falls_back_to_ilike(area_ids):
+    class Down:
+        def table(self, _name):
+            raise ConnectionError("postgrest unreachable")
+
+    search._area_ids_ready = True
+    assert probe_area_ids(Down()) is False
+    assert search.area_ids_ready() is False
+
+
+def _rows(n: int) -> list:
+    return [{"listing_id": f"H{i:02d}", "rent_price_inr_per_month": 20000 + 100 * i} for i in range(n)]
+
+
+def test_cursor_round_trips_for_the_same_filters():
+    spec = SearchSpec("home", 30000, 2, 0, "hsr")
+    result = SearchResult(_rows(search.RESULT_LIMIT), total=40, offset=15, ranked=True)
+    cursor = Cursor.decode(result.cursor(spec), spec)
+    assert cursor == Cursor(spec.fingerprint(), 21400, "H14", 30, 40, True)
+
+
+def test_last_page_cursor_records_the_final_total():
+    spec = SearchSpec("pg", 9000, 2, 0, "", gender="Boys")
+    cursor = Cursor.decode(SearchResult(_rows(3), total=None).cursor(spec), spec)
+    assert (cursor.listing_id, cursor.shown, cursor.total) == ("H02", 3, 3)
+
+
+def test_cursor_for_other_filters_or_garbage_is_rejected():
+    spec = SearchSpec("home", 30000, 2, 0, "hsr")
+    token = SearchResult(_rows(search.RESULT_LIMIT), total=40).cursor(spec)
+    assert Cursor.decode(token, spec._replace(budget=35000)) is None
+    assert Cursor.decode("not-a-cursor", spec) is None
+    assert Cursor.decode(token[:-4], spec) is None
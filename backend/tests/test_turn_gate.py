@@ -0,0 +1,56 @@
+import asyncio
+
+from turn_gate import TurnGate
+
+
+def _counting_turn(calls: list, result, release: asyncio.Event | None = None):
+    async def turn():
+        calls.append(result)
+        if release is not None:
+            await release.wait()
+        return result
+    return turn
+
+
+def test_same_message_id_in_flight_runs_once():
+    async def scenario():
+        gate, calls, release = TurnGate(), [], asyncio.Event()
+        first = asyncio.ensure_future(gate.run("u1", "m1", _counting_turn(calls, "reply", release)))
+        await asyncio.sleep(0)
+        retry = asyncio.ensure_future(gate.run("u1", "m1", _counting_turn(calls, "again")))
+        await asyncio.sleep(0)
+        release.set()
+        return await first, await retry, calls, gate.stats
+
+    first, retry, calls, stats = asyncio.run(scenario())
+    assert first == retry == "reply"
+    assert calls == ["reply"]
+    assert stats["coalesced"] == 1 and stats["turns"] == 1
+
+
+def test_finished_message_id_is_replayed():
+    async def scenario():
+        gate, calls = TurnGate(), []
+        await gate.run("u1", "m1", _counting_turn(calls, "reply"))
+        again = await gate.run("u1", "m1", _counting_turn(calls, "again"))
+        other_user = await gate.run("u2", "m1", _counting_turn(calls, "u2 reply"))
+        return again, other_user, calls, gate.stats
+
+    again, other_user, calls, stats = asyncio.run(scenario())
+    assert (again, other_user) == ("reply", "u2 reply")
+    assert calls == ["reply", "u2 reply"]
+    assert stats["replayed"] == 1
+
+
+def test_messages_without_id_are_separate_turns_in_order():
+    async def scenario():
+        gate, calls, release = TurnGate(), [], asyncio.Event()
+        first = asyncio.ensure_future(gate.run("u1", None, _counting_turn(calls, "show more 1", release)))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(gate.run("u1", None, _counting_turn(calls, "show more 2")))
+        await asyncio.sleep(0)
+        assert calls == ["show more 1"]            # the second waits for the user's lane
+        release.set()
+        return await first, await second, calls
+
+    assert asyncio.run(scenario()) == ("show more 1", "show more 2", ["show more 1", "show more 2"])
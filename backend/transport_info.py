@@ -10,15 +10,17 @@ Provides:
     - transport_text : human-readable summary for the bot to show
 """
 
-import os
 import requests
 from typing import Optional
 
+from resilience import call, stage_timeout
+from service_endpoints import GOOGLE_MAPS_API_KEY, MAPS_BASE_URL
+
 # Kempegowda Bus Terminal (Majestic) — Bengaluru's central transit hub
 MAJESTIC_LAT = 12.9767
 MAJESTIC_LNG = 77.5713
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
+GOOGLE_API_KEY = GOOGLE_MAPS_API_KEY
 
 
 def _nearby_metro_stations(lat: float, lng: float, api_key: str, radius_m: int = 2000) -> list[dict]:
@@ -26,7 +28,7 @@ def _nearby_metro_stations(lat: float, lng: float, api_key: str, radius_m: int =
     Returns metro stations within radius_m metres using Google Places Nearby Search.
     Each entry: {"name": str, "distance_m": int}
     """
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    url = f"{MAPS_BASE_URL}/maps/api/place/nearbysearch/json"
     params = {
         "location": f"{lat},{lng}",
         "radius": radius_m,
@@ -34,7 +36,7 @@ def _nearby_metro_stations(lat: float, lng: float, api_key: str, radius_m: int =
         "key": api_key,
     }
     try:
-        resp = requests.get(url, params=params, timeout=5)
+        resp = call("maps", requests.get, url, params=params, timeout=stage_timeout("maps"), breaker="maps")
         data = resp.json()
         stations = []
         for place in data.get("results", [])[:5]:
@@ -61,7 +63,7 @@ def _distance_matrix(
     """
     Returns {"distance_km": float, "duration_min": int} via Google Distance Matrix.
     """
-    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
+    url = f"{MAPS_BASE_URL}/maps/api/distancematrix/json"
     params = {
         "origins":      f"{origin_lat},{origin_lng}",
         "destinations": f"{dest_lat},{dest_lng}",
@@ -69,7 +71,7 @@ def _distance_matrix(
         "key":          api_key,
     }
     try:
-        resp = requests.get(url, params=params, timeout=5)
+        resp = call("maps", requests.get, url, params=params, timeout=stage_timeout("maps"), breaker="maps")
         data = resp.json()
         element = data["rows"][0]["elements"][0]
         if element["status"] != "OK":
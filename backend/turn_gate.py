@@ -0,0 +1,126 @@
+"""
+turn_gate.py — Per-user ordering and duplicate suppression for /chat turns.
+
+Every user has one mutable session dict, so two turns for the same user must
+never run at the same time. TurnGate runs turns for a user strictly one after
+another (FIFO — asyncio.Lock wakes waiters in arrival order), while turns for
+different users run concurrently.
+
+Duplicates are answered without running the turn again:
+  - same message_id while the first is still running → await the same result
+  - same message_id after it finished               → cached result (bounded, TTL)
+Only the message_id marks a duplicate. A message without one is always a
+turn of its own, queued behind the user's earlier turns — two quick "show
+more" or "yes" messages are two turns, not one.
+
+Usage:
+    from turn_gate import TurnGate
+    gate = TurnGate()
+    response = await gate.run(user_id, message_id,
+                              lambda: asyncio.to_thread(run_turn, user_id, message))
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+RESULT_TTL_SECONDS = 10 * 60   # long enough to cover client retries
+MAX_CACHED_RESULTS = 5000
+
+
+class _UserLane:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0          # requests holding or waiting on this lane
+
+
+class TurnGate:
+    def __init__(self, ttl: float = RESULT_TTL_SECONDS, max_results: int = MAX_CACHED_RESULTS):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._lanes: dict[str, _UserLane] = {}
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self._results: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self.stats = {"turns": 0, "coalesced": 0, "replayed": 0}
+
+    # ── Public ────────────────────────────────────────────────────────────────
+    async def run(self, user_id: str, message_id: Optional[str], turn: Callable[[], Awaitable]):
+        """
+        Runs `turn()` for `user_id` after any earlier turn of that user, unless
+        its message_id repeats an earlier one — then returns the original
+        turn's result instead.
+        """
+        if not message_id:
+            # Still its own task, so a disconnect can't release the lane mid-turn
+            return await asyncio.shield(asyncio.ensure_future(self._serialised(user_id, turn)))
+
+        key = (user_id, message_id)
+        cached = self._cached(key)
+        if cached is not None:
+            self.stats["replayed"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._run_turn(key, user_id, turn))
+            self._inflight[key] = task
+        # The turn is its own task: a caller that disconnects must neither cancel
+        # it for the duplicates nor release the user's lane while the worker
+        # thread is still writing to the session.
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "active_users": len(self._lanes),
+            "inflight": len(self._inflight),
+            "cached_results": len(self._results),
+        }
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+    async def _run_turn(self, key: tuple, user_id: str, turn: Callable[[], Awaitable]):
+        try:
+            result = await self._serialised(user_id, turn)
+            self._remember(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _serialised(self, user_id: str, turn: Callable[[], Awaitable]):
+        lane = self._lanes.get(user_id)
+        if lane is None:
+            lane = self._lanes[user_id] = _UserLane()
+        lane.users += 1
+        try:
+            async with lane.lock:
+                self.stats["turns"] += 1
+                return await turn()
+        finally:
+            lane.users -= 1
+            if lane.users == 0:
+                del self._lanes[user_id]      # idle users cost nothing
+
+    def _cached(self, key: tuple):
+        hit = self._results.get(key)
+        if hit is None:
+            return None
+        stored_at, result = hit
+        if time.monotonic() - stored_at > self.ttl:
+            del self._results[key]
+            return None
+        return result
+
+    def _remember(self, key: tuple, result) -> None:
+        self._results[key] = (time.monotonic(), result)
+        self._results.move_to_end(key)
+        now = time.monotonic()
+        while self._results:
+            oldest_key, (stored_at, _) = next(iter(self._results.items()))
+            if len(self._results) <= self.max_results and now - stored_at <= self.ttl:
+                break
+            del self._results[oldest_key]
@@ -75,4 +75,24 @@ def coerce_bool(value) -> bool | None:
         if v in ("null", "none", "n/a", ""):
             return None
 
-    return None
\ No newline at end of file
+    return None
+
+
+def coerce_flag(value) -> bool | None:
+    """
+    coerce_bool for listing columns that may hold counts instead of flags
+    (home two_wheeler_parking / four_wheeler_parking store the number of
+    spots): any positive number is True, zero is False, the rest goes
+    through coerce_bool.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value != value:                       # NaN
+            return None
+        return value > 0
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return coerce_bool(value)
+        return None if number != number else number > 0
+    return coerce_bool(value)
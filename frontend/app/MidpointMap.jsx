@@ -1,5 +1,5 @@
 "use client";
-import React, { useEffect } from 'react';
+import React, { useEffect, useState } from 'react';
 import { APIProvider, Map, AdvancedMarker, Pin, useMap } from '@vis.gl/react-google-maps';
 
 // --- UPDATED COMPONENT: Draws the Search Area (Box or Polygon) ---
@@ -90,7 +90,52 @@ const MapHandler = ({ hubs, properties }) => {
   return null;
 };
 
-export default function MidpointMap({ familyHubs = [], properties = [], searchZone = null }) {
+// --- All listings in view, aggregated server-side (GET /map/clusters) ---
+const formatK = (rent) => `₹${Math.round(rent / 1000)}k`;
+
+const ClusterLayer = ({ userId, shownIds }) => {
+  const map = useMap();
+  const [clusters, setClusters] = useState([]);
+
+  useEffect(() => {
+    if (!map) return;
+    let controller = null;
+
+    const load = async () => {
+      const bounds = map.getBounds();
+      if (!bounds) return;
+      const sw = bounds.getSouthWest();
+      const ne = bounds.getNorthEast();
+      const bbox = [sw.lng(), sw.lat(), ne.lng(), ne.lat()].map(v => v.toFixed(5)).join(',');
+      controller?.abort();
+      controller = new AbortController();
+      try {
+        const res = await fetch(
+          `${process.env.NEXT_PUBLIC_API_URL}/map/clusters?bbox=${bbox}&zoom=${Math.round(map.getZoom())}&user_id=${encodeURIComponent(userId)}`,
+          { signal: controller.signal },
+        );
+        if (res.ok) setClusters((await res.json()).clusters || []);
+      } catch (err) {
+        if (err.name !== 'AbortError') console.error("Cluster fetch failed", err);
+      }
+    };
+
+    const listener = map.addListener('idle', load);
+    return () => { listener.remove(); controller?.abort(); };
+  }, [map, userId]);
+
+  return clusters
+    .filter(c => !(c.count === 1 && shownIds.has(c.listing_id))) // already a green pin
+    .map(c => (
+      <AdvancedMarker key={`cluster-${c.lat}-${c.lng}`} position={{ lat: c.lat, lng: c.lng }}>
+        <div className="bg-emerald-600/85 text-white rounded-full shadow px-2 py-1 text-[10px] font-bold whitespace-nowrap">
+          {c.count > 1 ? `${c.count} · ${formatK(c.min_rent)}–${formatK(c.max_rent)}` : formatK(c.min_rent)}
+        </div>
+      </AdvancedMarker>
+    ));
+};
+
+export default function MidpointMap({ familyHubs = [], properties = [], searchZone = null, userId = null }) {
   const API_KEY = process.env.NEXT_PUBLIC_GOOGLE_MAPS_API_KEY;
 
   if (!API_KEY) {
@@ -114,6 +159,9 @@ export default function MidpointMap({ familyHubs = [], properties = [], searchZo
           
           <MapHandler hubs={familyHubs} properties={properties} />
 
+          {/* Every other matching listing in view, as count bubbles */}
+          {userId && <ClusterLayer userId={userId} shownIds={new Set(properties.map(p => p.listing_id))} />}
+
           {/* Hub Markers (Red) - Workplaces or Study Centers */}
           {familyHubs.map((hub, idx) => (
             <AdvancedMarker key={`hub-${idx}`} position={{ lat: parseFloat(hub.lat), lng: parseFloat(hub.lng) }}>
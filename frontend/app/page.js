@@ -26,6 +26,7 @@ export default function Page() {
   const [familyHubs, setFamilyHubs] = useState([]);
 
   const scrollRef = useRef(null);
+  const sendingRef = useRef(false); // state updates are async — a ref blocks double-clicks immediately
   const userId = "krishnahonnikhere";
   const [searchHistory, setSearchHistory] = useState([]); 
   const [activeSearchIndex, setActiveSearchIndex] = useState(null);
@@ -44,20 +45,73 @@ export default function Page() {
     scrollRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
 
+  // Transport info comes from a background job: long-poll it, then add it to the chat
+  const pollEnrichment = async (jobId) => {
+    for (let attempt = 0; attempt < 3; attempt++) {
+      try {
+        const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/jobs/${encodeURIComponent(jobId)}?wait=20`);
+        if (!res.ok) return;
+        const job = await res.json();
+        if (job.status === 'done') {
+          const text = job.result?.transport_text?.trim();
+          if (text) setMessages(prev => [...prev, { role: 'assistant', content: text }]);
+          return;
+        }
+        if (job.status === 'failed') return;
+        // still pending: the server either held us for `wait` or was at its poll cap
+        await new Promise(resolve => setTimeout(resolve, 2000));
+      } catch (e) {
+        return;
+      }
+    }
+  };
+
+  // "More like this": nearest listings to one card, shown as a search of their own
+  const showSimilar = async (prop, isPG) => {
+    try {
+      const snapshot = searchHistory[activeSearchIndex]?.snapshot || null;
+      const budget = snapshot?.rent_price_inr_per_month || 0;
+      const res = await fetch(
+        `${process.env.NEXT_PUBLIC_API_URL}/listing/${encodeURIComponent(prop.listing_id)}/similar?persona=${isPG ? 'pg' : 'home'}&budget=${budget}`
+      );
+      if (!res.ok) return;
+      const data = await res.json();
+      if (!data.similar?.length) return;
+      setSearchHistory(prev => {
+        const updatedHistory = [...prev, { label: `Like ${prop.display_title}`, properties: data.similar, familyHubs: [], snapshot }];
+        setActiveSearchIndex(updatedHistory.length - 1);
+        return updatedHistory;
+      });
+      setPropertyList(data.similar);
+    } catch (e) {
+      console.error(e);
+    }
+  };
+
   const handleSend = async (manualInput = null) => {
     const messageText = manualInput || input;
-    if (!messageText.trim()) return;
+    if (!messageText.trim() || sendingRef.current) return;
+    sendingRef.current = true;
 
     setMessages(prev => [...prev, { role: 'user', content: messageText }]);
     if (!manualInput) setInput('');
     setIsLoading(true);
+
+    // Same ID on the retry, so the backend replays the first answer instead of running the turn twice
+    const messageId = crypto.randomUUID();
+    const postMessage = () => fetch(`${process.env.NEXT_PUBLIC_API_URL}/chat`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ user_id: userId, message: messageText, message_id: messageId }),
+    });
     
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/chat`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ user_id: userId, message: messageText }),
-      });
+      let response;
+      try {
+        response = await postMessage();
+      } catch (networkError) {
+        response = await postMessage(); // one retry on a dropped connection
+      }
       const data = await response.json();
       
       const sessionData = data?.data || {};
@@ -85,11 +139,13 @@ export default function Page() {
           });
           setPropertyList(data.properties); 
         }
+        if (data.enrichment?.job_id) pollEnrichment(data.enrichment.job_id);
       }
     } catch (e) {
       console.error(e);
       setMessages(prev => [...prev, { role: 'assistant', content: "Server error." }]);
     } finally {
+      sendingRef.current = false;
       setIsLoading(false);
     }
   };
@@ -233,13 +289,13 @@ export default function Page() {
             {viewMode === 'list' ? (
               <div className="grid grid-cols-1 xl:grid-cols-2 gap-6 content-start">
                 {propertyList.map((prop, idx) => (
-                  <PropertyCard key={idx} prop={prop} theme={theme} />
+                  <PropertyCard key={idx} prop={prop} theme={theme} onSimilar={showSimilar} />
                 ))}
               </div>
             ) : (
               <div className="h-full w-full rounded-[2rem] overflow-hidden border border-white/10 shadow-inner bg-zinc-950 relative">
                 {familyHubs.length > 0 || propertyList.length > 0 ? (
-                  <MidpointMap familyHubs={familyHubs} properties={propertyList} searchZone={searchHistory[activeSearchIndex]?.searchZone} />
+                  <MidpointMap familyHubs={familyHubs} properties={propertyList} searchZone={searchHistory[activeSearchIndex]?.searchZone} userId={userId} />
                 ) : (
                   <div className="flex items-center justify-center h-full text-zinc-500">
                     <p className="font-black uppercase tracking-widest text-[10px]">No Map Data Available</p>
@@ -255,8 +311,25 @@ export default function Page() {
 }
 
 // --- SUB-COMPONENT: Individual Property Card (Moved to bottom) ---
-const PropertyCard = ({ prop, theme }) => {
+const PropertyCard = ({ prop, theme, onSimilar }) => {
   const [showContact, setShowContact] = useState(false);
+  const [details, setDetails] = useState(null);
+  const isPG = prop.property_type === 'PG' || prop.property_type === 'Hostel' || prop.property_type === 'Co-living';
+
+  // Cards are slim — contact details are fetched the first time they're asked for
+  const toggleContact = async () => {
+    if (!showContact && !details) {
+      try {
+        const res = await fetch(
+          `${process.env.NEXT_PUBLIC_API_URL}/listing/${encodeURIComponent(prop.listing_id)}?persona=${isPG ? 'pg' : 'home'}`
+        );
+        setDetails(res.ok ? (await res.json()).listing : {});
+      } catch (e) {
+        setDetails({});
+      }
+    }
+    setShowContact(!showContact);
+  };
 
   const openGoogleMaps = () => {
     const address = `${prop.detailed_address || ""}, ${prop.location}, Bengaluru`;
@@ -285,7 +358,7 @@ const PropertyCard = ({ prop, theme }) => {
         <div className="flex flex-wrap gap-2 mb-6">
           <div className="bg-blue-500/10 text-blue-500 text-[10px] font-bold px-3 py-1.5 rounded-xl flex items-center gap-1.5">
             <BedDouble size={12}/>
-            {prop.property_type === 'PG' || prop.property_type === 'Hostel' || prop.property_type === 'Co-living' 
+            {isPG
               ? `${prop.size_bhk} Sharing` 
               : `${prop.size_bhk} BHK`}
           </div>
@@ -312,8 +385,13 @@ const PropertyCard = ({ prop, theme }) => {
           <button onClick={openGoogleMaps} className="flex-1 bg-zinc-800 hover:bg-zinc-700 text-white flex items-center justify-center rounded-xl transition-all" title="View on Map">
             <MapPin size={18}/>
           </button>
-          <button onClick={() => setShowContact(!showContact)} className={`flex-[3] py-3 px-2 rounded-xl text-[9px] font-black uppercase tracking-widest transition-all shadow-lg truncate ${showContact ? 'bg-white border border-emerald-500 text-emerald-600' : 'bg-emerald-600 hover:bg-emerald-500 text-white shadow-emerald-500/20'}`}>
-            {showContact ? `${prop.contact_person} | ${prop.contact_number}` : "Get Owner Details"}
+          <button onClick={() => onSimilar?.(prop, isPG)} className="flex-1 bg-zinc-800 hover:bg-zinc-700 text-white flex items-center justify-center rounded-xl transition-all" title="More like this">
+            <Sparkles size={18}/>
+          </button>
+          <button onClick={toggleContact} className={`flex-[3] py-3 px-2 rounded-xl text-[9px] font-black uppercase tracking-widest transition-all shadow-lg truncate ${showContact ? 'bg-white border border-emerald-500 text-emerald-600' : 'bg-emerald-600 hover:bg-emerald-500 text-white shadow-emerald-500/20'}`}>
+            {!showContact ? "Get Owner Details"
+              : !details ? "Loading..."
+              : details.contact_number ? `${details.contact_person} | ${details.contact_number}` : "Details unavailable"}
           </button>
         </div>
       </div>